@@ -0,0 +1,57 @@
+# bench_api.py — the library API: one Compiler fanned out over executors.
+# Generates K programs with dotgen.py and compiles them with
+# Compiler.compile_many four ways:
+#   serial    one after another on the calling thread
+#   threads   the event loop's default thread pool
+#   processes a process pool of W workers, each with its own warmed Compiler
+#   memory    the first Compiler again, every program in its memory cache
+# and reports the total and per-program time of each. Every way must emit
+# the same code.
+#
+#   python benchmarks/bench_api.py [--programs K] [--size N] [--shape SHAPE] [--workers W]
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compiler import Compiler  # noqa: E402
+from dotgen import generate  # noqa: E402
+
+def main():
+    programs, size, shape, workers = 200, 3, 'mixed', os.cpu_count() or 1
+    if '--programs' in sys.argv:
+        programs = int(sys.argv[sys.argv.index('--programs') + 1])
+    if '--size' in sys.argv:
+        size = int(sys.argv[sys.argv.index('--size') + 1])
+    if '--shape' in sys.argv:
+        shape = sys.argv[sys.argv.index('--shape') + 1]
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+
+    sources = [generate(shape, size, seed) for seed in range(programs)]
+    print(f"{programs} programs ({shape}, size {size}), {workers} worker processes:")
+    warm = Compiler()
+    with ProcessPoolExecutor(workers) as pool:
+        pool.submit(int).result()  # Start the workers outside the timing
+        expected = None
+        for label, run in (('serial', lambda: [Compiler().compile_string(s) for s in sources]),
+                           ('threads', lambda: asyncio.run(Compiler().compile_many(sources))),
+                           ('processes', lambda: asyncio.run(Compiler().compile_many(sources, pool))),
+                           ('memory', lambda: asyncio.run(warm.compile_many(sources)))):
+            if label == 'memory':
+                asyncio.run(warm.compile_many(sources))
+            start = time.perf_counter()
+            outputs = run()
+            seconds = time.perf_counter() - start
+            if expected is None:
+                expected = outputs
+            elif outputs != expected:
+                sys.exit(f"{label} emitted different code")
+            print(f"    {label:10}{seconds * 1000:10.1f} ms total{seconds * 1000 / programs:9.2f} ms each")
+
+if __name__ == '__main__':
+    main()
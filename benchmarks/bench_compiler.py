@@ -0,0 +1,112 @@
+# bench_compiler.py — compiler throughput on generated programs.
+# For each shape and size, generates a program with dotgen.py, compiles it
+# in-process (no cache) best-of-N and reports tokens/s, lines/s and the time
+# of every phase, plus peak traced memory from one extra tracemalloc run.
+# Results can be saved as JSON and compared against an earlier run, so
+# regressions between versions show up as ratios.
+#
+#   python benchmarks/bench_compiler.py [--shapes S,S] [--sizes N,N] [--seed S] [-n RUNS]
+#                                       [--target cpp|c] [--json OUT] [--compare BASELINE]
+
+import io
+import json
+import os
+import platform
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dotc import __version__, compile_source  # noqa: E402
+from dotgen import SHAPES, generate  # noqa: E402
+from timing import PHASES, FileTimings  # noqa: E402
+
+# A run this much slower than the baseline is flagged
+REGRESSION = 1.10
+
+def measure(source, target, runs):
+    # Best-of-runs FileTimings (untraced, so times are clean) and the peak
+    # bytes tracemalloc saw during one more compile
+    best = None
+    for _ in range(runs):
+        timings = FileTimings('<generated>')
+        compile_source(source, io.StringIO(), target, timings=timings)
+        if best is None or timings.seconds() < best.seconds():
+            best = timings
+    tracemalloc.start()
+    compile_source(source, io.StringIO(), target)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    shapes, sizes, seed, runs, target = SHAPES, (10, 100, 400), 0, 3, 'cpp'
+    json_path = baseline_path = None
+    if '--shapes' in sys.argv:
+        shapes = sys.argv[sys.argv.index('--shapes') + 1].split(',')
+    if '--sizes' in sys.argv:
+        sizes = [int(size) for size in sys.argv[sys.argv.index('--sizes') + 1].split(',')]
+    if '--seed' in sys.argv:
+        seed = int(sys.argv[sys.argv.index('--seed') + 1])
+    if '-n' in sys.argv:
+        runs = int(sys.argv[sys.argv.index('-n') + 1])
+    if '--target' in sys.argv:
+        target = sys.argv[sys.argv.index('--target') + 1]
+    if '--json' in sys.argv:
+        json_path = sys.argv[sys.argv.index('--json') + 1]
+    if '--compare' in sys.argv:
+        baseline_path = sys.argv[sys.argv.index('--compare') + 1]
+
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as f:
+            old = json.load(f)
+        baseline = {(result['shape'], result['size']): result for result in old['results']}
+        print(f"baseline: dotc {old['dotc']}, python {old['python']}")
+
+    shown = [phase for phase in PHASES if phase not in ('read', 'cache', 'store')]
+    print(f"dotc {__version__}, seed {seed}, target {target}, best of {runs}:")
+    print(f"    {'shape':8}{'size':>6}{'lines':>8}{'tokens':>9}{'ms':>10}{'ktok/s':>9}"
+          f"{'klines/s':>10}{'peak MB':>9}" + ''.join(f"{phase:>10}" for phase in shown))
+    results, regressions = [], 0
+    for shape in shapes:
+        for size in sizes:
+            source = generate(shape, size, seed)
+            timings, peak = measure(source, target, runs)
+            seconds = timings.seconds()
+            lines = source.count('\n')
+            tokens = timings.counts['tokens']
+            phases = {name: elapsed for name, elapsed, _, _ in timings.phases}
+            result = {
+                'shape': shape, 'size': size, 'lines': lines, 'tokens': tokens,
+                'bytes': len(source), 'ms': round(seconds * 1000, 3),
+                'tokens_per_s': round(tokens / seconds), 'lines_per_s': round(lines / seconds),
+                'peak_bytes': peak,
+                'phases': {name: round(elapsed * 1000, 3) for name, elapsed in phases.items()},
+                'passes': {name: round(elapsed * 1000, 3) for name, elapsed in timings.passes.items()},
+            }
+            results.append(result)
+            row = (f"    {shape:8}{size:6}{lines:8}{tokens:9}{seconds * 1000:10.1f}"
+                   f"{tokens / seconds / 1000:9.1f}{lines / seconds / 1000:10.1f}"
+                   f"{peak / (1 << 20):9.1f}"
+                   + ''.join(f"{phases.get(phase, 0.0) * 1000:10.1f}" for phase in shown))
+            before = baseline.get((shape, size))
+            if before:
+                ratio = result['ms'] / before['ms']
+                row += f"   {ratio:.2f}x baseline"
+                if ratio > REGRESSION:
+                    row += ' (slower)'
+                    regressions += 1
+            print(row)
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'dotc': __version__, 'python': platform.python_version(), 'seed': seed,
+                       'target': target, 'runs': runs, 'results': results}, f, indent=2)
+            f.write('\n')
+        print(f"results written to {json_path}")
+    if regressions:
+        print(f"{regressions} case(s) more than {REGRESSION - 1:.0%} slower than the baseline")
+
+if __name__ == '__main__':
+    main()
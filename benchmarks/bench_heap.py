@@ -0,0 +1,96 @@
+# bench_heap.py — emitted heap allocation: new/delete (malloc/free) vs the pool.
+# Generates a two-module Dot project whose hot loop allocates and releases
+# small i~ pointers, handing each to a set function in the other module so
+# the C/C++ compiler can't see through the call and elide the allocation.
+# Builds it with heap = system and heap = pool for both targets, compiles
+# each at -O2 and reports the best-of-N run time. Both builds must print
+# the same result.
+#
+#   python benchmarks/bench_heap.py [--iterations N] [--live K] [-n RUNS] [--target cpp|c]
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DOTC = os.path.join(ROOT, 'src', 'dotc.py')
+COMPILERS = {'cpp': 'g++', 'c': 'gcc'}
+
+LIBRARY = """set_i acc{
+    add(i_ @total, i_ @value){ total@ = total@ + value@; value@ = value@ + 1; }
+}
+"""
+
+def program(iterations, live):
+    # Each iteration allocates `live` heap ints, passes them to acc.add and
+    # releases them all, last allocated first
+    names = [f"h{i}" for i in range(live)]
+    lines = ["i_ 'n = 0;", "i_ 'total = 0;", f"while(n\" < {iterations}){{"]
+    for i, name in enumerate(names):
+        lines.append(f"    i~ '{name} = n\" + {i};")
+    for name in names:
+        lines.append(f"    acc.add('total, '{name});")
+        lines.append(f"    total\" = total\" + {name}\";")
+    for name in reversed(names):
+        lines.append(f"    '{name}\\")
+    lines += ["    n\" = n\" + 1;", "}", "\"total: \" total\"", "'n\\ 'total\\", ""]
+    return '\n'.join(lines)
+
+def build(work, main_source, target, heap):
+    project = os.path.join(work, f"{target}-{heap}")
+    os.makedirs(os.path.join(project, 'lib'))
+    for name, text in (('main.dot', main_source), (os.path.join('lib', 'acc.dot'), LIBRARY)):
+        with open(os.path.join(project, name), 'w') as f:
+            f.write(text)
+    with open(os.path.join(project, '.dotbuild'), 'w') as f:
+        f.write(f"[build]\nentry = main.dot\ndirs = lib/\ntarget = {target}\nheap = {heap}\n")
+    subprocess.run([sys.executable, DOTC, '--build', os.path.join(project, '.dotbuild'), '--no-cache'],
+                   check=True, stdout=subprocess.DEVNULL)
+    out = os.path.join(project, 'build')
+    binary = os.path.join(project, 'bench')
+    sources = [os.path.join(out, f"main.{target}"), os.path.join(out, 'lib', f"acc.{target}")]
+    subprocess.run([COMPILERS[target], '-O2', '-w', *sources, '-o', binary, '-lm'], check=True)
+    return binary
+
+def best(binary, runs):
+    times, output = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([binary], check=True, capture_output=True, text=True).stdout
+        times.append(time.perf_counter() - start)
+    return min(times), output
+
+def main():
+    iterations, live, runs = 2_000_000, 4, 5
+    targets = ('cpp', 'c')
+    if '--iterations' in sys.argv:
+        iterations = int(sys.argv[sys.argv.index('--iterations') + 1])
+    if '--live' in sys.argv:
+        live = int(sys.argv[sys.argv.index('--live') + 1])
+    if '-n' in sys.argv:
+        runs = int(sys.argv[sys.argv.index('-n') + 1])
+    if '--target' in sys.argv:
+        targets = (sys.argv[sys.argv.index('--target') + 1],)
+
+    work = tempfile.mkdtemp(prefix='dotc-heap-')
+    try:
+        main_source = program(iterations, live)
+        print(f"{iterations} iterations x {live} live i~ pointers, best of {runs}:")
+        for target in targets:
+            if shutil.which(COMPILERS[target]) is None:
+                print(f"    {target}: {COMPILERS[target]} not found, skipped")
+                continue
+            results = {heap: best(build(work, main_source, target, heap), runs) for heap in ('system', 'pool')}
+            if results['system'][1] != results['pool'][1]:
+                sys.exit(f"{target}: pool and system builds disagree")
+            system, pool = results['system'][0], results['pool'][0]
+            print(f"    {target:4} system {system * 1000:8.1f} ms   pool {pool * 1000:8.1f} ms   "
+                  f"({system / pool:.2f}x)")
+    finally:
+        shutil.rmtree(work)
+
+if __name__ == '__main__':
+    main()
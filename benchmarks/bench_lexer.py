@@ -0,0 +1,57 @@
+# bench_lexer.py — per-call tokenizer overhead on small sources.
+# Compares the old dotc.py approach (build and compile the master pattern
+# inside every call) with the shared, precompiled lexer in src/lexer.py.
+# The old approach is timed twice: with re's pattern cache emptied before
+# each call, and with it warm, where only the join and the cache lookup
+# are repeated.
+#
+#   python benchmarks/bench_lexer.py [-n CALLS]
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lexer import token_specification, tokenize  # noqa: E402
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'hello_world.dot')
+
+def tokenize_recompile(code):
+    # The pre-shared dotc.py tokenizer: join + compile on every call. With
+    # the pattern in re's internal cache, re.compile is a cache lookup.
+    pattern = '|'.join(f'(?P<{name}>{regex})' for name, regex in token_specification)
+    regex = re.compile(pattern)
+    return [(m.lastgroup, m.group()) for m in regex.finditer(code)
+            if m.lastgroup not in ('WHITESPACE', 'NEWLINE', 'COMMENT')]
+
+def tokenize_recompile_cold(code):
+    # The same with re's cache emptied first, as in a fresh process or a
+    # watch loop cycling through more patterns than the cache holds
+    re.purge()
+    return tokenize_recompile(code)
+
+def main():
+    calls = 2000
+    if '-n' in sys.argv:
+        calls = int(sys.argv[sys.argv.index('-n') + 1])
+
+    with open(EXAMPLE) as f:
+        source = f.read()
+    snippet = source.splitlines()[6] + '\n'
+
+    cases = [
+        ('recompile per call, cold re cache', tokenize_recompile_cold),
+        ('recompile per call, warm re cache', tokenize_recompile),
+        ('precompiled', tokenize),
+        ('precompiled + glyph fast path', lambda code: tokenize(code, fast=True)),
+    ]
+    for label, code in (('one line', snippet), ('hello_world.dot', source)):
+        print(f"{label} ({len(code)} chars), {calls} calls:")
+        for name, fn in cases:
+            seconds = timeit.timeit(lambda: fn(code), number=calls)
+            print(f"    {name:36} {seconds / calls * 1e6:9.1f} us/call")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# bench_mmap.py — peak memory of reading and lexing a large generated source.
+# Compares a str read (plus a Token object per lexeme, and the columnar
+# TokenBuffer) against lexing a memory-mapped file as bytes in place. Peak
+# Python heap is measured with tracemalloc; mapped pages are file-backed
+# and clean, so the kernel can drop them under pressure.
+#
+#   python benchmarks/bench_mmap.py [--mb SIZE] [--parse]
+
+import mmap
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lexer import tokenize, tokenize_buffer  # noqa: E402
+from parser import parse  # noqa: E402
+
+def generate(path, megabytes):
+    # Declarations, updates and releases; lexes and parses cleanly
+    with open(path, 'w') as f:
+        i = 0
+        while f.tell() < megabytes * 1024 * 1024:
+            f.write(f"i_ 'v{i} = {i} * 2 + 1;\nv{i}\" = v{i}\" + 3; // update\n'v{i}\\\n")
+            i += 1
+
+def read_str(path):
+    with open(path) as f:
+        return f.read()
+
+def read_mmap(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return seconds, peak
+
+def main():
+    megabytes = 4
+    if '--mb' in sys.argv:
+        megabytes = int(sys.argv[sys.argv.index('--mb') + 1])
+    with_parse = '--parse' in sys.argv
+
+    fd, path = tempfile.mkstemp(suffix='.dot')
+    os.close(fd)
+    try:
+        generate(path, megabytes)
+        cases = [
+            ('str + Token objects', lambda: tokenize(read_str(path))),
+            ('str + TokenBuffer', lambda: tokenize_buffer(read_str(path))),
+            ('mmap + TokenBuffer', lambda: tokenize_buffer(read_mmap(path))),
+        ]
+        if with_parse:
+            cases += [
+                ('str + TokenBuffer + parse', lambda: parse(read_str(path))),
+                ('mmap + TokenBuffer + parse', lambda: parse(read_mmap(path))),
+            ]
+        print(f"{os.path.getsize(path) / 1e6:.1f} MB source:")
+        for name, fn in cases:
+            seconds, peak = measure(fn)
+            print(f"    {name:28} peak {peak / 1e6:8.1f} MB  {seconds * 1000:8.0f} ms")
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    main()
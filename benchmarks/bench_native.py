@@ -0,0 +1,66 @@
+# bench_native.py — many small programs: compile-and-spawn vs dotc run --native.
+# Generates K small programs with dotgen.py and runs each of them three ways:
+#   spawn   dotc to C, cc -O2 to an executable, run it as a process
+#   cold    native.load into an empty cache (builds each shared object) + main()
+#   warm    native.load again, every object cached, + main()
+# and reports the total and per-program time of each. Every way must print
+# the same output.
+#
+#   python benchmarks/bench_native.py [--programs K] [--size N] [--shape SHAPE]
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import native  # noqa: E402
+from dotc import compile_source  # noqa: E402
+from dotgen import generate  # noqa: E402
+
+def spawn(sources, directory):
+    outputs = []
+    for i, source in enumerate(sources):
+        out = io.StringIO()
+        compile_source(source, out, 'c')
+        c_path, exe = os.path.join(directory, f"p{i}.c"), os.path.join(directory, f"p{i}")
+        with open(c_path, 'w') as f:
+            f.write(out.getvalue())
+        subprocess.run([native.compiler(), '-O2', c_path, '-o', exe, '-lm'], check=True)
+        outputs.append(subprocess.run([exe], capture_output=True, text=True, check=True).stdout)
+    return outputs
+
+def in_process(sources, cache_dir):
+    return [native.load(source, cache_dir).main(capture=True)[1] for source in sources]
+
+def main():
+    programs, size, shape = 50, 3, 'mixed'
+    if '--programs' in sys.argv:
+        programs = int(sys.argv[sys.argv.index('--programs') + 1])
+    if '--size' in sys.argv:
+        size = int(sys.argv[sys.argv.index('--size') + 1])
+    if '--shape' in sys.argv:
+        shape = sys.argv[sys.argv.index('--shape') + 1]
+
+    sources = [generate(shape, size, seed) for seed in range(programs)]
+    print(f"{programs} programs ({shape}, size {size}), C compiler {native.compiler()}:")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        expected = None
+        for label, run in (('spawn', lambda: spawn(sources, tmp)),
+                           ('cold', lambda: in_process(sources, cache_dir)),
+                           ('warm', lambda: in_process(sources, cache_dir))):
+            start = time.perf_counter()
+            outputs = run()
+            seconds = time.perf_counter() - start
+            if expected is None:
+                expected = outputs
+            elif outputs != expected:
+                sys.exit(f"{label} printed different output")
+            print(f"    {label:8}{seconds * 1000:10.1f} ms total{seconds * 1000 / programs:9.2f} ms each")
+
+if __name__ == '__main__':
+    main()
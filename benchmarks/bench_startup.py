@@ -0,0 +1,97 @@
+# bench_startup.py — dotc process startup on its fast paths.
+# Runs dotc --version, --help and a cache-hit compile as fresh processes,
+# reports wall time next to a bare interpreter, and reads
+# `python -X importtime` to list what each path imported. With --check it
+# is a regression gate: it fails if a fast path imports any pipeline module
+# (lexer, parser, ir, check, opt, emitter) or costs more than --budget-ms over the
+# bare interpreter.
+#
+#   python benchmarks/bench_startup.py [-n RUNS] [--check] [--budget-ms MS]
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DOTC = os.path.join(ROOT, 'src', 'dotc.py')
+EXAMPLE = ("i_5 'a;\ni_ 'k = 0;\nwhile(k\" < 5){ a\"k = k\" * 2; k\" = k\" + 1; }\n"
+           "\"last: \" a\"4\n'a\\ 'k\\\n")
+
+# Modules the fast paths must never load
+PIPELINE = ('lexer', 'parser', 'ir', 'check', 'opt', 'emitter')
+
+def run(argv, cwd):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def imports(argv, cwd):
+    # {module: cumulative microseconds} from -X importtime
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=cwd, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    found = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        found[name.strip()] = int(cumulative)
+    return found
+
+def main():
+    runs = 20
+    if '-n' in sys.argv:
+        runs = int(sys.argv[sys.argv.index('-n') + 1])
+    budget = 50.0
+    if '--budget-ms' in sys.argv:
+        budget = float(sys.argv[sys.argv.index('--budget-ms') + 1])
+    check = '--check' in sys.argv
+
+    work = tempfile.mkdtemp(prefix='dotc-startup-')
+    try:
+        source = os.path.join(work, 'example.dot')
+        with open(source, 'w') as f:
+            f.write(EXAMPLE)
+        compile_argv = [DOTC, source, '-o', os.path.join(work, 'out.cpp'), '-j', '1']
+        run(compile_argv, work)  # Populate the cache
+
+        cases = [
+            ('python (bare)', ['-c', 'pass']),
+            ('dotc --version', [DOTC, '--version']),
+            ('dotc --help', [DOTC, '--help']),
+            ('dotc cache hit', compile_argv),
+        ]
+        failures = []
+        baseline = None
+        print(f"{runs} runs each, median wall time:")
+        for label, argv in cases:
+            run(argv, work)  # Warm the OS file cache
+            median = statistics.median(run(argv, work) for _ in range(runs)) * 1000
+            if baseline is None:
+                baseline = median
+                print(f"    {label:18} {median:8.1f} ms")
+                continue
+            loaded = imports(argv, work)
+            top = sorted(((us, name) for name, us in loaded.items()), reverse=True)[:3]
+            print(f"    {label:18} {median:8.1f} ms  (+{median - baseline:.1f})  "
+                  f"heaviest imports: {', '.join(f'{n} {us / 1000:.1f}ms' for us, n in top)}")
+            leaked = [name for name in PIPELINE if name in loaded]
+            if leaked:
+                failures.append(f"{label} imports {', '.join(leaked)}")
+            if median - baseline > budget:
+                failures.append(f"{label} costs {median - baseline:.1f} ms over bare python "
+                                f"(budget {budget:.0f} ms)")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if check and failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# bench_vector.py — dotc run: whole-array loop kernels vs interpreted loops.
+# Runs one program in the bytecode VM with kernels off, over lists, and
+# over NumPy when it is installed, best-of-N each, and reports the time and
+# the speedup over interpreting. The program is made of counted loops over
+# an i_N array: fill, elementwise update from a second array, sum, and a
+# scaled difference, then prints what they computed. Every mode must print
+# the same output.
+#
+#   python benchmarks/bench_vector.py [--size N] [--arrays K] [-n RUNS]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import vector  # noqa: E402
+from opt import optimize  # noqa: E402
+from vm import VM, load  # noqa: E402
+
+def program(size, arrays):
+    lines = []
+    for n in range(arrays):
+        lines += [f"i_{size} 'a{n};", f"i_{size} 'b{n};", f"i_ 'k{n} = 0;",
+                  f"while(k{n}\" < {size}){{ a{n}\"k{n} = k{n}\" * {n + 3} - 7; k{n}\" = k{n}\" + 1; }}",
+                  f"k{n}\" = 0;",
+                  f"while(k{n}\" < {size}){{ b{n}\"k{n} = a{n}\"k{n} * a{n}\"k{n} + k{n}\"; "
+                  f"k{n}\" = k{n}\" + 1; }}",
+                  f"i_ 's{n} = 0;", f"l_ 'd{n} = 0;", f"k{n}\" = 0;",
+                  f"while(k{n}\" < {size}){{ s{n}\" = s{n}\" + b{n}\"k{n}; "
+                  f"d{n}\" -= a{n}\"k{n} * 2; k{n}\" = k{n}\" + 1; }}",
+                  f"\"s{n}: \" s{n}\" \" d{n}: \" d{n}\"",
+                  f"'a{n}\\ 'b{n}\\ 'k{n}\\ 's{n}\\ 'd{n}\\"]
+    return '\n'.join(lines) + '\n'
+
+def measure(module, vectorize, runs):
+    best, output = None, None
+    for _ in range(runs):
+        out = io.StringIO()
+        start = time.perf_counter()
+        VM(module, out, vectorize).run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = out.getvalue()
+    return best, output
+
+def main():
+    size, arrays, runs = 100_000, 4, 3
+    if '--size' in sys.argv:
+        size = int(sys.argv[sys.argv.index('--size') + 1])
+    if '--arrays' in sys.argv:
+        arrays = int(sys.argv[sys.argv.index('--arrays') + 1])
+    if '-n' in sys.argv:
+        runs = int(sys.argv[sys.argv.index('-n') + 1])
+
+    module = load(program(size, arrays))
+    optimize(module)
+    modes = ['off', 'lists'] + (['auto'] if vector.numpy is not None else [])
+    print(f"{arrays} x 3 loops over i_{size}, best of {runs}"
+          + ('' if vector.numpy is not None else ' (NumPy not installed)') + ':')
+    baseline = expected = None
+    for mode in modes:
+        seconds, output = measure(module, mode, runs)
+        if expected is None:
+            baseline, expected = seconds, output
+        elif output != expected:
+            sys.exit(f"--vectorize {mode} printed different output")
+        label = 'numpy' if mode == 'auto' else mode
+        print(f"    {label:8}{seconds * 1000:10.1f} ms{baseline / seconds:9.1f}x")
+
+if __name__ == '__main__':
+    main()
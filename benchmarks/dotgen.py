@@ -0,0 +1,145 @@
+# dotgen.py — seeded generator of valid Dot programs for compiler benchmarks.
+# Every program passes the ownership checker: each pointer is read and
+# released, and each pseudo parameter is used. Each shape stresses one part
+# of the pipeline:
+#   nesting   set functions of deeply nested while/if/elif/else blocks, each
+#             calling the one before it
+#   structs   many struct types and instances, member reads and writes
+#   exprs     long arithmetic chains over earlier pointers
+#   arrays    large i_N arrays filled and summed in counted loops
+#   mixed     all of the above, interleaved
+# size counts units of the shape (a function, a struct, a chain, an array);
+# the same shape, size and seed always give the same program.
+#
+#   python benchmarks/dotgen.py [--shape SHAPE] [--size N] [--seed S] [-o FILE]
+
+import random
+import sys
+
+SHAPES = ('nesting', 'structs', 'exprs', 'arrays', 'mixed')
+UNITS = ('nesting', 'structs', 'exprs', 'arrays')
+
+class Generator:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.types, self.sets, self.body, self.released = [], [], [], []
+        self.units = 0
+        self.nests = 0
+        self.values = []  # int pointers an expression chain can read
+
+    def program(self, shape: str, size: int) -> str:
+        for _ in range(size):
+            self.unit(self.rng.choice(UNITS) if shape == 'mixed' else shape)
+        self.body.append(' '.join(f"'{name}\\" for name in self.released))
+        return '\n'.join(self.types + self.sets + self.body) + '\n'
+
+    def unit(self, shape: str):
+        self.units += 1
+        getattr(self, shape)(self.units)
+
+    # --- Shapes ---
+
+    def nesting(self, k: int):
+        rng = self.rng
+        depth = rng.randint(3, 8)
+        lines = [f"set_i nest{k}{{", f"    f{k}(i_ @acc, i_ @n){{"]
+        self.block(lines, depth, 2, [], [0])
+        if self.nests:
+            previous = self.nests
+            lines.append(f"        nest{previous}.f{previous}(acc, n);")
+        lines += ["    }", "}"]
+        self.sets.append('\n'.join(lines))
+        self.nests = k
+        self.body += [f"i_ 'acc{k} = {rng.randint(0, 9)};", f"i_ 'n{k} = {rng.randint(2, 5)};",
+                      f"nest{k}.f{k}('acc{k}, 'n{k});", f"\"acc{k}: \" acc{k}\""]
+        self.released += [f"acc{k}", f"n{k}"]
+        self.values.append(f"acc{k}")
+
+    def block(self, lines, depth: int, indent: int, counters, fresh):
+        # One statement, nesting depth more blocks inside it; counters are
+        # the loop variables in scope, fresh numbers new ones
+        rng = self.rng
+        pad = '    ' * indent
+        if depth == 0:
+            lines.append(f"{pad}acc@ = acc@ + {self.term(counters + ['n@'])};")
+        elif rng.random() < 0.5:
+            fresh[0] += 1
+            i = f"i{fresh[0]}"
+            lines += [f"{pad}i_ {i} = 0,", f"{pad}while({i} < n@){{"]
+            self.block(lines, depth - 1, indent + 1, counters + [i], fresh)
+            lines += [f"{pad}    {i} = {i} + 1", f"{pad}}}"]
+        else:
+            limit = rng.randint(100, 10_000)
+            lines.append(f"{pad}if(acc@ > {limit}){{")
+            self.block(lines, depth - 1, indent + 1, counters, fresh)
+            lines += [f"{pad}}} elif(acc@ == {rng.randint(0, 50)}) {{ acc@ += 1; }}",
+                      f"{pad}else {{ acc@ = acc@ - {limit // 2}; }}"]
+
+    def structs(self, k: int):
+        rng = self.rng
+        fields = [f"f{i}" for i in range(rng.randint(2, 8))]
+        members = ' '.join(f"i_ '{field};" for field in fields)
+        self.types.append(f"struct s{k}{{ {members} }}")
+        values = ', '.join(str(rng.randint(0, 99)) for _ in fields)
+        first, second = rng.sample(fields, 2)
+        self.body += [f"s{k} 'p{k}{{{values}}};",
+                      f"p{k}\"{first} = p{k}\"{second} * {rng.randint(2, 9)} + p{k}\"{first};",
+                      f"\"p{k}: \" " + ' " " '.join(f"p{k}\"{field}" for field in fields)]
+        self.released.append(f"p{k}")
+
+    def exprs(self, k: int):
+        rng = self.rng
+        reads = [name + '"' for name in self.values[-8:]]
+        chain = self.term([])
+        for _ in range(rng.randint(20, 60)):
+            chain += f" {rng.choice('+-*')} {self.term(reads)}"
+        self.body += [f"i_ 'e{k} = {chain};", f"\"e{k}: \" e{k}\""]
+        self.released.append(f"e{k}")
+        self.values.append(f"e{k}")
+
+    def arrays(self, k: int):
+        rng = self.rng
+        size = rng.randint(1_000, 100_000)
+        self.body += [f"i_{size} 'a{k};", f"i_ 'k{k} = 0;",
+                      f"while(k{k}\" < {size}){{ a{k}\"k{k} = k{k}\" * {rng.randint(2, 9)} + 1; "
+                      f"k{k}\" = k{k}\" + 1; }}",
+                      f"i_ 's{k} = 0;", f"k{k}\" = 0;",
+                      f"while(k{k}\" < {size}){{ s{k}\" = s{k}\" + a{k}\"k{k}; k{k}\" = k{k}\" + 1; }}",
+                      f"\"s{k}: \" s{k}\""]
+        self.released += [f"a{k}", f"k{k}", f"s{k}"]
+        self.values.append(f"s{k}")
+
+    def term(self, names) -> str:
+        # A literal, one of names, or a small parenthesised sum
+        rng = self.rng
+        roll = rng.random()
+        if names and roll < 0.5:
+            return rng.choice(names)
+        if roll < 0.8:
+            return str(rng.randint(1, 9))
+        return f"({rng.randint(1, 9)} + {rng.choice(names) if names else rng.randint(1, 9)})"
+
+def generate(shape: str = 'mixed', size: int = 100, seed: int = 0) -> str:
+    if shape not in SHAPES:
+        raise ValueError(f"unknown shape '{shape}' (expected one of {', '.join(SHAPES)})")
+    return Generator(seed).program(shape, size)
+
+def main():
+    shape, size, seed, output = 'mixed', 100, 0, None
+    if '--shape' in sys.argv:
+        shape = sys.argv[sys.argv.index('--shape') + 1]
+    if '--size' in sys.argv:
+        size = int(sys.argv[sys.argv.index('--size') + 1])
+    if '--seed' in sys.argv:
+        seed = int(sys.argv[sys.argv.index('--seed') + 1])
+    if '-o' in sys.argv:
+        output = sys.argv[sys.argv.index('-o') + 1]
+    source = generate(shape, size, seed)
+    if output is None:
+        sys.stdout.write(source)
+    else:
+        with open(output, 'w') as f:
+            f.write(source)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+# build.py — .dotbuild project driver for dotc.
+# Reads the project file, discovers modules under the listed dirs and links
+# them through a dependency graph: a module depends on every module that
+# defines a set function or struct it uses. Only modules whose source, or
+# the interface of anything they (transitively) depend on, changed since the
+# last build are recompiled; changing the target, heap or -O rebuilds all.
+# Build state lives next to the outputs in <out>/.dotbuild-state.json;
+# mtime and size are checked first and the source hash only when they
+# differ.
+#
+#   [build]
+#   entry = main.dot        module that holds the top-level program
+#   dirs = src/, lib/       searched recursively for further modules
+#   out = build             output directory (default: build)
+#   target = cpp            cpp or c (default: cpp)
+#   heap = system           system or pool, as dotc --heap (default: system)
+#
+#   [link]
+#   strict_duplicates = true   a name defined in two modules is an error
+#   auto_import = true         uses resolve to other modules' definitions
+
+import configparser
+import hashlib
+import json
+import os
+import sys
+
+from dotc import __version__, compile_files, offset_location
+from parser import (ControlFlow, FunctionCall, ParseError, SetFunction, SetGroup, StructDef,
+                    StructInstance, parse)
+
+STATE_FILE = '.dotbuild-state.json'
+
+class BuildError(Exception):
+    pass
+
+# === Project ===
+
+class Project:
+    def __init__(self, path: str):
+        config = configparser.ConfigParser()
+        if not config.read(path):
+            raise BuildError(f"{path}: cannot read build file")
+        if not config.has_option('build', 'entry'):
+            raise BuildError(f"{path}: [build] needs an entry")
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.entry = self.source(config.get('build', 'entry'))
+        dirs = config.get('build', 'dirs', fallback='')
+        self.dirs = [self.source(d.strip()) for d in dirs.split(',') if d.strip()]
+        self.out = self.source(config.get('build', 'out', fallback='build'))
+        self.target = config.get('build', 'target', fallback='cpp')
+        if self.target not in ('cpp', 'c'):
+            raise BuildError(f"{path}: unknown target '{self.target}'")
+        self.heap = config.get('build', 'heap', fallback='system')
+        if self.heap not in ('system', 'pool'):
+            raise BuildError(f"{path}: unknown heap '{self.heap}'")
+        self.strict_duplicates = config.getboolean('link', 'strict_duplicates', fallback=True)
+        self.auto_import = config.getboolean('link', 'auto_import', fallback=True)
+
+    def source(self, path: str) -> str:
+        return os.path.normpath(os.path.join(self.root, path))
+
+    def modules(self):
+        # Entry first, then every .dot under dirs in a stable order
+        found = [self.entry]
+        seen = {self.entry}
+        for directory in self.dirs:
+            for root, dirs, files in os.walk(directory):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.normpath(os.path.join(root, name))
+                    if name.endswith('.dot') and path not in seen:
+                        seen.add(path)
+                        found.append(path)
+        return found
+
+    def output(self, path: str) -> str:
+        rel = os.path.relpath(path, self.root)
+        return os.path.join(self.out, os.path.splitext(rel)[0] + '.' + self.target)
+
+# === Interfaces ===
+
+def scan(program):
+    # What a module defines and what it uses from elsewhere
+    functions, structs, uses, stray = {}, {}, set(), []
+
+    def walk(nodes):
+        for node in nodes:
+            if isinstance(node, FunctionCall):
+                uses.add(node.target)
+            elif isinstance(node, StructInstance):
+                uses.add(node.struct_type)
+                uses.add(node.struct_type.split('_')[0])  # vec_i -> vec
+            elif isinstance(node, ControlFlow):
+                walk(node.body)
+                walk(node.orelse or [])
+
+    for node in program.body:
+        if isinstance(node, StructDef):
+            structs[node.name] = [list(field) for field in node.fields]
+        elif isinstance(node, SetGroup):
+            for fn in node.functions:
+                functions[f"{node.name}.{fn.name}"] = params(fn)
+                walk(fn.body)
+        elif isinstance(node, SetFunction):
+            functions[node.name] = params(node)
+            walk(node.body)
+        else:
+            stray.append(node.start)
+            walk([node])
+    uses -= functions.keys() | structs.keys()
+    return {'functions': functions, 'structs': structs}, sorted(uses), stray
+
+def params(fn: SetFunction):
+    return [[p.dtype, p.glyph, p.const, p.name] for p in fn.params]
+
+def digest(data) -> str:
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+# === Build ===
+
+class Builder:
+    def __init__(self, project: Project, jobs: int = 1, cache_dir=None, log=print, timings=None,
+                 opt_level: int = 1):
+        # timings: a list to collect a timing.FileTimings per compiled module
+        self.project = project
+        self.jobs = jobs
+        self.opt_level = opt_level
+        self.cache_dir = cache_dir
+        self.log = log
+        self.timings = timings
+        self.state_path = os.path.join(project.out, STATE_FILE)
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (state.get('version') != __version__ or state.get('target') != self.project.target
+                or state.get('heap', 'system') != self.project.heap
+                or state.get('opt_level', 1) != self.opt_level):
+            return {}
+        return state.get('modules', {})
+
+    def save_state(self, modules):
+        os.makedirs(self.project.out, exist_ok=True)
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': __version__, 'target': self.project.target,
+                       'heap': self.project.heap, 'opt_level': self.opt_level, 'modules': modules},
+                      f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def inspect(self, path: str, diagnostics):
+        # Current record for path: reuse the stored one while the file is unchanged
+        st = os.stat(path)
+        old = self.state.get(path)
+        if old and old['mtime'] == st.st_mtime_ns and old['size'] == st.st_size:
+            return old
+        with open(path, 'rb') as f:
+            data = f.read()
+        source_hash = digest(data)
+        if old and old['hash'] == source_hash:
+            return dict(old, mtime=st.st_mtime_ns, size=st.st_size)
+        try:
+            interface, uses, stray = scan(parse(data))  # Lexed as bytes, never decoded whole
+        except ParseError as e:
+            diagnostics.append(f"{path}:{e.line}:{e.col}: error: {e.message}")
+            return None
+        if stray and path != self.project.entry:
+            line, col = offset_location(data, stray[0])
+            diagnostics.append(f"{path}:{line}:{col}: error: "
+                               f"top-level statements belong in the entry module")
+            return None
+        return {'mtime': st.st_mtime_ns, 'size': st.st_size, 'hash': source_hash,
+                'interface': interface, 'interface_hash': digest(json.dumps(interface, sort_keys=True)),
+                'uses': uses, 'built': None}
+
+    def link(self, records, diagnostics):
+        # name -> defining module, then module -> direct dependencies
+        owners = {}
+        for path, record in records.items():
+            interface = record['interface']
+            for name in list(interface['functions']) + list(interface['structs']):
+                if name in owners:
+                    if self.project.strict_duplicates:
+                        diagnostics.append(f"{path}: error: '{name}' is already defined in {owners[name]}")
+                    continue
+                owners[name] = path
+        graph = {}
+        for path, record in records.items():
+            if self.project.auto_import:
+                graph[path] = sorted({owners[name] for name in record['uses'] if name in owners} - {path})
+            else:
+                graph[path] = []
+        return owners, graph
+
+    def closure(self, graph, path):
+        seen, stack = set(), list(graph[path])
+        while stack:
+            dep = stack.pop()
+            if dep not in seen:
+                seen.add(dep)
+                stack.extend(graph[dep])
+        seen.discard(path)
+        return sorted(seen)
+
+    def imports(self, records, owners, path):
+        imports = {'functions': {}, 'structs': {}}
+        for name in records[path]['uses']:
+            owner = owners.get(name)
+            if owner is None or owner == path:
+                continue
+            interface = records[owner]['interface']
+            for kind in ('functions', 'structs'):
+                if name in interface[kind]:
+                    imports[kind][name] = interface[kind][name]
+        return imports
+
+    def build(self) -> bool:
+        project = self.project
+        diagnostics = []
+        records = {}
+        for path in project.modules():
+            try:
+                record = self.inspect(path, diagnostics)
+            except OSError as e:
+                diagnostics.append(f"{path}: error: {e.strerror}")
+                continue
+            if record is not None:
+                records[path] = record
+        owners, graph = self.link(records, diagnostics)
+        if diagnostics:
+            for diagnostic in diagnostics:
+                print(diagnostic, file=sys.stderr)
+            return False
+
+        jobs, stale = [], []
+        for path, record in records.items():
+            deps = {dep: records[dep]['interface_hash'] for dep in self.closure(graph, path)}
+            output = project.output(path)
+            if (record['built'] is None or record['built'] != {'hash': record['hash'], 'deps': deps}
+                    or not os.path.exists(output)):
+                record['built'] = None
+                stale.append((path, deps))
+                imports = self.imports(records, owners, path) if project.auto_import else None
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                jobs.append((path, output, project.target, imports, path == project.entry))
+
+        failed = 0
+        results = compile_files(jobs, self.jobs, self.cache_dir, self.opt_level,
+                                pool=project.heap == 'pool',
+                                timings=self.timings is not None)
+        if self.timings is not None:
+            self.timings.extend(result[4] for result in results)
+        for (path, deps), (_, output, hit, diagnostic, _) in zip(stale, results):
+            if diagnostic:
+                failed += 1
+                print(diagnostic, file=sys.stderr)
+            else:
+                records[path]['built'] = {'hash': records[path]['hash'], 'deps': deps}
+                self.log(f"Compiled {path} to {output}{' (cached)' if hit else ''}")
+        self.save_state(records)
+        self.log(f"{len(jobs)} of {len(records)} module(s) rebuilt"
+                 + (f", {failed} failed" if failed else ''))
+        return not failed
+
+def build(path: str = '.dotbuild', jobs: int = 1, cache_dir=None, log=print, timings=None,
+          opt_level: int = 1, heap: str = None) -> bool:
+    # heap overrides the project's [build] heap when given
+    project = Project(path)
+    if heap is not None:
+        project.heap = heap
+    return Builder(project, jobs, cache_dir, log, timings, opt_level).build()
@@ -0,0 +1,181 @@
+# cache.py — On-disk compilation cache for dotc.
+# Entries are keyed by a hash of the compiler version, the target and the
+# source text. Each entry is one or more files in the cache directory:
+#   <key>.out  the emitted C/C++ (all a cache hit needs to read)
+#   <key>.pkl  pickled artifacts, for callers that read them back
+#              (dotc run --native keeps its parameter signatures there)
+#   <key>.so   for dotc run --native, the shared object built from it
+# File mtimes double as the LRU clock: a hit touches the entry, and when the
+# cache outgrows its entry or byte limits the stalest entries are evicted,
+# down to LOW_WATER of the limits. Listing the directory costs a stat per
+# file, so a put doesn't: each Cache counts what it has added since its
+# last scan and rescans when that crosses a limit, and one put in
+# SCAN_BUCKETS (picked by key hash, so spread over every process sharing
+# the directory) rescans regardless. The limits are therefore soft.
+# Writes go through a temp file and os.replace, so concurrent dotc
+# processes never observe a half-written entry. pickle and tempfile are
+# imported only when storing, so a cache hit doesn't pay for them.
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+DEFAULT_DIR = '.dotcache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 4096
+LOW_WATER = 0.9
+SCAN_BUCKETS = 256
+
+class Cache:
+    def __init__(self, version: str, path: str = DEFAULT_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.version = version
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.counted = None  # (entries, bytes) as of the last scan, plus puts since
+
+    def key(self, source, target: str, context: str = '') -> str:
+        # source is text or a bytes-like buffer (mmap included), hashed in place.
+        # context covers anything besides the source that shapes the output.
+        h = hashlib.sha256()
+        h.update(f"{self.version}\0{target}\0{context}\0".encode())
+        h.update(source.encode() if isinstance(source, str) else source)
+        return h.hexdigest()
+
+    def _file(self, key: str, ext: str) -> str:
+        return os.path.join(self.path, key + ext)
+
+    def get(self, key: str) -> str | None:
+        path = self._file(key, '.out')
+        try:
+            with open(path, encoding='utf-8') as f:
+                output = f.read()
+        except (OSError, UnicodeDecodeError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # Evicted by another process in the meantime
+        self.hits += 1
+        return output
+
+    def artifacts(self, key: str) -> dict | None:
+        # {'tokens': TokenBuffer, 'ast': Program, 'ir': Module}, when stored
+        import pickle
+        try:
+            with open(self._file(key, '.pkl'), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def library(self, key: str) -> str | None:
+        # Path of the entry's shared object, touched as a hit, or None
+        path = self._file(key, '.so')
+        try:
+            os.utime(self._file(key, '.out'))
+        except OSError:
+            self.misses += 1
+            return None
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put_library(self, key: str, library: bytes, output: str, artifacts: dict) -> str:
+        # Store a shared object with the source it was built from; returns its path
+        os.makedirs(self.path, exist_ok=True)
+        self._write(self._file(key, '.so'), library)
+        self.put(key, output, artifacts, len(library))
+        return self._file(key, '.so')
+
+    def put(self, key: str, output: str, artifacts: dict | None = None, size: int = 0):
+        # size counts bytes the caller already stored under key
+        os.makedirs(self.path, exist_ok=True)
+        if artifacts is not None:
+            import pickle
+            data = pickle.dumps(artifacts, pickle.HIGHEST_PROTOCOL)
+            self._write(self._file(key, '.pkl'), data)
+            size += len(data)
+        # .out goes last: its presence is what marks the entry as complete
+        data = output.encode()
+        self._write(self._file(key, '.out'), data)
+        self.added(key, size + len(data))
+
+    def added(self, key: str, size: int):
+        if self.counted is not None:
+            entries, total = self.counted
+            self.counted = entries + 1, total + size
+            if entries + 1 > self.max_entries or total + size > self.max_bytes:
+                self.evict()
+                return
+        if int(key[:8], 16) % SCAN_BUCKETS == 0:
+            self.evict()
+
+    def _write(self, path: str, data: bytes):
+        import tempfile
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def entries(self):
+        # [(mtime, bytes, key)] for every complete entry
+        entries = []
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.out'):
+                continue
+            key = name[:-4]
+            try:
+                st = os.stat(self._file(key, '.out'))
+            except OSError:
+                continue
+            size = st.st_size
+            for ext in ('.pkl', '.so'):
+                try:
+                    size += os.stat(self._file(key, ext)).st_size
+                except OSError:
+                    pass
+            entries.append((st.st_mtime, size, key))
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if len(entries) > self.max_entries or total > self.max_bytes:
+            max_entries = int(self.max_entries * LOW_WATER)
+            max_bytes = int(self.max_bytes * LOW_WATER)
+            entries.sort(reverse=True)  # Stalest last
+            while entries and (len(entries) > max_entries or total > max_bytes):
+                _, size, key = entries.pop()
+                self.remove(key)
+                total -= size
+        self.counted = len(entries), total
+
+    def remove(self, key: str):
+        for ext in ('.out', '.pkl', '.so'):
+            try:
+                os.unlink(self._file(key, ext))
+            except OSError:
+                pass
+
+    def clear(self):
+        for _, _, key in self.entries():
+            self.remove(key)
+        self.counted = 0, 0
@@ -0,0 +1,218 @@
+# check.py — Ownership and release checker over the IR.
+# Every owned pointer (declared with ' or ~, not a parameter) must be used,
+# released exactly once with \ on every path, and never touched after its
+# release. Each function is split into basic blocks at its structured
+# control-flow markers; a forward may-analysis then runs over per-block
+# gen/kill bitsets (one bit per owned slot, Python ints as bitsets):
+#   live      declared and not yet released on some path
+#   released  released on some path
+# to a fixed point, after which each block is walked once to report.
+# Work is linear in instructions times loop nesting, and each bitset
+# operation covers every pointer of the function at once.
+
+from collections import deque
+from typing import List, Tuple
+
+from ir import (DECL, ELIF, ELSE, END, IF, LOOP, PARAM, POINTER, PSEUDO, RELEASE, SLOT_A_OPS,
+                SLOT_DST_OPS, WHILE, Function, Module)
+
+class CheckError(Exception):
+    # problems: [(pos, message)] sorted by position; str() is the first
+    def __init__(self, problems: List[Tuple[int, str]]):
+        super().__init__(problems[0][1])
+        self.problems = problems
+        self.pos = problems[0][0]
+
+# === Basic blocks ===
+
+class Blocks:
+    __slots__ = ('starts', 'ends', 'succs', 'preds')
+
+    def __init__(self):
+        self.starts, self.ends, self.succs, self.preds = [], [], [], []
+
+    def new(self, start: int) -> int:
+        self.starts.append(start)
+        self.ends.append(start)
+        self.succs.append([])
+        self.preds.append([])
+        return len(self.starts) - 1
+
+    def edge(self, src: int, dst: int):
+        self.succs[src].append(dst)
+        self.preds[dst].append(src)
+
+    def __len__(self):
+        return len(self.starts)
+
+def blocks_of(fn: Function) -> Blocks:
+    # Markers end a block. An IF frame is [kind, block whose condition is
+    # pending, has else, exits]; a loop frame is [kind, head, condition block].
+    blocks = Blocks()
+    cur = blocks.new(0)
+    stack = []
+    ops = fn.ops
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == IF:
+            blocks.ends[cur] = i + 1
+            stack.append(['if', cur, False, []])
+            nxt = blocks.new(i + 1)
+            blocks.edge(cur, nxt)
+        elif op == ELSE:
+            blocks.ends[cur] = i + 1
+            frame = stack[-1]
+            frame[3].append(cur)
+            frame[2] = True
+            nxt = blocks.new(i + 1)
+            blocks.edge(frame[1], nxt)
+        elif op == ELIF:
+            blocks.ends[cur] = i + 1
+            frame = stack[-1]
+            frame[1], frame[2] = cur, False
+            nxt = blocks.new(i + 1)
+            blocks.edge(cur, nxt)
+        elif op == LOOP:
+            blocks.ends[cur] = i + 1
+            nxt = blocks.new(i + 1)
+            blocks.edge(cur, nxt)
+            stack.append(['loop', nxt, nxt])
+        elif op == WHILE:
+            blocks.ends[cur] = i + 1
+            stack[-1][2] = cur
+            nxt = blocks.new(i + 1)
+            blocks.edge(cur, nxt)
+        elif op == END:
+            blocks.ends[cur] = i + 1
+            frame = stack.pop()
+            nxt = blocks.new(i + 1)
+            if frame[0] == 'loop':
+                blocks.edge(cur, frame[1])   # back edge
+                blocks.edge(frame[2], nxt)   # condition false
+            else:
+                for exit_ in frame[3] + [cur]:
+                    blocks.edge(exit_, nxt)
+                if not frame[2]:
+                    blocks.edge(frame[1], nxt)  # no else: condition false
+        else:
+            continue
+        cur = nxt
+    blocks.ends[cur] = len(ops)
+    return blocks
+
+# === Dataflow ===
+
+def check_function(module: Module, index: int, fn: Function, problems):
+    flags, funcs, names = module.slot_flags, module.slot_func, module.slot_names
+    ops, dst, a, pos = fn.ops, fn.dst, fn.a, fn.pos
+
+    # Owned pointers get a bit each; reads and pseudo uses are gathered in
+    # the same pass
+    bits = {}
+    decl_pos = {}
+    read = set()
+    touched = set()
+    for i in range(len(ops)):
+        op = ops[i]
+        if op in SLOT_A_OPS:
+            read.add(a[i])
+            touched.add(a[i])
+        elif op in SLOT_DST_OPS:
+            slot = dst[i]
+            touched.add(slot)
+            if op == DECL and flags[slot] & POINTER and not flags[slot] & PARAM \
+                    and funcs[slot] == index and slot not in bits:
+                bits[slot] = 1 << len(bits)
+                decl_pos[slot] = pos[i]
+
+    for slot in fn.params:
+        if flags[slot] & PSEUDO and slot not in touched:
+            fn.warnings.append(f"pseudo '{names[slot]}' was passed but never used")
+    for slot in bits:
+        if slot not in read:
+            problems.append((decl_pos[slot], f"pointer '{names[slot]}' is declared but never used"))
+    if not bits:
+        return
+
+    blocks = blocks_of(fn)
+    n = len(blocks)
+    # Per-block transfer: out = (in & ~kill) | gen, for live and released
+    live_gen, live_kill = [0] * n, [0] * n
+    rel_gen, rel_kill = [0] * n, [0] * n
+    for blk in range(n):
+        lg = lk = rg = rk = 0
+        for i in range(blocks.starts[blk], blocks.ends[blk]):
+            op = ops[i]
+            if op == DECL or op == RELEASE:
+                bit = bits.get(dst[i], 0)
+                if op == DECL:
+                    lg, lk, rg, rk = lg | bit, lk & ~bit, rg & ~bit, rk | bit
+                else:
+                    lg, lk, rg, rk = lg & ~bit, lk | bit, rg | bit, rk & ~bit
+        live_gen[blk], live_kill[blk], rel_gen[blk], rel_kill[blk] = lg, lk, rg, rk
+
+    live_in, rel_in = [0] * n, [0] * n
+    live_out = [live_gen[b] for b in range(n)]
+    rel_out = [rel_gen[b] for b in range(n)]
+    work = deque(range(n))
+    queued = [True] * n
+    while work:
+        blk = work.popleft()
+        queued[blk] = False
+        li = ri = 0
+        for p in blocks.preds[blk]:
+            li |= live_out[p]
+            ri |= rel_out[p]
+        live_in[blk], rel_in[blk] = li, ri
+        lo = (li & ~live_kill[blk]) | live_gen[blk]
+        ro = (ri & ~rel_kill[blk]) | rel_gen[blk]
+        if lo != live_out[blk] or ro != rel_out[blk]:
+            live_out[blk], rel_out[blk] = lo, ro
+            for s in blocks.succs[blk]:
+                if not queued[s]:
+                    queued[s] = True
+                    work.append(s)
+
+    # Report, walking each block once from its fixed-point entry state
+    released_anywhere = 0
+    for blk in range(n):
+        live, rel = live_in[blk], rel_in[blk]
+        for i in range(blocks.starts[blk], blocks.ends[blk]):
+            op = ops[i]
+            if op in SLOT_A_OPS:
+                slot = a[i]
+            elif op in SLOT_DST_OPS:
+                slot = dst[i]
+            else:
+                continue
+            bit = bits.get(slot)
+            if bit is None:
+                continue
+            name = names[slot]
+            if op == DECL:
+                live, rel = live | bit, rel & ~bit
+            elif op == RELEASE:
+                if rel & bit:
+                    what = 'is released twice' if not live & bit else 'may already be released'
+                    problems.append((pos[i], f"pointer '{name}' {what}"))
+                live, rel = live & ~bit, rel | bit
+                released_anywhere |= bit
+            elif rel & bit:
+                what = 'is used after its release' if not live & bit else 'may be used after its release'
+                problems.append((pos[i], f"pointer '{name}' {what}"))
+
+    leaked = live_out[n - 1]
+    for slot, bit in bits.items():
+        if leaked & bit:
+            what = 'is not released on every path' if released_anywhere & bit else 'is never released'
+            problems.append((decl_pos[slot], f"pointer '{names[slot]}' {what}"))
+
+def check(module: Module) -> List[Tuple[int, str]]:
+    # Ownership errors as (pos, message), in source order. Warnings are left
+    # on each function's warnings list for the emitters.
+    problems = []
+    for index, fn in enumerate(module.functions):
+        if not fn.external:
+            fn.warnings = []
+            check_function(module, index, fn, problems)
+    return sorted(set(problems))
@@ -0,0 +1,128 @@
+# compiler.py — In-process library API: a re-entrant, thread-safe Compiler.
+# Every compilation builds its own tokens, symbol table, AST, IR and emitter,
+# so any number can run at once from threads. What a Compiler keeps between
+# calls is shared on purpose: its lock guards the in-memory LRU of emitted
+# code and the statistics, and is never held across a compile or disk I/O.
+# The optional on-disk cache needs no lock: entries are written to a temp
+# file and moved into place with os.replace, and eviction tolerates files
+# that are already gone (its hit and miss counters may undercount). The
+# lexer's tables and the pipeline modules are loaded when the Compiler is
+# made, not on the first call.
+#
+#   compiler = Compiler(target='c', cache_dir='.dotcache')
+#   code = compiler.compile_string(source)
+#   compiler.compile_file('prog.dot', 'prog.c')
+#   outputs = await compiler.compile_many(sources, executor)
+#
+# compile_many runs compilations on an executor: the event loop's default
+# thread pool, or any concurrent.futures executor, including a process pool
+# (a Compiler pickles as its settings, so each worker process warms its own).
+
+import io
+import threading
+from collections import OrderedDict
+
+from cache import Cache
+
+MEMORY_ENTRIES = 512
+
+class CompileError(Exception):
+    # Source that didn't compile; the message has one 'name:line:col: error:'
+    # line per problem, also available as diagnostics
+    def __init__(self, message: str, name: str):
+        super().__init__(message)
+        self.name = name
+        self.diagnostics = message.splitlines()
+
+class Compiler:
+    def __init__(self, target: str = 'cpp', opt_level: int = 1, pool: bool = False,
+                 cache_dir: str = None, memory_entries: int = MEMORY_ENTRIES):
+        from dotc import __version__
+        self.target = target
+        self.opt_level = opt_level
+        self.pool = pool
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk = Cache(__version__, cache_dir) if cache_dir else None
+        self.memory = OrderedDict()  # (target, source) -> emitted code, most recent last
+        self.lock = threading.Lock()
+        self.stats = {'compiles': 0, 'memory_hits': 0, 'disk_hits': 0, 'errors': 0}
+        warm()
+
+    def __getstate__(self):
+        return (self.target, self.opt_level, self.pool, self.cache_dir, self.memory_entries)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def compile(self, code: str, name: str = '<source>', target: str = None):
+        # (emitted code, cached) for source text; raises CompileError
+        from dotc import compile_source, describe_error
+        target = target or self.target
+        key = (target, code)
+        with self.lock:
+            output = self.memory.get(key)
+            if output is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return output, True
+        out = io.StringIO()
+        try:
+            hit = compile_source(code, out, target, self.disk, opt_level=self.opt_level,
+                                 pool=self.pool)
+        except Exception as e:
+            with self.lock:
+                self.stats['errors'] += 1
+            raise CompileError(describe_error(name, code, e), name) from e
+        output = out.getvalue()
+        with self.lock:
+            self.stats['disk_hits' if hit else 'compiles'] += 1
+            self.memory[key] = output
+            if len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+        return output, hit
+
+    def compile_string(self, code: str, name: str = '<source>', target: str = None) -> str:
+        return self.compile(code, name, target)[0]
+
+    def compile_file(self, path: str, output: str = None, target: str = None) -> str:
+        # Emitted code for the file at path, also written to output if given;
+        # an output ending in .c selects the C target
+        from dotc import target_for
+        if target is None and output is not None:
+            target = target_for(output)
+        try:
+            with open(path, encoding='utf-8') as f:
+                code = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            raise CompileError(f"{path}: error: {getattr(e, 'strerror', None) or e}", path) from e
+        result = self.compile_string(code, path, target)
+        if output is not None:
+            try:
+                with open(output, 'w', encoding='utf-8') as f:
+                    f.write(result)
+            except OSError as e:
+                raise CompileError(f"{output}: error: {e.strerror}", path) from e
+        return result
+
+    async def compile_many(self, sources, executor=None, target: str = None,
+                           return_exceptions: bool = False):
+        # Emitted code for each source text, in order. Failures raise the
+        # first CompileError, or come back in place with return_exceptions.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(executor, self.compile_string, code, f"<source {i}>",
+                                        target)
+                   for i, code in enumerate(sources)]
+        return await asyncio.gather(*futures, return_exceptions=return_exceptions)
+
+def warm():
+    # Load the pipeline and build the lexer's lazily compiled tables now, so
+    # threads never race to initialise them
+    import check  # noqa: F401
+    import emitter  # noqa: F401
+    import ir  # noqa: F401
+    import opt  # noqa: F401
+    import parser  # noqa: F401
+    from lexer import bytes_pattern
+    bytes_pattern()
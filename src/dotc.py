@@ -1,272 +1,388 @@
-# dotc.py — Dot Language Compiler (Tokenizer → AST → C++ Emitter)
-
-import re
-
-class Token:
-    def __init__(self, type, value):
-        self.type = type
-        self.value = value
-    def __repr__(self):
-        return f"Token({self.type}, {self.value})"
-
-rules = [
-    ('TYPE',     r'\$_|i~|i_\d*|f_|s_|c_|sh_|l_|ll_'),
-    ('KEYWORD',  r'\b(set|struct|if|elif|else|while|when|except)\b'),
-    ('NUMBER',   r'\d+(\.\d+)?'),
-    ('IDENT',    r'[a-zA-Z_]\w*'),
-    ('GLYPH',    r'[\"\'@\\\$\.\{\}\(\)]'),
-    ('COMPARE',  r'==|!=|<=|>=|<|>'),
-    ('ASSIGN',   r'='),
-    ('END',      r';|:|,'),
-    ('SKIP',     r'\s+'),
-]
-
-def tokenize(code):
-    tokens = []
-    pattern = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in rules)
-    regex = re.compile(pattern)
-    for match in regex.finditer(code):
-        kind = match.lastgroup
-        value = match.group()
-        if kind != 'SKIP':
-            tokens.append(Token(kind, value))
-    return tokens
-
-# Parser stub with AST support
-class Node: pass
-class Assignment(Node):
-    def __init__(self, target, value): self.target, self.value = target, value
-class Declaration(Node):
-    def __init__(self, dtype, name): self.dtype, self.name = dtype, name
-class PrintStmt(Node):
-    def __init__(self, parts): self.parts = parts
-class FunctionCall(Node):
-    def __init__(self, target, args): self.target, self.args = target, args
-class StructInstance(Node):
-    def __init__(self, struct_type, name, values): self.struct_type, self.name, self.values = struct_type, name, values
-class ControlFlow(Node):
-    def __init__(self, kind, condition, body): self.kind, self.condition, self.body = kind, condition, body
-class StructDef(Node):
-    def __init__(self, name, fields): self.name, self.fields = name, fields
-class SetFunction(Node):
-    def __init__(self, name, params, body): self.name, self.params, self.body = name, params, body
-class SetGroup(Node):
-    def __init__(self, name, functions): self.name, self.functions = name, functions
-
-class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
-
-    def peek(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
-
-    def advance(self):
-        tok = self.peek()
-        self.pos += 1
-        return tok
-
-    def parse(self):
-        return []  # Minimal stub for now
-
-def parse(tokens):
-    parser = Parser(tokens)
-    return type('AST', (), {'body': parser.parse()})()
-
-# === Expression Rewriter ===
-def rewrite_expr(expr, pseudo_vars=None):
-    if pseudo_vars is None:
-        pseudo_vars = set()
-
-    tokens = re.findall(r'\w+@\([^)]*\)|\w+@\w+|\w+@|\w+"?\w*|\^|\*|/|\+|\-|\(|\)', expr)
-
-    def to_cpp(token):
-        if '@' in token:
-            if token.endswith('@'):
-                return token[:-1]
-            base, idx = token.split('@', 1)
-            if idx.startswith('(') and idx.endswith(')'):
-                return f"{base}[{idx[1:-1]}]"
-            return f"{base}[{idx}]"
-        if '"' in token:
-            var, index = token.split('"')
-            if var in pseudo_vars:
-                raise Exception(f"Illegal: pseudo '{var}' cannot be dereferenced with \". Use {var}@ instead.")
-            return f"{var}[{index}]"
-        return token
-
-    precedence = {'^': 3, '*': 2, '/': 2, '+': 1, '-': 1}
-
-    def parse_expression(tokens):
-        def parse_primary(i):
-            token = tokens[i]
-            if token == '(': expr, i = parse_subexpr(i + 1); return f"({expr})", i + 1
-            return to_cpp(token), i + 1
-
-        def parse_subexpr(i, min_prec=0):
-            lhs, i = parse_primary(i)
-            while i < len(tokens):
-                op = tokens[i]
-                if op not in precedence or precedence[op] < min_prec:
-                    break
-                prec = precedence[op] + 1
-                rhs, i = parse_subexpr(i + 1, prec)
-                lhs = f"pow({lhs}, {rhs})" if op == '^' else f"{lhs} {op} {rhs}"
-            return lhs, i
-
-        result, _ = parse_subexpr(0)
-        return result
-
-    return parse_expression(tokens)[0]
-
-# === Remaining compiler logic already defined in ast.body walker ===
-# (emit_cpp, dot_type_to_cpp, etc. as already in the file)
-
-
-def emit_cpp(ast):
-    global array_sizes
-    array_sizes = {}  # Track declared arrays and their sizes
-    lines = ["#include <iostream>", "#include <cmath>", "using namespace std;"]
-    main_lines = []
-
-    for node in ast.body:
-        if isinstance(node, Declaration):
-            if node.dtype.startswith('i_') and node.dtype[2:].isdigit():
-                size = int(node.dtype[2:])
-                array_sizes[node.name] = size
-                main_lines.append(f"    int {node.name}[{size}];")
-            elif node.dtype == 'i~':
-                main_lines.append(f"    int* {node.name} = new int;")
-            else:
-                main_lines.append(f"    {dot_type_to_cpp(node.dtype)} {node.name} = {node.value};")
+# dotc.py — Dot Language Compiler (Tokenizer → Parser → IR → Passes → C/C++ Emitter)
+# Startup is kept minimal: the pipeline modules are imported on first use,
+# so --version, --help and cache hits never load the lexer, parser, IR or
+# emitters. benchmarks/bench_startup.py checks this.
+
+import os
+
+from cache import DEFAULT_DIR, Cache
+
+__version__ = '0.1.0-alpha'
+
+# Sources at least this large are memory-mapped and lexed as bytes in place
+MMAP_THRESHOLD = 1 << 20
+
+def target_for(output):
+    return 'c' if output.endswith('.c') else 'cpp'
+
+class NoPhase:
+    # Stands in for timing.Phase when nothing is being measured
+    __slots__ = ()
+
+    def __init__(self, name):
+        pass
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+def compile_source(code, out, target='cpp', cache=None, imports=None, entry=True, opt_level=1,
+                   pool=False, timings=None):
+    # Compile Dot source (text, bytes or an mmap) into the stream out; returns
+    # True on a cache hit. imports and entry are set by the .dotbuild driver
+    # for linked modules; opt_level 0 skips the IR passes; pool routes heap
+    # allocations through the emitted slab allocator; a timing.FileTimings
+    # records every phase.
+    phase = NoPhase if timings is None else timings.phase
+    key = None
+    if cache is not None:
+        with phase('cache'):
+            context = f"O{opt_level}{' pool' if pool else ''}"
+            if imports is not None or not entry:
+                import json
+                context += json.dumps([imports, entry], sort_keys=True)
+            key = cache.key(code, target, context)
+            cached = cache.get(key)
+        if cached is not None:
+            out.write(cached)
+            if timings is not None:
+                timings.cached = True
+                timings.counts.update(bytes=len(code), output=len(cached))
+            return True
+
+    import io
+
+    from check import CheckError, check
+    from emitter import emit
+    from ir import lower
+    from lexer import tokenize_buffer
+    from parser import parse
+
+    with phase('tokenize'):
+        tokens = tokenize_buffer(code)
+    with phase('parse'):
+        ast = parse(tokens)
+    with phase('lower'):
+        module = lower(ast, imports)
+    with phase('check'):
+        problems = check(module)
+    if problems:
+        raise CheckError(problems)
+    if opt_level:
+        from opt import optimize
+        with phase('opt'):
+            manager = optimize(module)
+
+    if cache is None and timings is None:
+        emit(module, out, target, entry, pool)
+        return False
+    buf = io.StringIO()
+    with phase('emit'):
+        emit(module, buf, target, entry, pool)
+        output = buf.getvalue()
+        out.write(output)
+    if cache is not None:
+        with phase('store'):
+            cache.put(key, output)
+    if timings is not None:
+        from timing import count_nodes
+        timings.counts.update(bytes=len(code), tokens=len(tokens), nodes=count_nodes(ast),
+                              ir=sum(len(fn) for fn in module.functions), output=len(output))
+        if opt_level:
+            timings.passes = dict(manager.times)
+    return False
+
+def error_location(code, exc):
+    # (line, col) for parser, lowering, ownership and VM errors, None otherwise
+    from check import CheckError
+    from ir import LoweringError
+    from parser import ParseError
+    if isinstance(exc, ParseError):
+        return exc.line, exc.col
+    if isinstance(exc, (LoweringError, CheckError)):
+        return offset_location(code, exc.pos)
+    if type(exc).__name__ == 'VMError':  # Only dotc run imports the VM
+        return offset_location(code, exc.pos)
+    return None
+
+def offset_location(code, pos):
+    # 1-based (line, col); col counts characters, in bytes sources too
+    if isinstance(code, str):
+        line_start = code.rfind('\n', 0, pos) + 1
+        return code.count('\n', 0, pos) + 1, pos - line_start + 1
+    line_start = code.rfind(b'\n', 0, pos) + 1
+    col = len(bytes(code[line_start:pos]).decode('utf-8', 'replace'))
+    return code[:pos].count(b'\n') + 1, col + 1
+
+def describe_error(name, code, exc):
+    # 'name:line:col: error: message', one line per problem
+    problems = getattr(exc, 'problems', None)
+    if problems:
+        return '\n'.join(f"{name}:{line}:{col}: error: {message}"
+                         for line, col, message in ((*offset_location(code, pos), message)
+                                                    for pos, message in problems))
+    loc = error_location(code, exc)
+    where = f"{name}:{loc[0]}:{loc[1]}" if loc else name
+    return f"{where}: error: {getattr(exc, 'message', exc)}"
+
+def read_source(path):
+    # Small files are read as text; large ones are mapped, so only the pages
+    # the lexer touches are read and the source is never copied into a str
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return f.read().decode('utf-8')
+        import mmap
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def compile_file(path, output, target, cache_dir=None, imports=None, entry=True, opt_level=1,
+                 pool=False, timings=False):
+    # Worker entry point: returns (path, output, cache hit, diagnostic or None,
+    # timing.FileTimings when timings is set, else None)
+    if not timings:
+        return (*compile_path(path, output, target, cache_dir, imports, entry, opt_level, pool), None)
+    from timing import FileTimings
+    with FileTimings(path) as measured:
+        result = compile_path(path, output, target, cache_dir, imports, entry, opt_level, pool,
+                              measured)
+    return (*result, measured)
+
+def compile_path(path, output, target, cache_dir, imports, entry, opt_level, pool, timings=None):
+    # (path, output, cache hit, diagnostic or None)
+    try:
+        with NoPhase('read') if timings is None else timings.phase('read'):
+            code = read_source(path)
+    except (OSError, UnicodeDecodeError) as e:
+        return path, output, False, f"{path}: error: {getattr(e, 'strerror', None) or e}"
+    cache = Cache(__version__, cache_dir) if cache_dir else None
+    try:
+        with open(output, 'w', encoding='utf-8') as f:
+            hit = compile_source(code, f, target, cache, imports, entry, opt_level, pool, timings)
+    except Exception as e:
+        try:
+            os.unlink(output)  # Don't leave a truncated translation behind
+        except OSError:
+            pass
+        return path, output, False, describe_error(path, code, e)
+    finally:
+        if not isinstance(code, str):
+            code.close()
+    return path, output, hit, None
+
+def find_sources(paths):
+    # Expand directories into their .dot files, keeping command-line order.
+    # Returns (path, path relative to the directory it was found under).
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith('.dot'):
+                        full = os.path.join(root, name)
+                        sources.append((full, os.path.relpath(full, path)))
+        else:
+            sources.append((path, os.path.basename(path)))
+    return sources
+
+def compile_files(jobs, workers, cache_dir, opt_level=1, pool=False, timings=False):
+    # jobs: [(path, output, target, [imports, entry])]; results come back in job order.
+    # The pool is fed largest-first so the biggest file starts immediately.
+    if workers <= 1 or len(jobs) <= 1:
+        return [compile_file(path, output, target, cache_dir, *rest, opt_level=opt_level, pool=pool,
+                             timings=timings)
+                for path, output, target, *rest in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    def size(job):
+        try:
+            return os.path.getsize(job[0])
+        except OSError:
+            return 0
+
+    order = sorted(range(len(jobs)), key=lambda i: -size(jobs[i]))
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {i: executor.submit(compile_file, *jobs[i][:3], cache_dir, *jobs[i][3:],
+                                      opt_level=opt_level, pool=pool, timings=timings)
+                   for i in order}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results
+
+def time_report(timings, json_path):
+    # Table on stderr; JSON to json_path as well when one is given
+    import sys
 
-        elif isinstance(node, Dealloc):
-            if node.var.startswith('~'):
-                main_lines.append(f"    delete {node.var[1:]};")
-            else:
-                main_lines.append(f"    // {node.var} released (stack)")
-
-        elif isinstance(node, PrintStmt):
-            parts = ' << '.join(f'"{p}"' if not p.isidentifier() else p for p in node.parts)
-            main_lines.append(f"    cout << {parts} << endl;")
-
-        elif isinstance(node, FunctionCall):
-            args = ', '.join(rewrite_expr(arg) for arg in node.args)
-            main_lines.append(f"    {node.target}({args});")
-
-        elif isinstance(node, StructInstance):
-            args = ', '.join(rewrite_expr(arg) for arg in node.values)
-            main_lines.append(f"    {node.struct_type} {node.name} = {{{args}}};")
-
-        elif isinstance(node, ControlFlow):
-            condition = rewrite_expr(node.condition)
-            main_lines.append(f"    {node.kind} ({condition}) {{")
-            for stmt in node.body:
-                if isinstance(stmt, str):
-                    main_lines.append(f"        {stmt};")
-                elif isinstance(stmt, FunctionCall):
-                    args = ', '.join(rewrite_expr(arg) for arg in stmt.args)
-                    main_lines.append(f"        {stmt.target}({args});")
-                elif isinstance(stmt, Assignment):
-                    lhs = rewrite_expr(stmt.target)
-                    rhs = rewrite_expr(stmt.value)
-                    main_lines.append(f"        {lhs} = {rhs};")
-                elif isinstance(stmt, PrintStmt):
-                    parts = ' << '.join(f'"{p}"' if not p.isidentifier() else p for p in stmt.parts)
-                    main_lines.append(f"        cout << {parts} << endl;")
-            main_lines.append("    }")
-
-        elif isinstance(node, StructDef):
-            fields = '\n'.join(f"    {dot_type_to_cpp(dtype)} {name};" for dtype, name in node.fields)
-            lines.append(f"struct {node.name} {{\n{fields}\n}};")
-
-        elif isinstance(node, SetGroup):
-            lines.append(f"namespace {node.name} {{")
-
-            if '_' in node.name:
-                base, dim = node.name.split('_', 1)
-                for fn in node.functions:
-                    for t, _ in fn.params:
-                        if dim.isdigit():
-                            expected_type = f"{base}_{dim}"
-                            if t != expected_type:
-                                raise Exception(f"Function param type '{t}' does not match set constraint '{expected_type}'")
-                        elif dim == '':
-                            if not t.startswith(base + '_'):
-                                raise Exception(f"Function param type '{t}' not allowed in loosely-typed set_{base}_")
-
-            for fn in node.functions:
-                pseudo_vars = set()
-                used_pseudos = set()
-                params = []
-                for t, n in fn.params:
-                    name = n.strip('@')
-                    if '@' in n:
-                        pseudo_vars.add(name)
-                    if t.startswith('i_') and t[2:].isdigit():
-                        size = int(t[2:])
-                        params.append(f"int (&{name})[{size}]")
-                    else:
-                        params.append(f"{dot_type_to_cpp(t)}& {name}")
-                params = ', '.join(params)
-
-                lines.append(f"    void {fn.name}({params}) {{")
-                for stmt in fn.body:
-                    if isinstance(stmt, PrintStmt):
-                        parts = ' << '.join(f'"{p}"' if not p.isidentifier() else p for p in stmt.parts)
-                        lines.append(f"        cout << {parts} << endl;")
-                    elif isinstance(stmt, FunctionCall):
-                        args = ', '.join(rewrite_expr(arg, pseudo_vars) for arg in stmt.args)
-                        lines.append(f"        {stmt.target}({args});")
-                    elif isinstance(stmt, Assignment):
-                        lhs = rewrite_expr(stmt.target, pseudo_vars)
-                        rhs = rewrite_expr(stmt.value, pseudo_vars)
-                        lines.append(f"        {lhs} = {rhs};")
-                        # mark pseudo as used
-                        for pv in pseudo_vars:
-                            if pv in stmt.target or pv in stmt.value:
-                                used_pseudos.add(pv)
-                unused = pseudo_vars - used_pseudos
-                for pv in unused:
-                    lines.append(f"        // Warning: pseudo '{pv}' was passed but never used")
-                lines.append("    }")
-            lines.append("}")
-
-    lines.append("int main() {")
-    lines.extend(main_lines)
-    lines.append("    return 0;\n}")
-    return '\n'.join(lines)
-
-class StructInstance:
-    def __init__(self, struct_type, name, values):
-        self.struct_type = struct_type
-        self.name = name
-        self.values = values
-
-def dot_type_to_cpp(dtype):
-    return {
-        'i_': 'int', 'f_': 'float', 's_': 'string', 'c_': 'char',
-        'sh_': 'short', 'l_': 'long', 'll_': 'long long'
-    }.get(dtype, dtype)
+    from timing import table, to_json
+    print(table(timings), file=sys.stderr)
+    if json_path:
+        import json
+        text = json.dumps(to_json(timings, __version__), indent=2)
+        if json_path == '-':
+            print(text)
+        else:
+            with open(json_path, 'w') as f:
+                f.write(text + '\n')
+
+def run_program(argv):
+    # dotc run: execute a program in the bytecode VM, no C/C++ toolchain
+    import argparse
+    import sys
+    ap = argparse.ArgumentParser(prog='dotc run', description='run a Dot program in the bytecode VM')
+    ap.add_argument('input', help='.dot source file')
+    ap.add_argument('-O', dest='opt_level', type=int, choices=(0, 1), default=1,
+                    help='-O0 runs the IR as lowered (default: -O1)')
+    ap.add_argument('--vectorize', choices=('auto', 'lists', 'off'), default='auto',
+                    help='whole-array loop kernels: NumPy when installed (auto), '
+                         'plain lists, or off (default: auto)')
+    ap.add_argument('--native', action='store_true',
+                    help='compile to a shared object with the C compiler ($CC or cc), cached, '
+                         'and run it in-process instead of in the VM')
+    ap.add_argument('--heap', choices=('system', 'pool'), default='system',
+                    help='allocator for heap pointers with --native (default: system)')
+    ap.add_argument('--cache-dir', default=DEFAULT_DIR,
+                    help=f'where --native keeps shared objects (default: {DEFAULT_DIR})')
+    args = ap.parse_args(argv)
+    try:
+        code = read_source(args.input)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"{args.input}: error: {getattr(e, 'strerror', None) or e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        if args.native:
+            import native
+            status = native.load(code, args.cache_dir, args.opt_level, args.heap == 'pool').main()
+            if status:
+                sys.exit(status)
+        else:
+            from vm import run_source
+            run_source(code, sys.stdout, args.opt_level, args.vectorize)
+    except Exception as e:
+        sys.stdout.flush()
+        print(describe_error(args.input, code, e), file=sys.stderr)
+        sys.exit(1)
 
 # === CLI Entry Point ===
 def main():
     import sys
-    if len(sys.argv) < 2:
-        print("Usage: dotc <input.dot> [-o output.cpp]")
+    if sys.argv[1:] == ['--version']:
+        print(f'dotc {__version__}')  # Answered before argparse is even imported
         return
-
-    with open(sys.argv[1], 'r') as f:
-        code = f.read()
-
-    tokens = tokenize(code)
-    ast = parse(tokens)
-    cpp = emit_cpp(ast)
-
-    output = sys.argv[3] if len(sys.argv) == 4 and sys.argv[2] == "-o" else "out.cpp"
-    with open(output, 'w') as f:
-        f.write(cpp)
-    print(f"Compiled to {output}")
+    if sys.argv[1:2] == ['run']:
+        run_program(sys.argv[2:])
+        return
+    import argparse
+    ap = argparse.ArgumentParser(prog='dotc', description='Dot language compiler')
+    ap.add_argument('inputs', nargs='*', metavar='input', help='.dot source files or directories')
+    ap.add_argument('--build', nargs='?', const='.dotbuild', metavar='DOTBUILD',
+                    help='build the project described by a .dotbuild file, recompiling only '
+                         'what changed (default: ./.dotbuild)')
+    ap.add_argument('--serve', nargs='?', const='', metavar='SOCKET',
+                    help='run as a compile server on a Unix socket; compile through it with '
+                         'python src/server.py (default socket: $DOTC_SOCKET or a per-user temp path)')
+    ap.add_argument('-o', dest='output',
+                    help='output file for a single input; a .c extension selects the C target '
+                         '(default: out.cpp)')
+    ap.add_argument('--out-dir', help='directory for outputs when compiling several files '
+                                      '(default: next to each source)')
+    ap.add_argument('--target', choices=('cpp', 'c'), help='output language (default: cpp)')
+    ap.add_argument('-O', dest='opt_level', type=int, choices=(0, 1), default=1,
+                    help='-O0 emits the IR as lowered; -O1 runs constant folding, copy '
+                         'propagation, unreachable-branch and dead-store removal (default)')
+    ap.add_argument('--heap', choices=('system', 'pool'),
+                    help="allocator for heap pointers: 'system' uses new/delete (malloc/free in C), "
+                         "'pool' emits a slab allocator with per-size free lists (default: system, "
+                         "or the .dotbuild heap with --build)")
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                    help='compile this many files in parallel (default: one per core)')
+    ap.add_argument('--no-cache', action='store_true', help='always recompile from scratch')
+    ap.add_argument('--cache-dir', default=DEFAULT_DIR, help=f'cache directory (default: {DEFAULT_DIR})')
+    ap.add_argument('--time-report', nargs='?', const='', metavar='JSON',
+                    help='report wall time, allocations (tracemalloc) and token, AST node and IR '
+                         'counts per phase and per file on stderr; with a path, also write the '
+                         'report there as JSON (- for stdout)')
+    ap.add_argument('--profile', metavar='PSTATS',
+                    help='run the compiler under cProfile and dump the stats to this file, '
+                         'for python -m pstats; implies -j 1')
+    ap.add_argument('--version', action='version', version=f'dotc {__version__}')
+    args = ap.parse_args()
+    if args.profile is None:
+        run(ap, args)
+        return
+    import cProfile
+    args.jobs = 1  # Worker processes would go unprofiled
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(run, ap, args)
+    finally:
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}", file=sys.stderr)
+
+def run(ap, args):
+    import sys
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    if args.serve is not None:
+        if args.time_report is not None:
+            ap.error('--time-report measures compiles; ask a running server for stats instead')
+        from server import DEFAULT_SOCKET, serve
+        serve(args.serve or DEFAULT_SOCKET, cache_dir, opt_level=args.opt_level,
+              pool=args.heap == 'pool')
+        return
+    if args.build:
+        from build import BuildError, build
+        if args.inputs or args.output or args.out_dir or args.target:
+            ap.error('--build takes its inputs and outputs from the .dotbuild file')
+        timings = None if args.time_report is None else []
+        try:
+            ok = build(args.build, args.jobs, cache_dir, timings=timings, opt_level=args.opt_level,
+                       heap=args.heap)
+        except BuildError as e:
+            print(f"error: {e}", file=sys.stderr)
+            ok = False
+        if timings is not None:
+            time_report(timings, args.time_report)
+        sys.exit(0 if ok else 1)
+    if not args.inputs:
+        ap.error('no inputs given')
+
+    sources = find_sources(args.inputs)
+    if not sources:
+        ap.error('no .dot files found')
+    if args.output and len(sources) > 1:
+        ap.error('-o needs a single input; use --out-dir for several')
+
+    single = len(args.inputs) == 1 and not os.path.isdir(args.inputs[0]) and not args.out_dir
+    jobs = []
+    for path, rel in sources:
+        if args.output or single:
+            output = args.output or 'out.cpp'
+            target = args.target or target_for(output)
+        else:
+            target = args.target or 'cpp'
+            if args.out_dir:
+                output = os.path.join(args.out_dir, os.path.splitext(rel)[0] + '.' + target)
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+            else:
+                output = os.path.splitext(path)[0] + '.' + target
+        jobs.append((path, output, target))
+
+    failed = 0
+    results = compile_files(jobs, args.jobs, cache_dir, args.opt_level, args.heap == 'pool',
+                            args.time_report is not None)
+    if args.time_report is not None:
+        time_report([result[4] for result in results], args.time_report)
+    for path, output, hit, diagnostic, _ in results:
+        if diagnostic:
+            failed += 1
+            print(diagnostic, file=sys.stderr)
+        else:
+            print(f"Compiled {path} to {output}{' (cached)' if hit else ''}")
+    if failed:
+        print(f"{failed} of {len(jobs)} file(s) failed", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -1 +1,797 @@
-# future emitter
\ No newline at end of file
+# emitter.py — Code generation backends for Dot.
+# An Emitter walks an ir.Module and writes source text straight into a
+# stream (a file or io.StringIO), tracking indentation as it goes, so the
+# translation is never held in memory as a list of lines. Temporaries are
+# inlined back into expressions at their single use; parentheses follow the
+# parser's binding powers. Targets subclass Emitter and override the hooks.
+#
+# Counted loops (`i = c; while(i < n){ ...; i = i + 1 }`) come out as `for`
+# loops, and in the entry module, where every call site is visible, the
+# by-reference parameters of functions that are never passed the same
+# storage twice are marked __restrict. Together these give C/C++ compilers
+# the trip count and the no-alias guarantee they need to vectorize.
+#
+# With pool=True, heap allocations go through a small emitted slab
+# allocator (POOL_RUNTIME) instead of new/delete or malloc/free.
+
+import io
+from typing import TextIO
+
+import ir
+from ir import (ADD, ADDR, ARG, ARRAY, CALL, CONST, DECL, ELIF, ELSE, END, HEAP, IF, LE, LOAD,
+                LOADIDX, LOADMEM, LOOP, LT, NEG, PARAM, POINTER, POW, PRINT, PSEUDO, PURE_OPS,
+                RELEASE, SLOT_A_OPS, SLOT_DST_OPS, STACK, STORE, STOREIDX, STOREMEM, STRUCT, WHILE,
+                base_type)
+from parser import INFIX, PREFIX_BP
+
+ATOM_BP = 100
+
+# Binding power of each binary opcode, from the parser's INFIX table
+OP_BP = {code: INFIX[op][0] for code, op in ir.BINARY_SYMBOLS.items()}
+
+CPP_TYPES = {
+    'i': 'int', 'f': 'float', 'd': 'double', 's': 'string', 'c': 'char',
+    'sh': 'short', 'l': 'long', 'll': 'long long', '$': 'auto',
+}
+
+C_TYPES = dict(CPP_TYPES, s='const char*', **{'$': 'int'})
+
+PRINTF_FORMATS = {
+    'i': '%d', 'f': '%g', 'd': '%g', 's': '%s', 'c': '%c', 'sh': '%hd', 'l': '%ld', 'll': '%lld',
+}
+
+def dot_type_to_cpp(dtype: str) -> str:
+    return CPP_TYPES.get(base_type(dtype), dtype)
+
+class Emitter:
+    indent_unit = '    '
+
+    def __init__(self, out: TextIO, pool: bool = False):
+        self.out = out
+        self.depth = 0
+        self.module = None
+        self.pool = pool
+
+    # --- Output ---
+
+    def line(self, text: str = ''):
+        write = self.out.write
+        if text:
+            write(self.indent_unit * self.depth)
+            write(text)
+        write('\n')
+
+    def indent(self):
+        self.depth += 1
+
+    def dedent(self):
+        self.depth -= 1
+
+    # --- Module ---
+
+    def emit(self, module: ir.Module, entry: bool = True):
+        # entry=False leaves out main(), for modules linked into another
+        self.module = module
+        self.callees = {fn.name: fn for fn in module.functions}
+        self.restrict = unaliased(module) if entry else set()
+        self.spell(module)
+        self.header()
+        for name, fields in module.structs.items():
+            self.struct(name, fields)
+        group = ''
+        for fn in module.functions[1:]:
+            if fn.group != group:
+                if group:
+                    self.close_group(group)
+                group = fn.group
+                if group:
+                    self.open_group(group)
+            self.function(fn)
+        if group:
+            self.close_group(group)
+        if entry:
+            self.main(module.functions[0])
+
+    def spell(self, module: ir.Module):
+        # Emitted name and base type of every slot, worked out once per
+        # symbol or type rather than at each use
+        spelled, bases = {}, {}
+        names = self.names = []
+        kinds = self.kinds = []
+        for slot, sym in enumerate(module.slot_syms):
+            name = spelled.get(sym)
+            if name is None:
+                name = spelled[sym] = self.spell_name(module.symbols.names[sym])
+            names.append(name)
+            dtype = module.slot_types[slot]
+            kind = bases.get(dtype)
+            if kind is None:
+                kind = bases[dtype] = base_type(dtype)
+            kinds.append(kind)
+
+    def open_group(self, group: str):
+        pass
+
+    def close_group(self, group: str):
+        pass
+
+    def function(self, fn: ir.Function):
+        restrict = fn in self.restrict
+        params = ', '.join(self.param(slot, restrict) for slot in fn.params)
+        if fn.external:
+            self.line(f"void {self.function_name(fn)}({params});")
+            return
+        self.line(f"void {self.function_name(fn)}({params}) {{")
+        self.indent()
+        self.body(fn)
+        for warning in fn.warnings:
+            self.line(f"// Warning: {warning}")
+        self.dedent()
+        self.line('}')
+
+    def main(self, fn: ir.Function):
+        raise NotImplementedError
+
+    # --- Instruction walk ---
+
+    def body(self, fn: ir.Function):
+        module = self.module
+        consts = module.consts
+        ops, dst, a, b = fn.ops, fn.dst, fn.a, fn.b
+        vals = [None] * fn.ntemps   # temp -> (text, binding power, base type)
+        lvals = [None] * fn.ntemps  # temp -> lvalue text, for loads
+        addrs = set()               # temps holding 'x references
+        slots = {}                  # temp -> slot, for loads and references
+        args, parts = [], []
+        heads, skip, held = {}, set(), {}  # WHILE -> its counted loop; folded into for headers
+        for loop in counted_loops(module, fn):
+            heads[loop.head] = loop
+            skip.add(loop.step_at)
+            if loop.init_at >= 0:
+                skip.add(loop.init_at)
+        n = len(ops)
+        for i in range(n):
+            op = ops[i]
+            if op == CONST:
+                value = consts[a[i]]
+                vals[dst[i]] = (self.literal(value), ATOM_BP, literal_type(value))
+            elif op == LOAD:
+                vals[dst[i]] = self.load(a[i])
+                lvals[dst[i]] = vals[dst[i]][0]
+                slots[dst[i]] = a[i]
+            elif op == LOADIDX:
+                text = f"{self.name(a[i])}[{vals[b[i]][0]}]"
+                vals[dst[i]] = (text, ATOM_BP, self.kinds[a[i]])
+                lvals[dst[i]] = text
+            elif op == LOADMEM:
+                text = self.member(a[i], consts[b[i]])
+                vals[dst[i]] = (text, ATOM_BP, self.field_type(a[i], consts[b[i]]))
+                lvals[dst[i]] = text
+            elif op == ADDR:
+                vals[dst[i]] = self.addr(a[i])
+                addrs.add(dst[i])
+                slots[dst[i]] = a[i]
+            elif op == NEG:
+                vals[dst[i]] = (f"-{wrap(vals[a[i]], PREFIX_BP)}", PREFIX_BP, vals[a[i]][2])
+            elif op == POW:
+                vals[dst[i]] = (f"pow({vals[a[i]][0]}, {vals[b[i]][0]})", ATOM_BP, 'd')
+            elif op in OP_BP:
+                bp = OP_BP[op]
+                left, right = vals[a[i]], vals[b[i]]
+                kind = 'i' if bp == INFIX['=='][0] else numeric_type(left[2], right[2])
+                text = f"{wrap(left, bp)} {ir.BINARY_SYMBOLS[op]} {wrap(right, bp + 1)}"
+                vals[dst[i]] = (text, bp, kind)
+            elif op == STORE:
+                if i in skip:
+                    held[i] = vals[a[i]]
+                    continue
+                self.line(f"{self.lvalue(dst[i])} = {vals[a[i]][0]};")
+            elif op == STOREIDX:
+                self.line(f"{self.name(dst[i])}[{vals[a[i]][0]}] = {vals[b[i]][0]};")
+            elif op == STOREMEM:
+                self.line(f"{self.member(dst[i], consts[a[i]])} = {vals[b[i]][0]};")
+            elif op == DECL:
+                if i in skip:
+                    held[i] = vals[a[i]]
+                    continue
+                self.decl(dst[i], vals[a[i]] if a[i] >= 0 else None)
+            elif op == RELEASE:
+                self.release(dst[i])
+            elif op == PRINT:
+                parts.append(vals[a[i]])
+                if b[i]:
+                    self.print(parts)
+                    parts = []
+            elif op == ir.ARG:
+                args.append((vals[a[i]], lvals[a[i]], a[i] in addrs, slots.get(a[i], -1)))
+            elif op == CALL:
+                self.call(consts[a[i]], args)
+                args = []
+            elif op == IF:
+                self.line(f"if ({vals[a[i]][0]}) {{")
+                self.indent()
+            elif op == ELSE:
+                j = i + 1
+                while j < n and ops[j] in PURE_OPS:
+                    j += 1
+                if j < n and ops[j] == ELIF:
+                    continue  # Folded into the ELIF's '} else if'
+                self.dedent()
+                self.line('} else {')
+                self.indent()
+            elif op == ELIF:
+                self.dedent()
+                self.line(f"}} else if ({vals[a[i]][0]}) {{")
+                self.indent()
+            elif op == LOOP:
+                pass  # The condition follows, then WHILE
+            elif op == WHILE:
+                loop = heads.get(i)
+                if loop is None:
+                    self.line(f"while ({vals[a[i]][0]}) {{")
+                else:
+                    self.line(f"for ({self.loop_init(loop, held)}; {vals[a[i]][0]}; "
+                              f"{self.loop_step(loop)}) {{")
+                self.indent()
+            elif op == END:
+                self.dedent()
+                self.line('}')
+
+    # --- Target hooks ---
+
+    def header(self):
+        pass
+
+    def pooled(self) -> bool:
+        # Whether this module allocates anything through the pool
+        return False
+
+    def runtime(self):
+        for text in POOL_RUNTIME:
+            self.line(text)
+
+    def struct(self, name, fields):
+        raise NotImplementedError
+
+    def function_name(self, fn: ir.Function) -> str:
+        return fn.name.split('.')[-1]
+
+    def spell_name(self, name: str) -> str:
+        # ~point, the heap twin of point, becomes point_heap
+        return name[1:] + '_heap' if name[0] == '~' else name
+
+    def name(self, slot: int) -> str:
+        return self.names[slot]
+
+    def literal(self, value) -> str:
+        if isinstance(value, str):
+            return '"' + value + '"'
+        return repr(value)
+
+    def loop_init(self, loop, held) -> str:
+        if loop.init_at < 0:
+            return ''
+        value = held[loop.init_at][0]
+        if loop.scoped:
+            return f"{self.ctype(loop.slot)} {self.name(loop.slot)} = {value}"
+        return f"{self.lvalue(loop.slot)} = {value}"
+
+    def loop_step(self, loop) -> str:
+        target = self.lvalue(loop.slot)
+        return f"++{target}" if loop.step == 1 else f"{target} += {loop.step}"
+
+    def field_type(self, slot: int, field: str) -> str:
+        for dtype, name in self.module.structs.get(self.module.slot_types[slot], ()):
+            if name == field:
+                return base_type(dtype)
+        return 'i'
+
+def literal_type(value) -> str:
+    if isinstance(value, str):
+        return 's'
+    return 'd' if isinstance(value, float) else 'i'
+
+def numeric_type(left: str, right: str) -> str:
+    if 'd' in (left, right):
+        return 'd'
+    if 'f' in (left, right):
+        return 'f'
+    return left
+
+def wrap(val, min_bp: int) -> str:
+    text, bp, _ = val
+    return f"({text})" if bp < min_bp else text
+
+# === Loops and aliasing ===
+
+class CountedLoop:
+    __slots__ = ('head', 'slot', 'step', 'step_at', 'init_at', 'scoped')
+
+    def __init__(self, head, slot, step, step_at, init_at, scoped):
+        self.head = head        # the WHILE instruction
+        self.slot = slot        # induction variable
+        self.step = step
+        self.step_at = step_at  # the STORE that ends the body: i = i + step
+        self.init_at = init_at  # i = c just before the loop, or -1
+        self.scoped = scoped    # i is declared there and used only by the loop
+
+def counted_loops(module: ir.Module, fn: ir.Function):
+    # Loops shaped `while(i < n){ ...; i = i + c }` with c a positive integer
+    # constant and i an integer written nowhere else in the loop, nor passed
+    # by reference, so `for` states the whole iteration up front
+    ops, dst, a = fn.ops, fn.dst, fn.a
+    defs, by_ref, opens, loops = {}, set(), [], []
+    for i in range(len(ops)):
+        op = ops[i]
+        if op in PURE_OPS:
+            defs[dst[i]] = i
+        elif op == ARG:
+            by_ref.add(a[i])
+        elif op == IF or op == LOOP:
+            opens.append(i)
+        elif op == END:
+            start = opens.pop()
+            if ops[start] == LOOP and ops[i - 1] == STORE:
+                loop = counted_loop(module, fn, defs, by_ref, start, i)
+                if loop is not None:
+                    loops.append(loop)
+    return loops
+
+def counted_loop(module, fn, defs, by_ref, start, end):
+    ops, dst, a, b = fn.ops, fn.dst, fn.a, fn.b
+    flags, consts = module.slot_flags, module.consts
+    head = start + 1
+    while ops[head] != WHILE:
+        head += 1
+    cond = defs.get(a[head])
+    if ops[cond] not in (LT, LE) or ops[defs[a[cond]]] != LOAD:
+        return None
+    slot = a[defs[a[cond]]]
+    if flags[slot] & (ARRAY | STRUCT) or base_type(module.slot_types[slot]) not in ('i', 'l', 'll', 'sh'):
+        return None
+
+    # The body must end with exactly `i = i + c` (or i = c + i)
+    step_at = end - 1
+    if dst[step_at] != slot:
+        return None
+    add = defs[a[step_at]]
+    if ops[add] != ADD:
+        return None
+    left, right = defs[a[add]], defs[b[add]]
+    if ops[left] == CONST:
+        left, right = right, left
+    if ops[left] != LOAD or a[left] != slot or ops[right] != CONST:
+        return None
+    step = consts[a[right]]
+    if not isinstance(step, int) or step <= 0 or min(left, right, add) != step_at - 3:
+        return None
+
+    for i in range(head + 1, step_at - 3):
+        op = ops[i]
+        if op in SLOT_DST_OPS and dst[i] == slot or op == ADDR and a[i] == slot:
+            return None
+        if op == LOAD and a[i] == slot and dst[i] in by_ref:
+            return None  # Passed to a by-reference parameter
+
+    init_at, scoped = start - 1, False
+    if init_at < 0 or ops[init_at] not in (STORE, DECL) or dst[init_at] != slot \
+            or a[init_at] < 0 or ops[defs[a[init_at]]] != CONST:
+        init_at = -1
+    elif ops[init_at] == DECL:
+        scoped = not flags[slot] & (POINTER | HEAP | PSEUDO | PARAM) and not any(
+            (ops[i] in SLOT_A_OPS and a[i] == slot) or (ops[i] in SLOT_DST_OPS and dst[i] == slot)
+            for i in range(end + 1, len(ops)))
+        if not scoped:
+            init_at = -1  # The declaration stays where it is
+    return CountedLoop(head, slot, step, step_at, init_at, scoped)
+
+def unaliased(module: ir.Module):
+    # Functions whose by-reference parameters provably never share storage:
+    # no call passes one slot (or parts of it) to two parameters, nor two
+    # parameters of a caller that isn't itself proven. Only sound when the
+    # module holds every call site, so only used for the entry module.
+    functions = module.functions
+    index = {fn.name: i for i, fn in enumerate(functions)}
+    calls = []  # (caller, callee, [slot behind each argument, -1 for a value])
+    for caller, fn in enumerate(functions):
+        if fn.external:
+            continue
+        ops, dst, a = fn.ops, fn.dst, fn.a
+        defs, args = {}, []
+        for i in range(len(ops)):
+            op = ops[i]
+            if op in PURE_OPS:
+                defs[dst[i]] = i
+            elif op == ARG:
+                d = defs[a[i]]
+                args.append(a[d] if ops[d] in SLOT_A_OPS else -1)
+            elif op == CALL:
+                callee = index.get(module.consts[a[i]])
+                if callee is not None:
+                    calls.append((caller, callee, args))
+                args = []
+
+    flags = module.slot_flags
+    proven = {i for i, fn in enumerate(functions) if i and not fn.external}
+    changed = True
+    while changed:
+        changed = False
+        for caller, callee, args in calls:
+            if callee not in proven:
+                continue
+            slots = [slot for slot in args if slot >= 0]
+            borrowed = [slot for slot in slots if flags[slot] & PARAM]
+            if len(set(slots)) < len(slots) or (caller not in proven and len(borrowed) > 1):
+                proven.discard(callee)
+                changed = True
+    return {functions[i] for i in proven if len(functions[i].params) > 1}
+
+def array_params(module: ir.Module, entry: bool):
+    # Unsized parameters used as arrays (indexed in the body, or handed an
+    # array) -> the one size every call passes, or 0 when the calls disagree,
+    # pass a scalar, or may live in another module
+    functions = module.functions
+    index = {fn.name: fn for fn in functions}
+    sizes = module.slot_sizes
+    indexed, passed = set(), {}  # param -> slot behind each argument, -1 for a value
+    for fn in functions:
+        if fn.external:
+            continue
+        ops, dst, a = fn.ops, fn.dst, fn.a
+        defs, args = {}, []
+        for i in range(len(ops)):
+            op = ops[i]
+            if op in PURE_OPS:
+                defs[dst[i]] = i
+            if op == LOADIDX:
+                indexed.add(a[i])
+            elif op == STOREIDX:
+                indexed.add(dst[i])
+            elif op == ARG:
+                d = defs[a[i]]
+                args.append(a[d] if ops[d] in (LOAD, ADDR) else -1)
+            elif op == CALL:
+                callee = index.get(module.consts[a[i]])
+                if callee is not None:
+                    for param, slot in zip(callee.params, args):
+                        passed.setdefault(param, []).append(slot)
+                args = []
+
+    flags = module.slot_flags
+    arrays = {slot: 0 for slot in indexed if flags[slot] & PARAM and not sizes[slot]}
+    for _ in range(len(passed) + 1):
+        changed = False
+        for param, slots in passed.items():
+            if sizes[param] or param not in arrays and not any(
+                    slot >= 0 and (sizes[slot] or slot in arrays) for slot in slots):
+                continue
+            found = {sizes[slot] or arrays.get(slot, 0) if slot >= 0 else 0 for slot in slots}
+            known = entry and not functions[module.slot_func[param]].external
+            size = found.pop() if known and len(found) == 1 else 0
+            if arrays.get(param) != size:
+                arrays[param] = size
+                changed = True
+        if not changed:
+            break
+    return arrays
+
+# === Pool runtime ===
+# Same-size allocations share a free list (one per 16-byte size class up to
+# 256 bytes) and are carved from 64 KiB slabs; \ pushes a block back on its
+# list for the next allocation of that size. Larger blocks use malloc. The
+# slabs are freed at exit. Valid C and C++.
+
+POOL_RUNTIME = (
+    "typedef struct dot_block { struct dot_block* next; } dot_block;",
+    "static dot_block* dot_free_lists[17];",
+    "static dot_block* dot_slabs;",
+    "static char* dot_cursor;",
+    "static size_t dot_left;",
+    "static void dot_pool_drop(void) {",
+    "    while (dot_slabs) {",
+    "        dot_block* next = dot_slabs->next;",
+    "        free(dot_slabs);",
+    "        dot_slabs = next;",
+    "    }",
+    "}",
+    "static void* dot_alloc(size_t size) {",
+    "    size_t n = (size + 15) / 16;",
+    "    dot_block* b;",
+    "    if (n > 16) return malloc(size);",
+    "    if ((b = dot_free_lists[n])) {",
+    "        dot_free_lists[n] = b->next;",
+    "        return b;",
+    "    }",
+    "    if (dot_left < n * 16) {",
+    "        if (!(b = (dot_block*)malloc(65536))) return NULL;",
+    "        if (!dot_slabs) atexit(dot_pool_drop);",
+    "        b->next = dot_slabs;",
+    "        dot_slabs = b;",
+    "        dot_cursor = (char*)b + 16;",
+    "        dot_left = 65536 - 16;",
+    "    }",
+    "    dot_cursor += n * 16;",
+    "    dot_left -= n * 16;",
+    "    return dot_cursor - n * 16;",
+    "}",
+    "static void dot_release(void* p, size_t size) {",
+    "    size_t n = (size + 15) / 16;",
+    "    if (n > 16) {",
+    "        free(p);",
+    "        return;",
+    "    }",
+    "    ((dot_block*)p)->next = dot_free_lists[n];",
+    "    dot_free_lists[n] = (dot_block*)p;",
+    "}",
+)
+
+# === C++ ===
+
+class CppEmitter(Emitter):
+    def emit(self, module, entry=True):
+        self.arrays = array_params(module, entry)
+        self.temps = 0
+        super().emit(module, entry)
+
+    def header(self):
+        pooled = self.pooled()
+        for include in ('iostream', 'cmath', 'string') + (('cstdlib', 'new') if pooled else ()):
+            self.line(f"#include <{include}>")
+        self.line("using namespace std;")
+        if pooled:
+            self.runtime()
+            self.line("template <class T> static void dot_delete(T* p) {")
+            self.line("    p->~T();")
+            self.line("    dot_release(p, sizeof(T));")
+            self.line("}")
+
+    def pooled(self):
+        module = self.module
+        return self.pool and any(self.is_heap(slot) and not module.slot_flags[slot] & PARAM
+                                 for slot in range(len(module.slot_flags)))
+
+    def struct(self, name, fields):
+        self.line(f"struct {name} {{")
+        self.indent()
+        for dtype, field in fields:
+            self.line(f"{dot_type_to_cpp(dtype)} {field};")
+        self.dedent()
+        self.line("};")
+
+    def open_group(self, group):
+        self.line(f"namespace {group} {{")
+        self.indent()
+
+    def close_group(self, group):
+        self.dedent()
+        self.line("}")
+
+    def ctype(self, slot):
+        module = self.module
+        dtype = module.slot_types[slot]
+        return dtype if module.slot_flags[slot] & STRUCT else dot_type_to_cpp(dtype)
+
+    def param(self, slot, restrict=False):
+        # Every parameter is a reference, arrays by their size, or a pointer
+        # when array_params() found none; __restrict when unaliased() proved it
+        name = f"__restrict {self.name(slot)}" if restrict else self.name(slot)
+        size = self.module.slot_sizes[slot] or self.arrays.get(slot)
+        if size:
+            return f"{self.ctype(slot)} (&{name})[{size}]"
+        if slot in self.arrays:
+            return f"{self.ctype(slot)}* {name}"
+        return f"{self.ctype(slot)}& {name}"
+
+    def main(self, fn):
+        self.line("int main() {")
+        self.indent()
+        self.body(fn)
+        self.line("return 0;")
+        self.dedent()
+        self.line("}")
+
+    def is_heap(self, slot):
+        return self.module.slot_flags[slot] & (HEAP | STACK) == HEAP
+
+    def load(self, slot):
+        kind = self.kinds[slot]
+        if self.is_heap(slot) or slot in self.arrays:
+            return f"*{self.name(slot)}", PREFIX_BP, kind
+        return self.name(slot), ATOM_BP, kind
+
+    def lvalue(self, slot):
+        return self.load(slot)[0]
+
+    def addr(self, slot):
+        if slot in self.arrays:
+            return self.name(slot), ATOM_BP, self.kinds[slot]
+        return self.load(slot)
+
+    def member(self, slot, field):
+        return f"{self.name(slot)}{'->' if self.is_heap(slot) else '.'}{field}"
+
+    def decl(self, slot, init):
+        module = self.module
+        ctype, name = self.ctype(slot), self.name(slot)
+        size = module.slot_sizes[slot]
+        flags = module.slot_flags[slot]
+        if size:
+            self.line(f"{ctype} {name}[{size}];")
+        elif self.is_heap(slot):
+            place = f"(dot_alloc(sizeof({ctype}))) " if self.pool else ''
+            self.line(f"{ctype}* {name} = new {place}{ctype}{f'({init[0]})' if init else ''};")
+        elif init:
+            self.line(f"{ctype} {name} = {init[0]};")
+        else:
+            self.line(f"{ctype} {name}{'{}' if flags & STRUCT else ''};")
+
+    def release(self, slot):
+        if self.is_heap(slot):
+            self.line(f"dot_delete({self.name(slot)});" if self.pool else f"delete {self.name(slot)};")
+        else:
+            self.line(f"// {self.name(slot)} released (stack)")
+
+    def print(self, parts):
+        self.line(f"cout << {' << '.join(text for text, _, _ in parts)} << endl;")
+
+    def call(self, target, args):
+        # References bind to lvalues, so other values are first held in a
+        # named temporary; array parameters take the array itself
+        fn = self.callees.get(target)
+        texts = []
+        sizes = self.module.slot_sizes
+        for i, (val, lvalue, is_addr, slot) in enumerate(args):
+            param = fn.params[i] if fn is not None and i < len(fn.params) else -1
+            array = slot >= 0 and (sizes[slot] or slot in self.arrays)
+            pointer = param in self.arrays and not self.arrays[param]
+            if param < 0:
+                texts.append(val[0])
+            elif array and (pointer or sizes[param] or param in self.arrays):
+                texts.append(self.name(slot))
+            elif lvalue is None and not is_addr:
+                temp = f"dot_arg{self.temps}"
+                self.temps += 1
+                self.line(f"{self.ctype(param)} {temp} = {val[0]};")
+                texts.append(f"&{temp}" if pointer else temp)
+            else:
+                texts.append(f"&{wrap(val, PREFIX_BP)}" if pointer else val[0])
+        self.line(f"{target.replace('.', '::')}({', '.join(texts)});")
+
+# === C ===
+# The README's plain C target: owned pointers live on the heap via malloc,
+# sets flatten to set_function names and output goes through printf.
+
+class CEmitter(Emitter):
+    def header(self):
+        for include in ('stdio.h', 'stdlib.h', 'math.h'):
+            self.line(f"#include <{include}>")
+        if self.pooled():
+            self.runtime()
+
+    def pooled(self):
+        # Every owned pointer is heap memory in C, ~ or not
+        module = self.module
+        return self.pool and any(self.indirect(slot) and not module.slot_flags[slot] & PARAM
+                                 for slot in range(len(module.slot_flags)))
+
+    def size(self, slot):
+        size = self.module.slot_sizes[slot]
+        return f"{f'{size} * ' if size else ''}sizeof({self.ctype(slot)})"
+
+    def ctype(self, slot):
+        module = self.module
+        if module.slot_flags[slot] & STRUCT:
+            return module.slot_types[slot]
+        return C_TYPES.get(self.kinds[slot], 'int')
+
+    def struct(self, name, fields):
+        self.line(f"typedef struct {name} {{")
+        self.indent()
+        for dtype, field in fields:
+            self.line(f"{C_TYPES.get(base_type(dtype), dtype)} {field};")
+        self.dedent()
+        self.line(f"}} {name};")
+
+    def function_name(self, fn):
+        return fn.name.replace('.', '_')
+
+    def indirect(self, slot):
+        # Pointer-held memory: owned pointers, heap slots and by-reference
+        # params, unless promoted to the stack
+        module = self.module
+        if self.kinds[slot] == 's':
+            return False
+        flags = module.slot_flags[slot]
+        return bool(flags & (POINTER | HEAP | PSEUDO)) and not flags & STACK
+
+    def param(self, slot, restrict=False):
+        ctype, name = self.ctype(slot), self.name(slot)
+        if not self.indirect(slot):
+            return f"{ctype} {name}"
+        return f"{ctype}* {'__restrict ' if restrict else ''}{name}"
+
+    def main(self, fn):
+        self.line("int main(void) {")
+        self.indent()
+        self.body(fn)
+        self.line("return 0;")
+        self.dedent()
+        self.line("}")
+
+    def load(self, slot):
+        kind = self.kinds[slot]
+        if self.indirect(slot) and not self.module.slot_sizes[slot]:
+            return f"*{self.name(slot)}", PREFIX_BP, kind
+        return self.name(slot), ATOM_BP, kind
+
+    def lvalue(self, slot):
+        return self.load(slot)[0]
+
+    def addr(self, slot):
+        kind = self.kinds[slot]
+        if self.indirect(slot) or self.module.slot_sizes[slot] or kind == 's':
+            return self.name(slot), ATOM_BP, kind
+        return f"&{self.name(slot)}", PREFIX_BP, kind
+
+    def member(self, slot, field):
+        return f"{self.name(slot)}{'->' if self.indirect(slot) else '.'}{field}"
+
+    def decl(self, slot, init):
+        module = self.module
+        ctype, name = self.ctype(slot), self.name(slot)
+        size = module.slot_sizes[slot]
+        if self.indirect(slot):
+            self.line(f"{ctype}* {name} = {'dot_alloc' if self.pool else 'malloc'}({self.size(slot)});")
+            if init:
+                self.line(f"*{name} = {init[0]};")
+        elif size:
+            self.line(f"{ctype} {name}[{size}];")
+        elif init:
+            self.line(f"{ctype} {name} = {init[0]};")
+        else:
+            self.line(f"{ctype} {name};")
+
+    def release(self, slot):
+        if self.indirect(slot) and self.pool:
+            self.line(f"dot_release({self.name(slot)}, {self.size(slot)});")
+        elif self.indirect(slot):
+            self.line(f"free({self.name(slot)});")
+        else:
+            self.line(f"// {self.name(slot)} released (stack)")
+
+    def print(self, parts):
+        fmt, values = [], []
+        for text, _, kind in parts:
+            if kind == 's' and text.startswith('"'):
+                fmt.append(text[1:-1].replace('%', '%%'))
+            else:
+                fmt.append(PRINTF_FORMATS.get(kind, '%d'))
+                values.append(text)
+        args = ''.join(', ' + value for value in values)
+        self.line(f'printf("{"".join(fmt)}\\n"{args});')
+
+    def call(self, target, args):
+        # By-reference parameters take addresses: 'x already is one, loaded
+        # lvalues get '&' and other values become compound literals
+        fn = self.callees.get(target)
+        texts = []
+        for i, ((text, _, kind), lvalue, is_addr, _) in enumerate(args):
+            if fn is None or i >= len(fn.params) or not self.indirect(fn.params[i]) or is_addr:
+                texts.append(text)
+            elif lvalue is not None:
+                texts.append(lvalue[1:] if lvalue.startswith('*') else f"&{lvalue}")
+            else:
+                texts.append(f"&({C_TYPES.get(kind, 'int')}){{{text}}}")
+        self.line(f"{target.replace('.', '_')}({', '.join(texts)});")
+
+TARGETS = {'cpp': CppEmitter, 'c': CEmitter}
+
+def emit(module: ir.Module, out: TextIO, target: str = 'cpp', entry: bool = True,
+         pool: bool = False):
+    TARGETS[target](out, pool).emit(module, entry)
+
+def emit_string(module: ir.Module, target: str = 'cpp', entry: bool = True,
+                pool: bool = False) -> str:
+    out = io.StringIO()
+    emit(module, out, target, entry, pool)
+    return out.getvalue()
@@ -1 +1,553 @@
-# future intermediate representation code
\ No newline at end of file
+# ir.py — Linear intermediate representation for Dot.
+# A Module holds one flat slot table (every named pointer, pseudo and local
+# in the program) and a constant pool. Each Function is a single stream of
+# instructions stored column-wise: opcode, dst, a, b and the source offset,
+# one array entry each. Expressions lower to single-use temporaries, and
+# control flow is structured (IF/ELIF/ELSE/LOOP/WHILE/END markers) so that
+# emitters can rebuild readable code without a CFG.
+
+from array import array
+from typing import Dict, List, Tuple
+
+from parser import (Assignment, BinOp, ControlFlow, Dealloc, Declaration, Deref, FunctionCall,
+                    Member, Name, Number, Pseudo, PrintStmt, Program, Ref, SetFunction, SetGroup,
+                    String, StructDef, StructInstance, UnaryOp, parse)
+from symbols import SymbolTable
+
+class LoweringError(Exception):
+    def __init__(self, message: str, pos: int):
+        super().__init__(message)
+        self.pos = pos
+
+# === Opcodes ===
+# dst is a temp for value-producing ops and a slot for stores, DECL and RELEASE.
+#
+#   CONST    t, k            t = consts[k]
+#   LOAD     t, slot         t = value held by slot (x", p@, i, *h)
+#   LOADIDX  t, slot, ti     t = slot[ti]
+#   LOADMEM  t, slot, k      t = slot.<consts[k]>
+#   ADDR     t, slot         t = 'slot, passed by reference
+#   NEG      t, ta
+#   ADD..GE  t, ta, tb       arithmetic and comparisons; POW is ^
+#   STORE    slot, t
+#   STOREIDX slot, ti, t
+#   STOREMEM slot, k, t
+#   DECL     slot, t|-1      declare (and initialise) a slot
+#   RELEASE  slot            explicit \
+#   PRINT    -, t, last      print one part; last=1 ends the line
+#   ARG      -, t            push a call argument
+#   CALL     -, k, nargs     call consts[k] ('set.function') with the pushed args
+#   IF/ELIF/WHILE -, t       structured branches on t
+#   ELSE, LOOP, END          LOOP opens a while (its condition follows)
+
+OPCODES = (
+    'NOP', 'CONST', 'LOAD', 'LOADIDX', 'LOADMEM', 'ADDR', 'NEG',
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'POW', 'EQ', 'NE', 'LT', 'LE', 'GT', 'GE',
+    'STORE', 'STOREIDX', 'STOREMEM', 'DECL', 'RELEASE', 'PRINT', 'ARG', 'CALL',
+    'IF', 'ELIF', 'ELSE', 'LOOP', 'WHILE', 'END',
+)
+(NOP, CONST, LOAD, LOADIDX, LOADMEM, ADDR, NEG,
+ ADD, SUB, MUL, DIV, MOD, POW, EQ, NE, LT, LE, GT, GE,
+ STORE, STOREIDX, STOREMEM, DECL, RELEASE, PRINT, ARG, CALL,
+ IF, ELIF, ELSE, LOOP, WHILE, END) = range(len(OPCODES))
+
+BINARY_OPS = {
+    '+': ADD, '-': SUB, '*': MUL, '/': DIV, '%': MOD, '^': POW,
+    '==': EQ, '!=': NE, '<': LT, '<=': LE, '>': GT, '>=': GE,
+}
+BINARY_SYMBOLS = {code: op for op, code in BINARY_OPS.items()}
+
+# Ops whose dst is a fresh temp and which have no side effects
+PURE_OPS = frozenset((CONST, LOAD, LOADIDX, LOADMEM, ADDR, NEG, *BINARY_OPS.values()))
+
+# Ops naming a slot in a (reads) or in dst (writes and lifetime markers)
+SLOT_A_OPS = frozenset((LOAD, LOADIDX, LOADMEM, ADDR))
+SLOT_DST_OPS = frozenset((STORE, STOREIDX, STOREMEM, DECL, RELEASE))
+
+# === Slot flags ===
+HEAP = 1      # i~ / ~struct: allocated on the heap
+PSEUDO = 2    # @ parameter, a by-reference view of the caller's memory
+CONST_ = 4    # ':' declaration or '.' parameter
+PARAM = 8
+POINTER = 16  # declared with ' (or "): owned memory that must be released
+STRUCT = 32
+ARRAY = 64
+STACK = 128   # HEAP or owned POINTER proven scoped: emitted as a plain local (opt.promote)
+
+class Function:
+    __slots__ = ('name', 'group', 'params', 'ops', 'dst', 'a', 'b', 'pos', 'ntemps', 'external',
+                 'warnings')
+
+    def __init__(self, name: str, group: str = '', external: bool = False):
+        self.name = name      # qualified name, e.g. 'math.max_of'
+        self.group = group    # set group, '' for free functions and main
+        self.external = external  # defined in another module; signature only
+        self.params = array('i')
+        self.ops = array('B')
+        self.dst = array('i')
+        self.a = array('i')
+        self.b = array('i')
+        self.pos = array('I')
+        self.ntemps = 0
+        self.warnings: List[str] = []  # filled in by check.check
+
+    def emit(self, op: int, dst: int = -1, a: int = -1, b: int = -1, pos: int = 0) -> int:
+        self.ops.append(op)
+        self.dst.append(dst)
+        self.a.append(a)
+        self.b.append(b)
+        self.pos.append(pos)
+        return dst
+
+    def temp(self) -> int:
+        self.ntemps += 1
+        return self.ntemps - 1
+
+    def __len__(self):
+        return len(self.ops)
+
+class Module:
+    __slots__ = ('functions', 'consts', 'const_index', 'slot_names', 'slot_types', 'slot_sizes',
+                 'slot_flags', 'slot_func', 'slot_syms', 'structs', 'sets', 'source', 'symbols')
+
+    def __init__(self, source: str = '', symbols: SymbolTable = None):
+        self.functions: List[Function] = [Function('main')]
+        self.consts: list = []
+        self.const_index: Dict[Tuple[type, object], int] = {}
+        self.slot_names: List[str] = []
+        self.slot_types: List[str] = []
+        self.slot_sizes = array('i')
+        self.slot_flags = array('B')
+        self.slot_func = array('i')
+        self.slot_syms = array('i')   # symbol ID of each slot's name; ~x is its own symbol
+        self.structs: Dict[str, List[Tuple[str, str]]] = {}
+        self.sets: Dict[str, Tuple[str, str]] = {}  # group -> (kind, type constraint)
+        self.source = source
+        self.symbols = symbols if symbols is not None else SymbolTable()
+
+    def const(self, value) -> int:
+        key = (type(value), value)
+        k = self.const_index.get(key)
+        if k is None:
+            k = self.const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return k
+
+    def new_slot(self, name: str, dtype: str, size: int, flags: int, func: int) -> int:
+        self.slot_names.append(name)
+        self.slot_types.append(dtype)
+        self.slot_sizes.append(size)
+        self.slot_flags.append(flags)
+        self.slot_func.append(func)
+        self.slot_syms.append(self.symbols.intern(name))
+        return len(self.slot_names) - 1
+
+    def add_extern(self, name: str, params) -> Function:
+        # Declare a function defined in another module.
+        # params are (dtype, glyph, const, name) tuples.
+        group = name.rpartition('.')[0]
+        fn = Function(name, group, external=True)
+        index = len(self.functions)
+        self.functions.append(fn)
+        for dtype, glyph, const, pname in params:
+            size = array_size(dtype)
+            flags = param_flags(glyph, const) | (ARRAY if size else 0)
+            fn.params.append(self.new_slot(pname, dtype, size, flags, index))
+        return fn
+
+# === Lowering ===
+
+def array_size(dtype: str) -> int:
+    # i_5 -> 5, anything else -> 0
+    suffix = dtype[dtype.find('_') + 1:] if '_' in dtype else ''
+    return int(suffix) if suffix.isdigit() else 0
+
+def param_flags(glyph: str, const: bool) -> int:
+    flags = PARAM
+    if glyph == '@':
+        flags |= PSEUDO
+    elif glyph == "'":
+        flags |= POINTER
+    if const:
+        flags |= CONST_
+    return flags
+
+def base_type(dtype: str) -> str:
+    # i_5 -> i, i~ -> i, ll_ -> ll
+    return dtype.split('_')[0].rstrip('~')
+
+def check_set_types(node: SetGroup):
+    # set_i accepts any i_ parameter, set_i_5 only i_5, set_i_s i_ or s_
+    if not node.types:
+        return
+    bases, exact = set(), set()
+    for part in node.types.split('_'):
+        if part.isdigit() and bases:
+            exact.add(f"{last}_{part}")
+            bases.discard(last)
+        elif part:
+            bases.add(part)
+            last = part
+    for fn in node.functions:
+        for param in fn.params:
+            t = param.dtype
+            if t not in exact and base_type(t) not in bases:
+                allowed = ', '.join(sorted(exact | {b + '_' for b in bases}))
+                raise LoweringError(f"Function param type '{t}' not allowed in set_{node.types} "
+                                    f"(expected {allowed})", param.start)
+
+class Lowerer:
+    def __init__(self, module: Module):
+        self.module = module
+        self.fn = module.functions[0]
+        self.fn_index = 0
+        self.scope: Dict[str, int] = {}
+
+    def lower(self, program: Program) -> Module:
+        for node in program.body:
+            if isinstance(node, StructDef):
+                self.module.structs.setdefault(node.name, node.fields)
+            elif isinstance(node, SetGroup):
+                self.module.sets[node.name] = (node.kind, node.types)
+                check_set_types(node)
+                for fn in node.functions:
+                    self.lower_function(fn, node.name)
+            elif isinstance(node, SetFunction):
+                self.lower_function(node, '')
+            else:
+                self.stmt(node)
+        self.check_calls()
+        return self.module
+
+    def check_calls(self):
+        # Every call names a function defined here or imported, with one
+        # argument per parameter; functions may be called before their set
+        module = self.module
+        arity = {fn.name: len(fn.params) for fn in module.functions[1:]}
+        for fn in module.functions:
+            for i in range(len(fn)):
+                if fn.ops[i] != CALL:
+                    continue
+                name, nargs = module.consts[fn.a[i]], fn.b[i]
+                expected = arity.get(name)
+                if expected is None:
+                    raise LoweringError(f"function '{name}' is not defined", fn.pos[i])
+                if nargs != expected:
+                    raise LoweringError(f"'{name}' takes {expected} argument(s), {nargs} given",
+                                        fn.pos[i])
+
+    def error(self, message: str, node):
+        raise LoweringError(message, node.start)
+
+    # --- Scopes ---
+
+    def declare(self, name: str, dtype: str, flags: int, node) -> int:
+        if name in self.scope:
+            self.error(f"'{name}' is already declared in this scope", node)
+        size = array_size(dtype)
+        if size:
+            flags |= ARRAY
+        slot = self.module.new_slot(name, dtype, size, flags, self.fn_index)
+        self.scope[name] = slot
+        return slot
+
+    def resolve(self, name: str, node) -> int:
+        slot = self.scope.get(name)
+        if slot is None:
+            self.error(f"'{name}' is not declared", node)
+        return slot
+
+    def lower_function(self, node: SetFunction, group: str):
+        qualified = f"{group}.{node.name}" if group else node.name
+        outer = self.fn, self.fn_index, self.scope
+        self.fn = Function(qualified, group)
+        self.fn_index = len(self.module.functions)
+        self.module.functions.append(self.fn)
+        self.scope = {}
+        for param in node.params:
+            flags = param_flags(param.glyph, param.const)
+            self.fn.params.append(self.declare(param.name, param.dtype, flags, param))
+        for stmt in node.body:
+            self.stmt(stmt)
+        self.fn, self.fn_index, self.scope = outer
+
+    # --- Statements ---
+
+    def stmt(self, node):
+        fn = self.fn
+        if isinstance(node, Declaration):
+            flags = POINTER if node.pointer else 0
+            if node.dtype.endswith('~'):
+                flags |= HEAP | POINTER
+            if node.const:
+                flags |= CONST_
+            value = self.expr(node.value) if node.value is not None else -1
+            slot = self.declare(node.name, node.dtype, flags, node)
+            fn.emit(DECL, slot, value, pos=node.start)
+
+        elif isinstance(node, Assignment):
+            self.assign(node)
+
+        elif isinstance(node, PrintStmt):
+            last = len(node.parts) - 1
+            for i, part in enumerate(node.parts):
+                fn.emit(PRINT, -1, self.expr(part), int(i == last), node.start)
+
+        elif isinstance(node, Dealloc):
+            name = node.var
+            if name not in self.scope and '~' + name in self.scope:
+                name = '~' + name  # 'p\ with only the heap instance p declared
+            fn.emit(RELEASE, self.resolve(name, node), pos=node.start)
+
+        elif isinstance(node, FunctionCall):
+            for arg in node.args:
+                fn.emit(ARG, -1, self.expr(arg), pos=arg.start)
+            fn.emit(CALL, -1, self.module.const(node.target), len(node.args), node.start)
+
+        elif isinstance(node, StructInstance):
+            struct_type = node.struct_type
+            structs = self.module.structs
+            if struct_type not in structs and struct_type.split('_')[0] in structs:
+                struct_type = struct_type.split('_')[0]  # vec_i -> vec
+            if struct_type not in structs:
+                self.error(f"unknown struct '{node.struct_type}'", node)
+            fields = structs[struct_type]
+            flags = STRUCT | (POINTER if node.pointer or node.heap else 0) | (HEAP if node.heap else 0)
+            name = '~' + node.name if node.heap else node.name
+            slot = self.declare(name, struct_type, flags, node)
+            fn.emit(DECL, slot, -1, pos=node.start)
+            for i, value in enumerate(node.values):
+                if isinstance(value, Assignment):
+                    field = value.target.name
+                    value = value.value
+                elif i < len(fields):
+                    field = fields[i][1]
+                else:
+                    self.error(f"too many values for struct '{struct_type}'", value)
+                fn.emit(STOREMEM, slot, self.module.const(field), self.expr(value), value.start)
+
+        elif isinstance(node, ControlFlow):
+            self.control(node)
+
+        elif isinstance(node, (SetGroup, SetFunction, StructDef)):
+            self.error('sets, functions and structs must be declared at the top level', node)
+
+        else:
+            self.error(f"unsupported statement {type(node).__name__}", node)
+
+    def control(self, node: ControlFlow):
+        fn = self.fn
+        if node.kind == 'while':
+            fn.emit(LOOP, pos=node.start)
+            fn.emit(WHILE, -1, self.expr(node.condition), pos=node.start)
+            for stmt in node.body:
+                self.stmt(stmt)
+            fn.emit(END, pos=node.end)
+            return
+        fn.emit(IF, -1, self.expr(node.condition), pos=node.start)
+        while True:
+            for stmt in node.body:
+                self.stmt(stmt)
+            orelse = node.orelse
+            if len(orelse) == 1 and isinstance(orelse[0], ControlFlow) and orelse[0].kind == 'elif':
+                node = orelse[0]
+                fn.emit(ELSE, pos=node.start)
+                fn.emit(ELIF, -1, self.expr(node.condition), pos=node.start)
+                continue
+            if orelse:
+                fn.emit(ELSE, pos=orelse[0].start)
+                for stmt in orelse:
+                    self.stmt(stmt)
+            break
+        fn.emit(END, pos=node.end)
+
+    def assign(self, node: Assignment):
+        fn = self.fn
+        target = node.target
+        if isinstance(target, UnaryOp) and target.op == '~':
+            target = self.heap_operand(target)
+        if node.op != '=' and self.struct_slot(target) is not None:
+            self.merge(node, self.struct_slot(target))
+            return
+        value = self.expr(node.value)
+        if node.op != '=':
+            current = self.expr(target)
+            value = fn.emit(BINARY_OPS[node.op[0]], fn.temp(), current, value, node.start)
+
+        if isinstance(target, (Name, Deref, Pseudo)):
+            slot = self.resolve(target.name, target)
+            index = getattr(target, 'index', None)
+            if index is None:
+                fn.emit(STORE, slot, value, pos=node.start)
+            elif self.module.slot_flags[slot] & STRUCT and isinstance(index, Name):
+                fn.emit(STOREMEM, slot, self.module.const(index.name), value, node.start)
+            else:
+                fn.emit(STOREIDX, slot, self.expr(index), value, node.start)
+        elif isinstance(target, Member):
+            slot = self.member_base(target)
+            fn.emit(STOREMEM, slot, self.module.const(target.field), value, node.start)
+        else:
+            self.error('cannot assign to this expression', target)
+
+    def merge(self, node: Assignment, slot: int):
+        # ~p" += q": field by field; a shorter right-hand struct wraps around
+        fn = self.fn
+        other = self.struct_slot(node.value)
+        if other is None:
+            self.error(f"struct '{self.module.slot_names[slot]}' can only be combined "
+                       f"with another struct", node)
+        fields = self.module.structs[self.module.slot_types[slot]]
+        others = self.module.structs[self.module.slot_types[other]]
+        for i, (_, field) in enumerate(fields):
+            k = self.module.const(field)
+            current = fn.emit(LOADMEM, fn.temp(), slot, k, node.start)
+            value = fn.emit(LOADMEM, fn.temp(), other,
+                            self.module.const(others[i % len(others)][1]), node.start)
+            value = fn.emit(BINARY_OPS[node.op[0]], fn.temp(), current, value, node.start)
+            fn.emit(STOREMEM, slot, k, value, node.start)
+
+    def struct_slot(self, node):
+        # Slot of a whole-struct operand (p", ~p", q@), else None
+        if isinstance(node, UnaryOp) and node.op == '~':
+            node = self.heap_operand(node)
+        if isinstance(node, (Name, Deref, Pseudo)) and getattr(node, 'index', None) is None:
+            slot = self.scope.get(node.name)
+            if slot is not None and self.module.slot_flags[slot] & STRUCT:
+                return slot
+        return None
+
+    def scalar(self, node) -> int:
+        # expr() for an arithmetic operand, which can't be a whole struct
+        slot = self.struct_slot(node)
+        if slot is not None:
+            self.error(f"struct '{self.module.slot_names[slot]}' can't be used in arithmetic; "
+                       f"use its fields", node)
+        return self.expr(node)
+
+    # --- Expressions ---
+
+    def expr(self, node) -> int:
+        fn = self.fn
+        module = self.module
+        if isinstance(node, Number):
+            value = float(node.value) if '.' in node.value else int(node.value)
+            return fn.emit(CONST, fn.temp(), module.const(value), pos=node.start)
+        if isinstance(node, String):
+            return fn.emit(CONST, fn.temp(), module.const(node.value), pos=node.start)
+        if isinstance(node, Ref):
+            return fn.emit(ADDR, fn.temp(), self.resolve(node.name, node), pos=node.start)
+        if isinstance(node, (Name, Deref, Pseudo)):
+            slot = self.resolve(node.name, node)
+            index = getattr(node, 'index', None)
+            if isinstance(node, Deref) and module.slot_flags[slot] & PSEUDO:
+                self.error(f"Illegal: pseudo '{node.name}' cannot be dereferenced with \". "
+                           f"Use {node.name}@ instead.", node)
+            if index is None:
+                return fn.emit(LOAD, fn.temp(), slot, pos=node.start)
+            if module.slot_flags[slot] & STRUCT and isinstance(index, Name):
+                return fn.emit(LOADMEM, fn.temp(), slot, module.const(index.name), node.start)
+            return fn.emit(LOADIDX, fn.temp(), slot, self.expr(index), node.start)
+        if isinstance(node, Member):
+            slot = self.member_base(node)
+            return fn.emit(LOADMEM, fn.temp(), slot, module.const(node.field), node.start)
+        if isinstance(node, UnaryOp):
+            if node.op == '~':
+                return self.expr(self.heap_operand(node))
+            return fn.emit(NEG, fn.temp(), self.scalar(node.operand), pos=node.start)
+        if isinstance(node, BinOp):
+            left = self.scalar(node.left)
+            right = self.scalar(node.right)
+            return fn.emit(BINARY_OPS[node.op], fn.temp(), left, right, node.start)
+        if isinstance(node, FunctionCall):
+            self.error("functions don't return; call them as statements", node)
+        self.error(f"unsupported expression {type(node).__name__}", node)
+
+    def heap_operand(self, node: UnaryOp):
+        # ~point" names the heap twin of point
+        operand = node.operand
+        if not isinstance(operand, (Name, Deref)):
+            self.error("'~' must prefix a name", node)
+        heap_name = '~' + operand.name
+        if heap_name in self.scope:
+            return type(operand)(heap_name, *([operand.index] if isinstance(operand, Deref) else []),
+                                 operand.start, operand.end)
+        return operand
+
+    def member_base(self, node: Member) -> int:
+        base = node.base
+        if not isinstance(base, (Name, Deref, Pseudo)) or getattr(base, 'index', None) is not None:
+            self.error('member access needs a struct name on the left', node)
+        slot = self.resolve(base.name, base)
+        if not self.module.slot_flags[slot] & STRUCT:
+            self.error(f"'{base.name}' is not a struct", node)
+        return slot
+
+def lower(program, imports=None) -> Module:
+    # imports: {'structs': {name: [(dtype, field)]}, 'functions': {name: [param tuples]}}
+    # describing definitions this program uses from other modules
+    if not isinstance(program, Program):
+        program = parse(program)
+    module = Module(program.source, program.symbols)
+    if imports:
+        for name, fields in imports.get('structs', {}).items():
+            module.structs[name] = [tuple(field) for field in fields]
+        for name, params in imports.get('functions', {}).items():
+            module.add_extern(name, params)
+    return Lowerer(module).lower(program)
+
+# === Listing ===
+
+def format_ir(module: Module) -> str:
+    lines = []
+    for fn in module.functions:
+        params = ', '.join(module.slot_names[s] for s in fn.params)
+        lines.append(f"{'extern ' if fn.external else ''}func {fn.name}({params}):")
+        depth = 1
+        for i in range(len(fn)):
+            op = fn.ops[i]
+            if op in (ELSE, ELIF, END):
+                depth -= 1
+            lines.append(f"{i:5}  {'  ' * depth}{format_instr(module, fn, i)}")
+            if op in (IF, ELIF, ELSE, LOOP):
+                depth += 1
+    return '\n'.join(lines)
+
+def format_instr(module: Module, fn: Function, i: int) -> str:
+    op, dst, a, b = fn.ops[i], fn.dst[i], fn.a[i], fn.b[i]
+    name = OPCODES[op]
+    slot = module.slot_names.__getitem__
+    if op == CONST:
+        return f"t{dst} = {module.consts[a]!r}"
+    if op in (LOAD, ADDR):
+        return f"t{dst} = {'&' if op == ADDR else ''}{slot(a)}"
+    if op == LOADIDX:
+        return f"t{dst} = {slot(a)}[t{b}]"
+    if op == LOADMEM:
+        return f"t{dst} = {slot(a)}.{module.consts[b]}"
+    if op == NEG:
+        return f"t{dst} = -t{a}"
+    if op in BINARY_SYMBOLS:
+        return f"t{dst} = t{a} {BINARY_SYMBOLS[op]} t{b}"
+    if op == STORE:
+        return f"{slot(dst)} = t{a}"
+    if op == STOREIDX:
+        return f"{slot(dst)}[t{a}] = t{b}"
+    if op == STOREMEM:
+        return f"{slot(dst)}.{module.consts[a]} = t{b}"
+    if op == DECL:
+        init = f" = t{a}" if a >= 0 else ''
+        return f"decl {module.slot_types[dst]} {slot(dst)}{init}"
+    if op == RELEASE:
+        return f"release {slot(dst)}"
+    if op == PRINT:
+        return f"print t{a}{' nl' if b else ''}"
+    if op == CALL:
+        return f"call {module.consts[a]}/{b}"
+    if op in (ARG, IF, ELIF, WHILE):
+        return f"{name.lower()} t{a}"
+    return name.lower()
+
+if __name__ == '__main__':
+    import sys
+    with open(sys.argv[1]) as f:
+        print(format_ir(lower(f.read())))
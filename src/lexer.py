@@ -1,10 +1,16 @@
 # Token class: basic tokenizer for the Dot language using class-based tokens.
 # This example is an extensible foundation for Dot's lexer system.
 
+import codecs
 import re
-from typing import List
+from array import array
+from typing import Iterator, List
+
+from symbols import TYPE as SYM_TYPE, SymbolTable
 
 class Token:
+    __slots__ = ('type', 'value', 'line', 'col')
+
     def __init__(self, type_: str, value: str, line: int, col: int):
         self.type = type_
         self.value = value
@@ -14,55 +20,248 @@ class Token:
     def __repr__(self):
         return f"Token({self.type}, {repr(self.value)}, {self.line}:{self.col})"
 
-# Token specifications for the Dot language
+# Token specifications for the Dot language.
+# Order matters: keywords come before IDENT and longer glyphs before
+# their prefixes, so the first alternative that matches is the right one.
 token_specification = [
-    ('COMMENT',      r'//.*'),                 # Single-line comment
-    ('WHITESPACE',   r'[ \t]+'),               # Whitespace
+    ('COMMENT',      r'//[^\n]*'),             # Single-line comment
+    ('WHITESPACE',   r'[ \t\r]+'),             # Whitespace
     ('NEWLINE',      r'\n'),                   # Line endings
-    ('TYPE',         r'(i_|f_|d_|s_|c_|l_|ll_|sh_)'),  # Dot types
-    ('SET_TYPE',     r'set_type'),             # set_type keyword
-    ('SET',          r'set'),                  # set keyword
-    ('STRUCT',       r'struct'),               # struct keyword
-    ('FUNC_ARROW',   r'->'),                   # Function arrow (if used later)
-    ('STRING',       r'"[^"]*"'),              # String literal
-    ('NUMBER',       r'\d+'),                  # Integer literal
+    ('SET_TYPE',     r'set_type\b'),           # set_type keyword
+    ('SET',          r'set(?:_[a-z]\w*)?\b'),  # set, set_i, set_i_s
+    ('STRUCT',       r'struct(?:_[a-z]\w*)?\b'),  # struct, struct_i
+    ('KEYWORD',      r'(?:if|elif|else|while|when|except)\b'),  # Control flow
+    ('TYPE',         r'(?:\$|ll|sh|[ifdscl])(?:_\d*|~)(?!\w)'),  # i_, i_5, i~, $_
+    ('NUMBER',       r'\d+(?:\.\d+)?'),        # Integer or float literal
     ('IDENT',        r'[A-Za-z_]\w*'),         # Identifiers
-    ('DEREF',        r'\'\''),                 # Double dereference
-    ('DECL_ASSIGN',  r'"'),                    # Declaration + assign
+    ('DEREF',        r'(?<=[\w)])"'),          # Dereference, glued to its operand
+    ('STRING',       r'"[^"\n]*"'),            # String literal (single line)
+    ('POINTER',      r"'"),                    # Pointer
+    ('PSEUDO',       r'@'),                    # Pseudo (by-reference parameter)
     ('RELEASE',      r'\\'),                   # Release pointer
-    ('POINTER',      r'\''),                   # Single pointer
+    ('HEAP',         r'~'),                    # Heap marker
+    ('FUNC_ARROW',   r'->'),                   # Function arrow (if used later)
+    ('COMPARE',      r'==|!=|<=|>=|<|>'),      # Comparison operators
+    ('OP_ASSIGN',    r'[+\-*/%]='),            # Compound assignment
+    ('INCDEC',       r'\+\+|--'),              # Increment / decrement
     ('ASSIGN',       r'='),                    # Assignment operator
-    ('OP',           r'[+\-*/%]'),             # Arithmetic operators
+    ('OP',           r'[+\-*/%^]'),            # Arithmetic operators
+    ('DOT',          r'\.'),                   # Member access / const marker
     ('SEMICOLON',    r';'),                    # Statement terminator
+    ('COLON',        r':'),                    # Const terminator
+    ('COMMA',        r','),                    # Comma
     ('LBRACE',       r'\{'),                   # Left brace
     ('RBRACE',       r'\}'),                   # Right brace
     ('LPAREN',       r'\('),                   # Left parenthesis
     ('RPAREN',       r'\)'),                   # Right parenthesis
-    ('COMMA',        r','),                    # Comma
     ('UNKNOWN',      r'.'),                    # Any other character
 ]
 
-# Compile the token regexes
+# Compile the token regexes once, at import. re.ASCII keeps \w, \d and \s to
+# ASCII as they are over bytes, so a str and its UTF-8 encoding lex alike:
+# é is never part of an identifier, in either.
 token_regex = '|'.join(f'(?P<{name}>{regex})' for name, regex in token_specification)
-compiled_re = re.compile(token_regex)
+compiled_re = re.compile(token_regex, re.ASCII)
 
-def tokenize(code: str) -> List[Token]:
-    tokens = []
-    line_num = 1
-    line_start = 0
-    for mo in compiled_re.finditer(code):
-        kind = mo.lastgroup
-        value = mo.group()
-        column = mo.start() - line_start
+# The same pattern over bytes, for mmap and bytes sources. Compiled on first
+# use so str-only callers don't pay for it. A non-ASCII character lexes as
+# one UNKNOWN token spanning its whole UTF-8 sequence, as it would in a str.
+UTF8_CHAR = rb'[\xc0-\xff][\x80-\xbf]*'
+_bytes_re = None
+
+def bytes_pattern():
+    global _bytes_re
+    if _bytes_re is None:
+        _bytes_re = re.compile(token_regex.encode().replace(b'(?P<UNKNOWN>.)',
+                                                            b'(?P<UNKNOWN>' + UTF8_CHAR + b'|.)'))
+    return _bytes_re
+
+# Integer kind codes, in specification order
+KINDS = tuple(name for name, _ in token_specification)
+KIND_CODES = {name: code for code, name in enumerate(KINDS)}
 
+# Hand-written fast path for the one-character glyphs that dominate Dot
+# sources. A '"' is a DEREF only when glued to a word or ')', otherwise it
+# opens a string and is left to the regex.
+GLYPHS = {
+    "'": 'POINTER', '@': 'PSEUDO', '\\': 'RELEASE', '~': 'HEAP',
+    ';': 'SEMICOLON', ',': 'COMMA', '{': 'LBRACE', '}': 'RBRACE',
+    '(': 'LPAREN', ')': 'RPAREN',
+}
+
+# Sources are read in chunks of this many characters/bytes
+CHUNK_SIZE = 1 << 16
+
+def _scan(buf: str, pos: int, endpos: int, line_num: int) -> Iterator[Token]:
+    # Yield tokens from buf[pos:endpos]; buf[pos] must sit at the start of a line
+    line_start = pos
+    for mo in compiled_re.finditer(buf, pos, endpos):
+        kind = mo.lastgroup
         if kind == 'NEWLINE':
             line_num += 1
             line_start = mo.end()
         elif kind == 'WHITESPACE' or kind == 'COMMENT':
             continue  # Skip whitespace and comments
         else:
-            tokens.append(Token(kind, value, line_num, column))
-    return tokens
+            yield Token(kind, mo.group(), line_num, mo.start() - line_start)
+
+def _scan_fast(buf: str, pos: int, endpos: int, line_num: int) -> Iterator[Token]:
+    # Same contract as _scan, but single glyphs skip the regex engine
+    line_start = pos
+    match = compiled_re.match
+    glyphs = GLYPHS
+    while pos < endpos:
+        ch = buf[pos]
+        kind = glyphs.get(ch)
+        if kind is not None:
+            yield Token(kind, ch, line_num, pos - line_start)
+            pos += 1
+            continue
+        if ch == '"' and pos > 0 and (buf[pos - 1].isascii() and buf[pos - 1].isalnum()
+                                      or buf[pos - 1] in '_)'):
+            yield Token('DEREF', ch, line_num, pos - line_start)
+            pos += 1
+            continue
+        mo = match(buf, pos, endpos)
+        kind = mo.lastgroup
+        if kind == 'NEWLINE':
+            line_num += 1
+            line_start = mo.end()
+        elif kind != 'WHITESPACE' and kind != 'COMMENT':
+            yield Token(kind, mo.group(), line_num, pos - line_start)
+        pos = mo.end()
+
+def _read_chunks(stream, chunk_size: int) -> Iterator[str]:
+    # Text streams yield str; binary streams and mmaps are decoded incrementally
+    decoder = None
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+def iter_tokens(source, chunk_size: int = CHUNK_SIZE, fast: bool = False) -> Iterator[Token]:
+    # Lazily tokenize a str, bytes, file object or mmap.
+    # No token spans a newline, so each chunk is scanned up to its last
+    # newline and the partial line is carried into the next chunk.
+    scan = _scan_fast if fast else _scan
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = bytes(source).decode('utf-8')
+    if isinstance(source, str):
+        yield from scan(source, 0, len(source), 1)
+        return
+
+    line_num = 1
+    buf = ''
+    for chunk in _read_chunks(source, chunk_size):
+        buf += chunk
+        cut = buf.rfind('\n') + 1
+        if cut == 0:
+            continue  # No complete line yet
+        yield from scan(buf, 0, cut, line_num)
+        line_num += buf.count('\n', 0, cut)
+        buf = buf[cut:]
+    if buf:
+        yield from scan(buf, 0, len(buf), line_num)
+
+def tokenize(code: str, fast: bool = False) -> List[Token]:
+    return list(iter_tokens(code, fast=fast))
+
+# === Columnar token store ===
+# One small integer per column instead of a Token object per lexeme.
+# Values are sliced out of the source only when asked for. The source may be
+# a str or any bytes-like buffer, mmaps included; buffer slices are decoded
+# on demand and offsets, lines and columns then count bytes. Identifiers and
+# types are interned as they are scanned: syms holds their symbol ID (-1 for
+# other tokens) and their value is the table's shared str.
+
+class TokenBuffer:
+    __slots__ = ('source', 'symbols', 'kinds', 'starts', 'ends', 'lines', 'cols', 'syms')
+
+    def __init__(self, source, symbols: SymbolTable = None):
+        self.source = source
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.syms = array('i')
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.cols = array('I')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, i: int) -> str:
+        return KINDS[self.kinds[i]]
+
+    def value(self, i: int) -> str:
+        sym = self.syms[i]
+        if sym >= 0:
+            return self.symbols.names[sym]
+        value = self.source[self.starts[i]:self.ends[i]]
+        return value if isinstance(value, str) else str(value, 'utf-8')
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Token(KINDS[self.kinds[i]], self.value(i), self.lines[i], self.cols[i])
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield self[i]
+
+    def nbytes(self) -> int:
+        return sum(len(col) * col.itemsize
+                   for col in (self.kinds, self.starts, self.ends, self.lines, self.cols, self.syms))
+
+    def __repr__(self):
+        return f"TokenBuffer({len(self)} tokens, {self.nbytes()} bytes)"
+
+def tokenize_buffer(code, symbols: SymbolTable = None) -> TokenBuffer:
+    # code is a str, bytes, bytearray, memoryview or mmap; nothing is copied.
+    # Pass a shared SymbolTable to intern names across several sources.
+    pattern = compiled_re if isinstance(code, str) else bytes_pattern()
+    buf = TokenBuffer(code, symbols)
+    kinds, starts, ends = buf.kinds.append, buf.starts.append, buf.ends.append
+    lines, cols, syms = buf.lines.append, buf.cols.append, buf.syms.append
+    table = buf.symbols
+    intern, ids = table.intern, table.ids
+    codes = KIND_CODES
+    newline, skip = codes['NEWLINE'], (codes['WHITESPACE'], codes['COMMENT'])
+    ident, type_ = codes['IDENT'], codes['TYPE']
+    line_num = 1
+    line_start = 0
+    for mo in pattern.finditer(code):
+        kind = codes[mo.lastgroup]
+        if kind == newline:
+            line_num += 1
+            line_start = mo.end()
+        elif kind not in skip:
+            start = mo.start()
+            kinds(kind)
+            starts(start)
+            ends(mo.end())
+            lines(line_num)
+            cols(start - line_start)
+            if kind == ident or kind == type_:
+                text = mo.group()
+                sym = ids.get(text)
+                if sym is None:
+                    sym = intern(text)
+                    if kind == type_:
+                        table.mark(sym, SYM_TYPE)
+                syms(sym)
+            else:
+                syms(-1)
+    return buf
 
 # Test snippet
 test_code = '''
@@ -73,6 +272,7 @@ set_type math {
 }
 '''
 
-tokens = tokenize(test_code)
-tokens[:25]  # Show a sample of the first 25 tokens for inspection
+if __name__ == '__main__':
+    for token in tokenize(test_code)[:25]:  # Show a sample of the first 25 tokens
+        print(token)
 
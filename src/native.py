@@ -0,0 +1,206 @@
+# native.py — dotc run --native: run programs as shared libraries, in-process.
+# A program is emitted as C, compiled by the local C compiler ($CC, else cc)
+# into a shared object and loaded with ctypes; main() and every set function
+# can then be called from Python as often as needed, with no process spawned.
+# Objects live in the compilation cache next to the emitted C, keyed by the
+# source, the dotc version, -O, --heap and the C compiler command and flags, so
+# only a changed program goes through the toolchain again: a hit costs a
+# hash, a stat and a dlopen. Each entry also keeps the parameter signature
+# of every function, pickled, so calls are checked and converted without
+# the front end ever running. LRU eviction covers the objects too.
+#
+# The program runs without the VM's checks: an out-of-range index here is
+# undefined behaviour in the calling process, as in the compiled binary.
+
+import ctypes
+import os
+
+from cache import DEFAULT_DIR, Cache
+
+CFLAGS = ('-O2', '-shared', '-fPIC')
+LIBS = ('-lm',)
+
+# Parameter kinds -> ctypes types, following emitter.C_TYPES
+CTYPES = {
+    'i': ctypes.c_int, 'f': ctypes.c_float, 'd': ctypes.c_double, 'c': ctypes.c_char,
+    'sh': ctypes.c_short, 'l': ctypes.c_long, 'll': ctypes.c_longlong, 's': ctypes.c_char_p,
+    '$': ctypes.c_int,
+}
+
+class NativeError(Exception):
+    pass
+
+def compiler() -> str:
+    return os.environ.get('CC') or 'cc'
+
+def signatures(module):
+    # {name: [(param name, kind, array size, by reference)]} for the
+    # functions defined here, as the C emitter declares their parameters
+    from ir import HEAP, POINTER, PSEUDO, STACK, STRUCT, base_type
+    result = {}
+    for fn in module.functions[1:]:
+        if fn.external:
+            continue
+        params = []
+        for slot in fn.params:
+            flags = module.slot_flags[slot]
+            kind = base_type(module.slot_types[slot])
+            if flags & STRUCT:
+                kind = 'struct ' + module.slot_types[slot]
+            by_ref = kind != 's' and bool(flags & (POINTER | HEAP | PSEUDO)) and not flags & STACK
+            params.append((module.slot_names[slot], kind, module.slot_sizes[slot], by_ref))
+        result[fn.name] = params
+    return result
+
+def load(code, cache_dir: str = DEFAULT_DIR, opt_level: int = 1, pool: bool = False) -> 'Program':
+    # Program for Dot source code, compiling it only on a cache miss
+    from dotc import __version__
+    cache = Cache(__version__, cache_dir)
+    flags = ' '.join(CFLAGS + LIBS)
+    key = cache.key(code, 'so', f"O{opt_level}{' pool' if pool else ''} {compiler()} {flags}")
+    path = cache.library(key)
+    artifacts = cache.artifacts(key) if path else None
+    if artifacts is None:
+        module, source = translate(code, opt_level, pool)
+        artifacts = {'signatures': signatures(module)}
+        path = cache.put_library(key, build(source, cache.path), source, artifacts)
+    return Program(path, artifacts['signatures'])
+
+def translate(code, opt_level: int, pool: bool):
+    # (checked and optimised ir.Module, its C source)
+    from check import CheckError, check
+    from emitter import emit_string
+    from ir import lower
+    from lexer import tokenize_buffer
+    from parser import parse
+
+    module = lower(parse(tokenize_buffer(code)))
+    problems = check(module)
+    if problems:
+        raise CheckError(problems)
+    if opt_level:
+        from opt import optimize
+        optimize(module)
+    return module, emit_string(module, 'c', pool=pool)
+
+def build(source: str, directory: str) -> bytes:
+    # Compile C source to a shared object and return its bytes
+    import subprocess
+    import tempfile
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=directory, suffix='.tmp') as tmp:
+        c_path, so_path = os.path.join(tmp, 'program.c'), os.path.join(tmp, 'program.so')
+        with open(c_path, 'w') as f:
+            f.write(source)
+        command = [compiler(), *CFLAGS, c_path, '-o', so_path, *LIBS]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except OSError as e:
+            raise NativeError(f"cannot run the C compiler '{command[0]}': {e.strerror} "
+                              f"(set CC to choose one)") from None
+        if result.returncode:
+            raise NativeError(f"{command[0]} failed on the emitted C:\n{result.stderr.rstrip()}")
+        with open(so_path, 'rb') as f:
+            return f.read()
+
+class Program:
+    # A loaded shared object. main() runs the program's top level; call()
+    # runs one set function by its dotted name.
+    def __init__(self, path: str, signatures):
+        self.path = path
+        self.signatures = signatures
+        self.lib = ctypes.CDLL(os.path.abspath(path))
+        self.libc = ctypes.CDLL(None)
+        self.functions = {}
+
+    def main(self, capture: bool = False):
+        # The exit status, or (status, output) when capture is set: the C
+        # stdout is then redirected to a temporary file for the call
+        import sys
+        sys.stdout.flush()
+        if not capture:
+            status = self.lib.main()
+            self.libc.fflush(None)
+            return status
+        import tempfile
+        saved = os.dup(1)
+        with tempfile.TemporaryFile() as f:
+            os.dup2(f.fileno(), 1)
+            try:
+                status = self.lib.main()
+                self.libc.fflush(None)
+            finally:
+                os.dup2(saved, 1)
+                os.close(saved)
+            f.seek(0)
+            return status, f.read().decode('utf-8', 'replace')
+
+    def call(self, name: str, *args):
+        # Run set function name ('group.function') on args: numbers for
+        # scalars, sequences for i_N arrays, str for s_. Parameters are
+        # references, so the result is the list of arguments as the function
+        # left them; lists passed in are updated in place as well.
+        params = self.signatures.get(name)
+        if params is None:
+            raise NativeError(f"no function '{name}' in this program")
+        if len(args) != len(params):
+            raise NativeError(f"'{name}' takes {len(params)} argument(s), {len(args)} given")
+        fn = self.function(name, params)
+        cells = [cell(name, param, arg) for param, arg in zip(params, args)]
+        fn(*[value if by_ref is None else by_ref for value, by_ref in cells])
+        results = []
+        for (_, kind, size, _), arg, (value, _) in zip(params, args, cells):
+            if size:
+                values = [unwrap(kind, item) for item in value]
+                if isinstance(arg, list):
+                    arg[:] = values
+                results.append(values)
+            else:
+                results.append(unwrap(kind, value.value))
+        return results
+
+    def function(self, name: str, params):
+        fn = self.functions.get(name)
+        if fn is None:
+            fn = getattr(self.lib, name.replace('.', '_'))
+            fn.restype = None
+            fn.argtypes = [argtype(name, param) for param in params]
+            self.functions[name] = fn
+        return fn
+
+def argtype(name, param):
+    param_name, kind, size, by_ref = param
+    ctype = CTYPES.get(kind)
+    if ctype is None:
+        raise NativeError(f"'{name}': parameter '{param_name}' of type {kind} can't be passed "
+                          f"from Python")
+    return ctypes.POINTER(ctype) if by_ref or size else ctype
+
+def cell(name, param, arg):
+    # (ctypes value, what to pass if it goes by reference, else None)
+    param_name, kind, size, by_ref = param
+    ctype = CTYPES[kind]
+    try:
+        if size:
+            if len(arg) != size:
+                raise NativeError(f"'{name}': '{param_name}' needs {size} elements, got {len(arg)}")
+            array = (ctype * size)(*[wrap_arg(kind, item) for item in arg])
+            return array, array
+        value = ctype(wrap_arg(kind, arg))
+    except TypeError as e:
+        raise NativeError(f"'{name}': bad value for '{param_name}': {e}") from None
+    return (value, ctypes.byref(value)) if by_ref else (value, None)
+
+def wrap_arg(kind, value):
+    if kind == 's':
+        return value.encode() if isinstance(value, str) else value
+    if kind == 'c':
+        return value.encode() if isinstance(value, str) else bytes([value])
+    return value
+
+def unwrap(kind, value):
+    if kind == 's' and isinstance(value, bytes):
+        return value.decode()
+    if kind == 'c' and isinstance(value, bytes):
+        return value.decode('latin-1')
+    return value
@@ -0,0 +1,549 @@
+# opt.py — Optimisation passes over the IR.
+# A PassManager runs a pipeline of passes over every function of an
+# ir.Module after the ownership check, repeating it until a round changes
+# nothing. Passes rewrite instructions in place and turn the ones they drop
+# into NOPs; after a pass that changed anything, pure ops whose temp is no
+# longer used are swept and the function is compacted. Each pass times
+# itself and counts its rewrites.
+#
+#   fold         constant folding with C semantics, including ^ (pow) and -x
+#   copy         constant and copy propagation through scalar locals
+#   unreachable  branches and loops whose condition is a constant
+#   dse          dead stores: overwritten before any read, or never read at all
+#   stack        heap and owned pointers that are released in the scope that
+#                declared them, and never handed to a function that might
+#                release them, become plain locals (module pass, run last)
+#
+# Knowledge never crosses a control-flow marker or a call, so each function
+# pass is a single linear walk.
+
+import math
+import operator
+import time
+from array import array
+
+from ir import (ADD, ADDR, ARG, ARRAY, CALL, CONST, DECL, DIV, ELIF, ELSE, END, EQ, GE, GT, HEAP,
+                IF, LE, LOAD, LOADIDX, LOOP, LT, MOD, MUL, NE, NEG, NOP, PARAM, POINTER, POW,
+                PRINT, PSEUDO, PURE_OPS, RELEASE, SLOT_A_OPS, STACK, STORE, STOREIDX, STOREMEM,
+                STRUCT, SUB, WHILE, BINARY_SYMBOLS, Function, Module, base_type)
+
+MARKERS = frozenset((IF, ELIF, ELSE, LOOP, WHILE, END))
+
+# Instructions reading a temp in a, in b
+READS_A = frozenset((NEG, STORE, STOREIDX, DECL, PRINT, ARG, IF, ELIF, WHILE, *BINARY_SYMBOLS))
+READS_B = frozenset((LOADIDX, STOREIDX, STOREMEM, *BINARY_SYMBOLS))
+
+INT_MIN, INT_MAX = -(1 << 31), (1 << 31) - 1
+
+# Slot base types a literal may stand in for without changing the C type
+LITERAL_KINDS = {int: ('i', 'l', 'll'), float: ('d',)}
+
+# === Temps ===
+
+def index_temps(fn: Function):
+    # temp -> defining instruction, temp -> using instruction (-1 if unused)
+    ops, dst, a, b = fn.ops, fn.dst, fn.a, fn.b
+    defs = [-1] * fn.ntemps
+    users = [-1] * fn.ntemps
+    for i in range(len(ops)):
+        op = ops[i]
+        if op in PURE_OPS:
+            defs[dst[i]] = i
+        if op in READS_A and a[i] >= 0:
+            users[a[i]] = i
+        if op in READS_B:
+            users[b[i]] = i
+    return defs, users
+
+def sweep(fn: Function):
+    # NOP every pure op whose temp nothing reads, walking back so that whole
+    # expression trees go at once
+    ops, dst, a, b = fn.ops, fn.dst, fn.a, fn.b
+    used = bytearray(fn.ntemps)
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op in PURE_OPS and not used[dst[i]]:
+            ops[i] = NOP
+            continue
+        if op in READS_A and a[i] >= 0:
+            used[a[i]] = 1
+        if op in READS_B:
+            used[b[i]] = 1
+
+def compact(fn: Function):
+    ops = fn.ops
+    keep = [i for i in range(len(ops)) if ops[i] != NOP]
+    if len(keep) == len(ops):
+        return
+    for column in ('ops', 'dst', 'a', 'b', 'pos'):
+        old = getattr(fn, column)
+        setattr(fn, column, array(old.typecode, [old[i] for i in keep]))
+
+# === Constant folding ===
+
+ARITH = {ADD: operator.add, SUB: operator.sub, MUL: operator.mul}
+COMPARE = {EQ: operator.eq, NE: operator.ne, LT: operator.lt, LE: operator.le,
+           GT: operator.gt, GE: operator.ge}
+
+def trunc_div(x: int, y: int) -> int:
+    # C integer division rounds toward zero
+    q = abs(x) // abs(y)
+    return q if (x < 0) == (y < 0) else -q
+
+def fold_value(op: int, x, y=None):
+    # Result of op on int/float constants as C computes it, or None where
+    # folding would change behaviour: int overflow, division by zero, and
+    # non-finite or complex results are left for run time
+    try:
+        if op == NEG:
+            result = -x
+        elif op in ARITH:
+            result = ARITH[op](x, y)
+        elif op in COMPARE:
+            result = int(COMPARE[op](x, y))
+        elif op == POW:
+            result = math.pow(x, y)  # C's pow() is always double
+        elif op == DIV:
+            result = trunc_div(x, y) if isinstance(x, int) and isinstance(y, int) else x / y
+        elif op == MOD:
+            if not (isinstance(x, int) and isinstance(y, int)):
+                return None  # % on doubles doesn't compile
+            result = x - y * trunc_div(x, y)
+        else:
+            return None
+    except (ZeroDivisionError, ValueError, OverflowError):
+        return None
+    if isinstance(result, int):
+        return result if INT_MIN <= result <= INT_MAX else None
+    return result if math.isfinite(result) else None
+
+def fold(module: Module, fn: Function) -> int:
+    consts = module.consts
+    ops, dst, a, b = fn.ops, fn.dst, fn.a, fn.b
+    value = {}  # temp -> numeric constant it holds
+    changed = 0
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == CONST:
+            v = consts[a[i]]
+            if isinstance(v, (int, float)):
+                value[dst[i]] = v
+            continue
+        if op == NEG and a[i] in value:
+            result = fold_value(op, value[a[i]])
+        elif op in BINARY_SYMBOLS and a[i] in value and b[i] in value:
+            result = fold_value(op, value[a[i]], value[b[i]])
+        else:
+            continue
+        if result is not None:
+            ops[i], a[i], b[i] = CONST, module.const(result), -1
+            value[dst[i]] = result
+            changed += 1
+    return changed
+
+# === Copy propagation ===
+
+def stored(module: Module, kind: str, k: int):
+    # Constant a slot of base type kind holds after storing consts[k], or
+    # None if the literal couldn't stand in for it
+    value = module.consts[k]
+    if isinstance(value, float) and kind in LITERAL_KINDS[int]:
+        value = math.trunc(value)  # Assigning a double to an int truncates
+        return module.const(value) if INT_MIN <= value <= INT_MAX else None
+    return k if kind in LITERAL_KINDS.get(type(value), ()) else None
+
+def propagate(module: Module, fn: Function) -> int:
+    # Loads of a scalar local whose value is a known constant, or a copy of
+    # another local, read that instead. Loads passed as call arguments stay:
+    # parameters bind to them by reference.
+    flags, types = module.slot_flags, module.slot_types
+    ops, dst, a = fn.ops, fn.dst, fn.a
+    defs, users = index_temps(fn)
+    kinds = {}
+    known = {}   # slot -> (CONST, k) or (LOAD, source slot)
+    copies = {}  # source slot -> slots known to hold a copy of it
+
+    def kind(slot):
+        k = kinds.get(slot)
+        if k is None:
+            k = kinds[slot] = '' if flags[slot] & (PARAM | ARRAY | STRUCT) else base_type(types[slot])
+        return k
+
+    def forget(slot):
+        fact = known.pop(slot, None)
+        if fact is not None and fact[0] == LOAD:
+            copies[fact[1]].discard(slot)
+        for other in copies.pop(slot, ()):
+            known.pop(other, None)
+
+    changed = 0
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == LOAD:
+            fact = known.get(a[i])
+            user = users[dst[i]]
+            if fact is not None and user >= 0 and ops[user] != ARG:
+                ops[i], a[i] = fact
+                changed += 1
+        elif op == STORE or op == DECL:
+            slot = dst[i]
+            forget(slot)
+            if a[i] < 0 or not kind(slot):
+                continue
+            d = defs[a[i]]
+            if ops[d] == CONST:
+                k = stored(module, kind(slot), a[d])
+                if k is not None:
+                    known[slot] = (CONST, k)
+            elif ops[d] == LOAD and a[d] != slot and kind(a[d]) == kind(slot):
+                known[slot] = (LOAD, a[d])
+                copies.setdefault(a[d], set()).add(slot)
+        elif op in (STOREIDX, STOREMEM, RELEASE):
+            forget(dst[i])
+        elif op in SLOT_A_OPS:
+            forget(a[i])  # ADDR: about to be passed by reference
+        elif op == CALL or op in MARKERS:
+            known.clear()
+            copies.clear()
+    return changed
+
+# === Unreachable branches ===
+
+def structure(ops):
+    # END of every IF and LOOP, and the arms of every IF as
+    # [leading ELSE or None, IF/ELIF or None, body start]
+    ends, arms, stack = {}, {}, []
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == IF:
+            stack.append(i)
+            arms[i] = [[None, i, i + 1]]
+        elif op == LOOP:
+            stack.append(i)
+        elif op == ELSE:
+            arms[stack[-1]].append([i, None, i + 1])
+        elif op == ELIF:
+            arm = arms[stack[-1]][-1]
+            arm[1], arm[2] = i, i + 1
+        elif op == END:
+            ends[stack.pop()] = i
+    return ends, arms
+
+def prune(module: Module, fn: Function) -> int:
+    consts = module.consts
+    ops, a = fn.ops, fn.a
+    defs, _ = index_temps(fn)
+    ends, arms = structure(ops)
+
+    def truth(marker):
+        # A bare else is always taken; None when the condition isn't constant
+        if marker is None:
+            return True
+        d = defs[a[marker]]
+        if ops[d] == CONST and isinstance(consts[a[d]], (int, float)):
+            return bool(consts[a[d]])
+        return None
+
+    def drop(start, stop):
+        for j in range(start, stop):
+            ops[j] = NOP
+
+    changed = 0
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == LOOP:
+            w = i + 1
+            while ops[w] != WHILE:
+                w += 1
+            if truth(w) is False:
+                drop(i, ends[i] + 1)
+                changed += 1
+        elif op == IF:
+            end = ends[i]
+            kept, rewrite = [], False
+            branches = arms[i]
+            for k, (lead, marker, start) in enumerate(branches):
+                stop = branches[k + 1][0] if k + 1 < len(branches) else end
+                taken = truth(marker)
+                if taken is False:
+                    drop(marker if lead is None else lead, stop)
+                    rewrite = True
+                    continue
+                kept.append((lead, marker, taken))
+                if taken:
+                    if k + 1 < len(branches):
+                        drop(branches[k + 1][0], end)  # Arms after it never run
+                        rewrite = True
+                    rewrite = rewrite or marker is not None
+                    break
+            if not rewrite:
+                continue
+            changed += 1
+            if not kept:
+                ops[end] = NOP
+                continue
+            lead, marker, taken = kept[0]
+            if lead is not None:
+                ops[lead] = NOP
+            if taken:
+                # Always taken first: the body runs unconditionally
+                if marker is not None:
+                    ops[marker] = NOP
+                ops[end] = NOP
+                continue
+            ops[marker] = IF
+            for lead, marker, taken in kept[1:]:
+                if taken and marker is not None:
+                    ops[marker] = NOP  # Always-taken elif becomes the else
+    return changed
+
+# === Dead stores ===
+
+def dead_stores(module: Module, fn: Function) -> int:
+    # A store to a local is dead when the same location is stored again
+    # before any read, call or control-flow marker, or when nothing in the
+    # function ever reads the slot. Parameters are left alone: their stores
+    # land in the caller's memory.
+    flags = module.slot_flags
+    ops, dst, a = fn.ops, fn.dst, fn.a
+    defs, _ = index_temps(fn)
+    read, released = set(), set()
+    for i in range(len(ops)):
+        if ops[i] in SLOT_A_OPS:
+            read.add(a[i])
+        elif ops[i] == RELEASE:
+            released.add(dst[i])
+
+    def kill(i):
+        if ops[i] == DECL:
+            a[i] = -1  # Keep the declaration, drop the initialiser
+        else:
+            ops[i] = NOP
+
+    changed = 0
+    pending = {}  # location -> store not yet read
+    locations = {}  # slot -> its pending locations
+    for i in range(len(ops)):
+        op = ops[i]
+        if op in SLOT_A_OPS or op == RELEASE:
+            slot = a[i] if op != RELEASE else dst[i]
+            for location in locations.pop(slot, ()):
+                pending.pop(location, None)
+        elif op in (STORE, STOREIDX, STOREMEM, DECL):
+            slot = dst[i]
+            if flags[slot] & PARAM or (op == DECL and a[i] < 0):
+                continue
+            if slot not in read:
+                if op == DECL and not flags[slot] & POINTER and slot not in released:
+                    ops[i] = NOP
+                else:
+                    kill(i)
+                changed += 1
+                continue
+            if op == STOREIDX:
+                d = defs[a[i]]
+                if ops[d] != CONST:
+                    continue
+                location = (slot, STOREIDX, a[d])
+            elif op == STOREMEM:
+                location = (slot, STOREMEM, a[i])
+            else:
+                location = (slot,)
+            previous = pending.get(location)
+            if previous is not None:
+                changed += 1
+                if ops[previous] == DECL and op == STORE:
+                    old, new = defs[a[previous]], defs[a[i]]
+                    if ops[old] == CONST and ops[new] == CONST:
+                        a[old] = a[new]  # i_ 'x = 1; x" = 4;  ->  i_ 'x = 4;
+                        ops[i] = NOP
+                        continue
+                kill(previous)
+            pending[location] = i
+            locations.setdefault(slot, []).append(location)
+        elif op == CALL or op in MARKERS:
+            pending.clear()
+            locations.clear()
+    return changed
+
+# === Stack promotion ===
+
+MAX_STACK_ELEMENTS = 512  # Larger arrays stay on the heap
+
+def calls(module: Module, fn: Function):
+    # (callee Function or None if unknown, [slot passed whole, or -1]) per call
+    index = {f.name: f for f in module.functions}
+    ops, dst, a = fn.ops, fn.dst, fn.a
+    defs, args = {}, []
+    for i in range(len(ops)):
+        op = ops[i]
+        if op in PURE_OPS:
+            defs[dst[i]] = i
+        elif op == ARG:
+            d = defs[a[i]]
+            args.append(a[d] if ops[d] in (LOAD, ADDR) else -1)
+        elif op == CALL:
+            yield index.get(module.consts[a[i]]), args
+            args = []
+
+def releasing(module: Module):
+    # Parameters whose function may release what they are given: directly,
+    # or by passing it on to such a parameter or to another module
+    released, forwards = set(), []
+    for fn in module.functions:
+        if fn.external:
+            continue
+        params = set(fn.params)
+        for i in range(len(fn.ops)):
+            if fn.ops[i] == RELEASE and fn.dst[i] in params:
+                released.add(fn.dst[i])
+        for callee, args in calls(module, fn):
+            forwards.extend((slot, callee, pos) for pos, slot in enumerate(args) if slot in params)
+    changed = True
+    while changed:
+        changed = False
+        for slot, callee, pos in forwards:
+            if slot not in released and may_release(callee, pos, released):
+                released.add(slot)
+                changed = True
+    return released
+
+def may_release(callee, pos: int, released) -> bool:
+    return callee is None or callee.external or pos >= len(callee.params) \
+        or callee.params[pos] in released
+
+def scopes(ops):
+    # Block id of every instruction: each IF/LOOP opens a fresh block, each
+    # ELSE/ELIF/WHILE switches to a fresh sibling, END returns to the parent
+    ids = [0] * len(ops)
+    stack, current, fresh = [], 0, 0
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == IF or op == LOOP:
+            stack.append(current)
+            fresh += 1
+            current = fresh
+        elif op == ELSE or op == ELIF or op == WHILE:
+            fresh += 1
+            current = fresh
+        elif op == END:
+            current = stack.pop()
+        ids[i] = current
+    return ids
+
+def promote(module: Module) -> int:
+    # Flag STACK on owned slots declared once and released once in the same
+    # block of the same function; emitters then give them automatic storage.
+    # A promoted slot that nothing reads any more loses its DECL and RELEASE.
+    flags, sizes, owners = module.slot_flags, module.slot_sizes, module.slot_func
+    released = releasing(module)
+    promoted = 0
+    for index, fn in enumerate(module.functions):
+        if fn.external:
+            continue
+        escapes = set()
+        for callee, args in calls(module, fn):
+            escapes.update(slot for pos, slot in enumerate(args)
+                           if slot >= 0 and may_release(callee, pos, released))
+        decls, releases, read = {}, {}, set()
+        ops, dst, a = fn.ops, fn.dst, fn.a
+        for i in range(len(ops)):
+            op = ops[i]
+            if op in SLOT_A_OPS:
+                read.add(a[i])
+            elif op == DECL:
+                decls.setdefault(dst[i], []).append(i)
+            elif op == RELEASE:
+                releases.setdefault(dst[i], []).append(i)
+        ids, dropped = None, False
+        for slot, at in decls.items():
+            f = flags[slot]
+            if not f & (HEAP | POINTER) or f & (PARAM | PSEUDO | STACK) or owners[slot] != index:
+                continue
+            ends = releases.get(slot, ())
+            if len(at) != 1 or len(ends) != 1 or slot in escapes or sizes[slot] > MAX_STACK_ELEMENTS:
+                continue
+            if ids is None:
+                ids = scopes(ops)
+            if ids[at[0]] == ids[ends[0]]:
+                flags[slot] |= STACK
+                promoted += 1
+                if slot not in read:
+                    ops[at[0]] = ops[ends[0]] = NOP
+                    dropped = True
+        if dropped:
+            sweep(fn)
+            compact(fn)
+    return promoted
+
+# === Pass manager ===
+
+PASSES = {
+    'fold': fold,
+    'copy': propagate,
+    'unreachable': prune,
+    'dse': dead_stores,
+}
+MODULE_PASSES = {
+    'stack': promote,
+}
+PIPELINE = ('fold', 'copy', 'unreachable', 'dse', 'stack')
+
+class PassManager:
+    def __init__(self, passes=PIPELINE, rounds: int = 4):
+        self.passes = [(name, PASSES[name]) for name in passes if name in PASSES]
+        self.module_passes = [(name, MODULE_PASSES[name]) for name in passes if name in MODULE_PASSES]
+        self.rounds = rounds
+        self.times = {name: 0.0 for name in passes}
+        self.changes = {name: 0 for name in passes}
+        self.before = self.after = 0
+
+    def run(self, module: Module) -> Module:
+        # Function passes to a fixed point, then module passes once
+        for fn in module.functions:
+            if fn.external:
+                continue
+            self.before += len(fn)
+            for _ in range(self.rounds):
+                changed = 0
+                for name, run_pass in self.passes:
+                    start = time.perf_counter()
+                    n = run_pass(module, fn)
+                    if n:
+                        sweep(fn)
+                        compact(fn)
+                    self.times[name] += time.perf_counter() - start
+                    self.changes[name] += n
+                    changed += n
+                if not changed:
+                    break
+            self.after += len(fn)
+        for name, run_pass in self.module_passes:
+            start = time.perf_counter()
+            size = sum(len(fn) for fn in module.functions)
+            self.changes[name] += run_pass(module)
+            self.after += sum(len(fn) for fn in module.functions) - size
+            self.times[name] += time.perf_counter() - start
+        return module
+
+    def report(self) -> str:
+        lines = [f"{'pass':12} {'ms':>8} {'rewrites':>9}"]
+        for name, _ in self.passes + self.module_passes:
+            lines.append(f"{name:12} {self.times[name] * 1000:8.3f} {self.changes[name]:9}")
+        lines.append(f"instructions {self.before} -> {self.after}")
+        return '\n'.join(lines)
+
+def optimize(module: Module, passes=PIPELINE) -> PassManager:
+    manager = PassManager(passes)
+    manager.run(module)
+    return manager
+
+if __name__ == '__main__':
+    import sys
+
+    from ir import format_ir, lower
+    with open(sys.argv[1]) as f:
+        module = lower(f.read())
+    manager = optimize(module)
+    print(format_ir(module))
+    print(manager.report(), file=sys.stderr)
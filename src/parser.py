@@ -1 +1,615 @@
-# parser implementation (see ../archive/tokeniser.py for best effort hitherto
\ No newline at end of file
+# parser.py — Recursive-descent parser for the Dot language.
+# Consumes a lexer.TokenBuffer in a single left-to-right pass with at most
+# three tokens of lookahead, and builds a compact AST of __slots__ nodes.
+# Every node records start/end offsets into the source it came from.
+
+from typing import List, Optional
+
+from lexer import KIND_CODES, TokenBuffer, tokenize_buffer
+from symbols import (CONST as SYM_CONST, HEAP as SYM_HEAP, POINTER as SYM_POINTER,
+                     PSEUDO as SYM_PSEUDO, SET as SYM_SET, STRUCT as SYM_STRUCT)
+
+class ParseError(Exception):
+    def __init__(self, message: str, line: int, col: int):
+        super().__init__(f"{line}:{col}: {message}")
+        self.message = message
+        self.line = line
+        self.col = col
+
+# === AST ===
+
+class Node:
+    __slots__ = ('start', 'end')
+
+    def __repr__(self):
+        fields = []
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if name not in ('start', 'end'):
+                    fields.append(f"{name}={getattr(self, name)!r}")
+        return f"{type(self).__name__}({', '.join(fields)})"
+
+# --- Expressions ---
+
+class Number(Node):
+    __slots__ = ('value',)
+    def __init__(self, value, start, end): self.value, self.start, self.end = value, start, end
+
+class String(Node):
+    __slots__ = ('value',)
+    def __init__(self, value, start, end): self.value, self.start, self.end = value, start, end
+
+class Name(Node):
+    __slots__ = ('name',)
+    def __init__(self, name, start, end): self.name, self.start, self.end = name, start, end
+
+class Ref(Node):
+    # 'x — the pointer itself, as passed to functions
+    __slots__ = ('name',)
+    def __init__(self, name, start, end): self.name, self.start, self.end = name, start, end
+
+class Deref(Node):
+    # x" (value), x"3 / x"i (element or member)
+    __slots__ = ('name', 'index')
+    def __init__(self, name, index, start, end):
+        self.name, self.index, self.start, self.end = name, index, start, end
+
+class Pseudo(Node):
+    # x@ (value), x@i / x@(expr) (element) — by-reference parameters
+    __slots__ = ('name', 'index')
+    def __init__(self, name, index, start, end):
+        self.name, self.index, self.start, self.end = name, index, start, end
+
+class Member(Node):
+    __slots__ = ('base', 'field')
+    def __init__(self, base, field, start, end):
+        self.base, self.field, self.start, self.end = base, field, start, end
+
+class UnaryOp(Node):
+    __slots__ = ('op', 'operand')
+    def __init__(self, op, operand, start, end):
+        self.op, self.operand, self.start, self.end = op, operand, start, end
+
+class BinOp(Node):
+    __slots__ = ('op', 'left', 'right')
+    def __init__(self, op, left, right, start, end):
+        self.op, self.left, self.right, self.start, self.end = op, left, right, start, end
+
+class FunctionCall(Node):
+    # target is the dotted callee name, e.g. 'f' or 'math.max_of'
+    __slots__ = ('target', 'args')
+    def __init__(self, target, args, start, end):
+        self.target, self.args, self.start, self.end = target, args, start, end
+
+# --- Statements ---
+
+class Declaration(Node):
+    # i_ 'x = 1;   i_5 'arr;   i~ 'h;   s_ s" = "hi":   i_ i = 0,
+    __slots__ = ('dtype', 'name', 'value', 'pointer', 'const')
+    def __init__(self, dtype, name, value, pointer, const, start, end):
+        self.dtype, self.name, self.value = dtype, name, value
+        self.pointer, self.const = pointer, const
+        self.start, self.end = start, end
+
+class Assignment(Node):
+    # op is '=' or a compound operator ('+=', ...); x@++ is x@ += 1
+    __slots__ = ('target', 'value', 'op')
+    def __init__(self, target, value, op, start, end):
+        self.target, self.value, self.op, self.start, self.end = target, value, op, start, end
+
+class PrintStmt(Node):
+    # A bare value statement (x", "label: " x@) prints its parts
+    __slots__ = ('parts',)
+    def __init__(self, parts, start, end): self.parts, self.start, self.end = parts, start, end
+
+class Dealloc(Node):
+    # 'x\ — explicit release; ~x\ releases the heap instance x
+    __slots__ = ('var',)
+    def __init__(self, var, start, end): self.var, self.start, self.end = var, start, end
+
+class StructInstance(Node):
+    # vec 'p{1, 2};   vec_i p{x" = 1, y" = 2};  values may be Assignments.
+    # Only ' and ~ instances are owned and must be released.
+    __slots__ = ('struct_type', 'name', 'values', 'heap', 'pointer')
+    def __init__(self, struct_type, name, values, heap, pointer, start, end):
+        self.struct_type, self.name, self.values, self.heap = struct_type, name, values, heap
+        self.pointer = pointer
+        self.start, self.end = start, end
+
+class ControlFlow(Node):
+    # kind is 'if', 'elif' or 'while'; an elif chain hangs off orelse
+    __slots__ = ('kind', 'condition', 'body', 'orelse')
+    def __init__(self, kind, condition, body, orelse, start, end):
+        self.kind, self.condition, self.body, self.orelse = kind, condition, body, orelse
+        self.start, self.end = start, end
+
+class StructDef(Node):
+    # fields are (dtype, name) pairs
+    __slots__ = ('name', 'fields', 'types', 'heap')
+    def __init__(self, name, fields, types, heap, start, end):
+        self.name, self.fields, self.types, self.heap = name, fields, types, heap
+        self.start, self.end = start, end
+
+class Param(Node):
+    # glyph is '@' (pseudo), "'" (pointer) or '' (value); const is a trailing '.'
+    __slots__ = ('dtype', 'name', 'glyph', 'const')
+    def __init__(self, dtype, name, glyph, const, start, end):
+        self.dtype, self.name, self.glyph, self.const = dtype, name, glyph, const
+        self.start, self.end = start, end
+
+class SetFunction(Node):
+    __slots__ = ('name', 'params', 'body')
+    def __init__(self, name, params, body, start, end):
+        self.name, self.params, self.body, self.start, self.end = name, params, body, start, end
+
+class SetGroup(Node):
+    # kind is 'set' or 'set_type'; types is the constraint suffix of set_i_s ('i_s')
+    __slots__ = ('name', 'functions', 'kind', 'types')
+    def __init__(self, name, functions, kind, types, start, end):
+        self.name, self.functions, self.kind, self.types = name, functions, kind, types
+        self.start, self.end = start, end
+
+class Program(Node):
+    # Top-level set functions without a group land in body as SetFunctions.
+    # symbols is the SymbolTable every name in the tree was interned in.
+    __slots__ = ('body', 'source', 'symbols')
+    def __init__(self, body, source, symbols, start, end):
+        self.body, self.source, self.symbols = body, source, symbols
+        self.start, self.end = start, end
+
+# === Parser ===
+
+# Kind codes, resolved once
+SET_TYPE = KIND_CODES['SET_TYPE']
+SET = KIND_CODES['SET']
+STRUCT = KIND_CODES['STRUCT']
+KEYWORD = KIND_CODES['KEYWORD']
+TYPE = KIND_CODES['TYPE']
+NUMBER = KIND_CODES['NUMBER']
+IDENT = KIND_CODES['IDENT']
+DEREF = KIND_CODES['DEREF']
+STRING = KIND_CODES['STRING']
+POINTER = KIND_CODES['POINTER']
+PSEUDO = KIND_CODES['PSEUDO']
+RELEASE = KIND_CODES['RELEASE']
+HEAP = KIND_CODES['HEAP']
+COMPARE = KIND_CODES['COMPARE']
+OP_ASSIGN = KIND_CODES['OP_ASSIGN']
+INCDEC = KIND_CODES['INCDEC']
+ASSIGN = KIND_CODES['ASSIGN']
+OP = KIND_CODES['OP']
+DOT = KIND_CODES['DOT']
+SEMICOLON = KIND_CODES['SEMICOLON']
+COLON = KIND_CODES['COLON']
+COMMA = KIND_CODES['COMMA']
+LBRACE = KIND_CODES['LBRACE']
+RBRACE = KIND_CODES['RBRACE']
+LPAREN = KIND_CODES['LPAREN']
+RPAREN = KIND_CODES['RPAREN']
+EOF = -1
+
+TERMINATORS = (SEMICOLON, COMMA, COLON)
+
+# Binding powers: (left, right). Left < right is left-associative,
+# left > right is right-associative ('^').
+INFIX = {
+    '==': (10, 11), '!=': (10, 11), '<': (10, 11), '<=': (10, 11), '>': (10, 11), '>=': (10, 11),
+    '+': (20, 21), '-': (20, 21),
+    '*': (30, 31), '/': (30, 31), '%': (30, 31),
+    '^': (41, 40),
+}
+PREFIX_BP = 35  # -a * b is (-a) * b, -a ^ b is -(a ^ b)
+
+# Symbol kind recorded for a parameter name, by its glyph
+PARAM_KINDS = {'@': SYM_PSEUDO, "'": SYM_POINTER, '': 0}
+
+class Parser:
+    def __init__(self, tokens: TokenBuffer):
+        self.tokens = tokens
+        self.source = tokens.source
+        self.kinds = tokens.kinds
+        self.starts = tokens.starts
+        self.ends = tokens.ends
+        self.syms = tokens.syms
+        self.symbols = tokens.symbols
+        self.n = len(tokens)
+        self.pos = 0
+
+    # --- Token cursor ---
+
+    def peek(self, k: int = 0) -> int:
+        i = self.pos + k
+        return self.kinds[i] if i < self.n else EOF
+
+    def text(self, k: int = 0) -> str:
+        i = self.pos + k
+        if i >= self.n:
+            return ''
+        sym = self.syms[i]
+        if sym >= 0:
+            return self.symbols.names[sym]  # Interned at lex time
+        text = self.source[self.starts[i]:self.ends[i]]
+        return text if isinstance(text, str) else str(text, 'utf-8', 'replace')  # bytes/mmap
+
+    def glued(self) -> bool:
+        # True when the current token directly follows the previous one
+        return 0 < self.pos < self.n and self.starts[self.pos] == self.ends[self.pos - 1]
+
+    def start(self) -> int:
+        return self.starts[self.pos] if self.pos < self.n else len(self.source)
+
+    def last_end(self) -> int:
+        return self.ends[self.pos - 1] if self.pos else 0
+
+    def advance(self) -> str:
+        value = self.text()
+        self.pos += 1
+        return value
+
+    def match(self, kind: int, value: Optional[str] = None) -> Optional[str]:
+        if self.peek() == kind and (value is None or self.text() == value):
+            return self.advance()
+        return None
+
+    def expect(self, kind: int, what: str) -> str:
+        if self.peek() != kind:
+            self.error(f"expected {what}")
+        return self.advance()
+
+    def mark(self, kind: int):
+        # Record what the name just consumed is used as
+        self.symbols.mark(self.syms[self.pos - 1], kind)
+
+    def error(self, message: str):
+        # Reported at a 1-based line and character column, like dotc's
+        # offset_location
+        if self.pos < self.n:
+            found = repr(self.text())
+            line, col = self.tokens.lines[self.pos], self.column(self.pos)
+        else:
+            found = 'end of input'
+            line = self.tokens.lines[-1] if self.n else 1
+            col = self.column(self.n - 1) if self.n else 1
+        raise ParseError(f"{message}, found {found}", line, col)
+
+    def column(self, i: int) -> int:
+        col = self.tokens.cols[i]
+        if not isinstance(self.source, str):  # Buffer columns count bytes
+            start = self.starts[i]
+            col = len(bytes(self.source[start - col:start]).decode('utf-8', 'replace'))
+        return col + 1
+
+    # --- Program and blocks ---
+
+    def parse(self) -> Program:
+        body = []
+        while self.peek() != EOF:
+            body.append(self.parse_statement())
+        return Program(body, self.source, self.symbols, 0, len(self.source))
+
+    def parse_block(self) -> List[Node]:
+        self.expect(LBRACE, "'{'")
+        body = []
+        while self.peek() != RBRACE:
+            if self.peek() == EOF:
+                self.error("expected '}'")
+            body.append(self.parse_statement())
+        self.advance()
+        return body
+
+    def terminate(self) -> bool:
+        # Statements may end in ; , or :  — returns True for the const ':'
+        if self.peek() in TERMINATORS:
+            return self.advance() == ':'
+        return False
+
+    # --- Statements ---
+
+    def parse_statement(self) -> Node:
+        kind = self.peek()
+        if kind == TYPE:
+            return self.parse_declaration()
+        if kind == SET or kind == SET_TYPE:
+            return self.parse_set()
+        if kind == STRUCT:
+            return self.parse_struct(self.start(), heap=False)
+        if kind == KEYWORD:
+            return self.parse_control()
+        if kind == HEAP:
+            if self.peek(1) == STRUCT:
+                start = self.start()
+                self.advance()
+                return self.parse_struct(start, heap=True)
+            if self.peek(1) == IDENT and self.peek(2) in (IDENT, POINTER):
+                start = self.start()
+                self.advance()
+                return self.parse_struct_instance(start, heap=True)
+        if kind in (POINTER, HEAP) and self.peek(1) == IDENT and self.peek(2) == RELEASE:
+            start = self.start()
+            self.pos += 1
+            name = self.advance() if kind == POINTER else '~' + self.advance()
+            self.pos += 1
+            self.terminate()
+            return Dealloc(name, start, self.last_end())
+        if kind == IDENT:
+            nxt = self.peek(1)
+            if nxt == LPAREN and (self.peek(2) == TYPE or
+                                  (self.peek(2) == RPAREN and self.peek(3) == LBRACE)):
+                return self.parse_function()
+            if nxt == IDENT or (nxt == POINTER and self.peek(2) == IDENT and self.peek(3) == LBRACE):
+                return self.parse_struct_instance(self.start(), heap=False)
+        return self.parse_simple_statement()
+
+    def parse_declaration(self) -> Declaration:
+        start = self.start()
+        dtype = self.advance()
+        pointer = bool(self.match(POINTER))
+        name = self.expect(IDENT, 'a name')
+        sym = self.syms[self.pos - 1]
+        if not pointer:
+            pointer = bool(self.match(DEREF))
+        value = None
+        if self.match(ASSIGN):
+            value = self.parse_expression()
+        end = self.last_end()
+        const = self.terminate()
+        self.symbols.mark(sym, (SYM_POINTER if pointer else 0) | (SYM_CONST if const else 0)
+                          | (SYM_HEAP if dtype.endswith('~') else 0))
+        return Declaration(dtype, name, value, pointer, const, start, end)
+
+    def parse_set(self) -> SetGroup:
+        start = self.start()
+        keyword = self.advance()
+        kind = 'set_type' if keyword == 'set_type' else 'set'
+        types = keyword[4:] if kind == 'set' else ''
+        name = self.expect(IDENT, 'a set name')
+        self.mark(SYM_SET)
+        if self.match(LPAREN):
+            self.expect(RPAREN, "')'")
+        self.expect(LBRACE, "'{'")
+        functions = []
+        while self.peek() != RBRACE:
+            if self.peek() != IDENT:
+                self.error('expected a set function')
+            functions.append(self.parse_function())
+        self.advance()
+        return SetGroup(name, functions, kind, types, start, self.last_end())
+
+    def parse_function(self) -> SetFunction:
+        start = self.start()
+        name = self.advance()
+        self.expect(LPAREN, "'('")
+        params = []
+        while self.peek() != RPAREN:
+            params.append(self.parse_param())
+            if not self.match(COMMA):
+                break
+        self.expect(RPAREN, "')'")
+        body = self.parse_block()
+        return SetFunction(name, params, body, start, self.last_end())
+
+    def parse_param(self) -> Param:
+        start = self.start()
+        dtype = self.expect(TYPE, 'a parameter type')
+        glyph = ''
+        if self.peek() == PSEUDO or self.peek() == POINTER:
+            glyph = self.advance()
+        name = self.expect(IDENT, 'a parameter name')
+        self.mark(PARAM_KINDS[glyph])
+        const = bool(self.match(DOT))
+        if const:
+            self.symbols.mark(self.syms[self.pos - 2], SYM_CONST)
+        return Param(dtype, name, glyph, const, start, self.last_end())
+
+    def parse_struct(self, start: int, heap: bool) -> StructDef:
+        keyword = self.advance()
+        types = keyword[7:]
+        name = self.expect(IDENT, 'a struct name')
+        self.mark(SYM_STRUCT | (SYM_HEAP if heap else 0))
+        self.expect(LBRACE, "'{'")
+        fields = []
+        while self.peek() != RBRACE:
+            dtype = self.expect(TYPE, 'a member type')
+            self.match(POINTER)
+            field = self.expect(IDENT, 'a member name')
+            self.terminate()
+            fields.append((dtype, field))
+        self.advance()
+        self.terminate()
+        return StructDef(name, fields, types, heap, start, self.last_end())
+
+    def parse_struct_instance(self, start: int, heap: bool) -> StructInstance:
+        struct_type = self.advance()
+        pointer = self.match(POINTER)
+        name = self.expect(IDENT, 'an instance name')
+        self.mark((SYM_POINTER if pointer else 0) | (SYM_HEAP if heap else 0))
+        values = []
+        if self.match(LBRACE):
+            while self.peek() != RBRACE:
+                item_start = self.start()
+                value = self.parse_expression()
+                if self.match(ASSIGN):
+                    value = Assignment(value, self.parse_expression(), '=', item_start, self.last_end())
+                values.append(value)
+                if not self.match(COMMA):
+                    break
+            self.expect(RBRACE, "'}'")
+        end = self.last_end()
+        self.terminate()
+        return StructInstance(struct_type, name, values, heap, bool(pointer), start, end)
+
+    def parse_control(self) -> ControlFlow:
+        start = self.start()
+        kind = self.advance()
+        if kind not in ('if', 'while'):
+            self.pos -= 1
+            self.error(f"'{kind}' is not supported yet")
+        condition = self.parse_condition()
+        body = self.parse_block()
+        orelse = []
+        if kind == 'if':
+            if self.peek() == KEYWORD and self.text() == 'elif':
+                elif_start = self.start()
+                self.advance()
+                node = self.parse_elif(elif_start)
+                orelse = [node]
+            elif self.match(KEYWORD, 'else'):
+                orelse = self.parse_block()
+        return ControlFlow(kind, condition, body, orelse, start, self.last_end())
+
+    def parse_elif(self, start: int) -> ControlFlow:
+        condition = self.parse_condition()
+        body = self.parse_block()
+        orelse = []
+        if self.peek() == KEYWORD and self.text() == 'elif':
+            elif_start = self.start()
+            self.advance()
+            orelse = [self.parse_elif(elif_start)]
+        elif self.match(KEYWORD, 'else'):
+            orelse = self.parse_block()
+        return ControlFlow('elif', condition, body, orelse, start, self.last_end())
+
+    def parse_condition(self) -> Node:
+        self.expect(LPAREN, "'('")
+        condition = self.parse_expression()
+        self.expect(RPAREN, "')'")
+        return condition
+
+    def parse_simple_statement(self) -> Node:
+        # Assignment, call or print, told apart after the leading expression
+        start = self.start()
+        expr = self.parse_expression()
+        kind = self.peek()
+        if kind == ASSIGN or kind == OP_ASSIGN:
+            op = self.advance()
+            value = self.parse_expression()
+            node = Assignment(expr, value, op, start, self.last_end())
+        elif kind == INCDEC:
+            op = self.advance()
+            one = Number('1', self.last_end() - 2, self.last_end())
+            node = Assignment(expr, one, op[0] + '=', start, self.last_end())
+        elif isinstance(expr, FunctionCall):
+            node = expr
+        else:
+            parts = [expr]
+            # "label: " x@  — a print continues while strings glue parts together
+            while self.peek() == STRING or (isinstance(parts[-1], String) and
+                                            self.peek() in (IDENT, NUMBER, POINTER)):
+                parts.append(self.parse_expression())
+            node = PrintStmt(parts, start, self.last_end())
+        self.terminate()
+        return node
+
+    # --- Expressions ---
+    # Table-driven Pratt parser: each infix operator has a (left, right)
+    # binding power in INFIX; prefix operators bind with PREFIX_BP.
+
+    def parse_expression(self, min_bp: int = 0) -> Node:
+        start = self.start()
+        kind = self.peek()
+        if (kind == OP and self.text() == '-') or kind == HEAP:
+            op = self.advance()
+            operand = self.parse_expression(PREFIX_BP)
+            left = UnaryOp(op, operand, start, self.last_end())
+        else:
+            left = self.parse_postfix()
+        while True:
+            kind = self.peek()
+            if kind != OP and kind != COMPARE:
+                return left
+            op = self.text()
+            left_bp, right_bp = INFIX[op]
+            if left_bp < min_bp:
+                return left
+            self.advance()
+            right = self.parse_expression(right_bp)
+            left = BinOp(op, left, right, start, self.last_end())
+
+    def parse_postfix(self) -> Node:
+        start = self.start()
+        node = self.parse_primary()
+        while True:
+            kind = self.peek()
+            if kind == DOT and self.peek(1) == IDENT:
+                self.advance()
+                field = self.advance()
+                node = Member(node, field, start, self.last_end())
+            elif kind == LPAREN and isinstance(node, (Name, Member)):
+                node = self.parse_call(node, start)
+            else:
+                return node
+
+    def parse_call(self, callee: Node, start: int) -> FunctionCall:
+        # math.f(x) calls set function f; x.math.f() is the same call
+        path = []
+        while isinstance(callee, Member):
+            path.append(callee.field)
+            callee = callee.base
+        args = []
+        if isinstance(callee, Name):
+            path.append(callee.name)
+        else:
+            args.append(callee)
+        target = '.'.join(reversed(path[:2])) if args else '.'.join(reversed(path))
+        if args and len(path) > 2:
+            self.error('a receiver may only be followed by set.function')
+        self.advance()
+        while self.peek() != RPAREN:
+            args.append(self.parse_expression())
+            self.match(DOT)  # const argument marker
+            if not self.match(COMMA) and not self.match(SEMICOLON):
+                break
+        self.expect(RPAREN, "')'")
+        return FunctionCall(target, args, start, self.last_end())
+
+    def parse_index(self) -> Optional[Node]:
+        # x"3, x@i, x@(i + 1): the index must be glued to the glyph
+        if not self.glued():
+            return None
+        start = self.start()
+        kind = self.peek()
+        if kind == NUMBER:
+            return Number(self.advance(), start, self.last_end())
+        if kind == IDENT:
+            return Name(self.advance(), start, self.last_end())
+        if kind == LPAREN:
+            self.advance()
+            index = self.parse_expression()
+            self.expect(RPAREN, "')'")
+            return index
+        return None
+
+    def parse_primary(self) -> Node:
+        start = self.start()
+        kind = self.peek()
+        if kind == NUMBER:
+            return Number(self.advance(), start, self.last_end())
+        if kind == STRING:
+            return String(self.advance()[1:-1], start, self.last_end())
+        if kind == POINTER:
+            self.advance()
+            name = self.expect(IDENT, 'a pointer name')
+            return Ref(name, start, self.last_end())
+        if kind == IDENT:
+            name = self.advance()
+            if self.peek() == DEREF:
+                self.advance()
+                index = self.parse_index()
+                return Deref(name, index, start, self.last_end())
+            if self.peek() == PSEUDO and self.glued():
+                self.advance()
+                index = self.parse_index()
+                return Pseudo(name, index, start, self.last_end())
+            return Name(name, start, self.last_end())
+        if kind == LPAREN:
+            self.advance()
+            expr = self.parse_expression()
+            self.expect(RPAREN, "')'")
+            return expr
+        self.error('expected an expression')
+
+def parse(tokens) -> Program:
+    # tokens is a TokenBuffer, or source text/bytes to tokenize first
+    if not isinstance(tokens, TokenBuffer):
+        tokens = tokenize_buffer(tokens)
+    return Parser(tokens).parse()
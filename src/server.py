@@ -0,0 +1,208 @@
+# server.py — Persistent compile server for dotc, and its thin client.
+# `dotc --serve` keeps the lexer tables, compiler modules and a warm
+# in-memory cache loaded and answers requests on a local Unix socket, so a
+# compile costs only the compile. The protocol is JSON lines, one request
+# and one response per line:
+#
+#   {"id": 1, "op": "compile", "path": "/abs/a.dot", "output": "/abs/a.cpp", "target": "cpp"}
+#   {"id": 1, "ok": true, "cached": false, "ms": 0.41}
+#   {"id": 2, "op": "compile", "source": "i_ 'x = 1;", "target": "c"}
+#   {"id": 2, "ok": true, "cached": true, "ms": 0.02, "code": "#include ..."}
+#   {"id": 3, "ok": false, "error": "<source>:1:4: error: ..."}
+#
+# Other ops: "ping", "stats" and "shutdown". The client half of this file
+# (`python src/server.py file.dot`) imports only json and socket.
+
+import json
+import os
+import socket
+import sys
+import tempfile
+
+DEFAULT_SOCKET = os.environ.get('DOTC_SOCKET') or os.path.join(
+    tempfile.gettempdir(), f"dotc-{os.getuid()}.sock")
+MEMORY_ENTRIES = 512
+
+# === Server ===
+
+def serve(path: str = DEFAULT_SOCKET, cache_dir=None, log=print, opt_level: int = 1,
+          pool: bool = False):
+    import socketserver
+    import threading
+    import time
+
+    from compiler import CompileError, Compiler
+    from dotc import __version__
+
+    compiler = Compiler(opt_level=opt_level, pool=pool, cache_dir=cache_dir,
+                        memory_entries=MEMORY_ENTRIES)
+    lock = threading.Lock()
+    requests = 0
+
+    def handle(request):
+        op = request.get('op', 'compile')
+        if op == 'ping':
+            return {'ok': True, 'version': __version__}
+        if op == 'stats':
+            with compiler.lock:
+                return dict(compiler.stats, ok=True, requests=requests,
+                            memory_entries=len(compiler.memory))
+        if op == 'shutdown':
+            threading.Thread(target=server.shutdown).start()
+            return {'ok': True}
+        if op != 'compile':
+            return {'ok': False, 'error': f"unknown op '{op}'"}
+
+        target = request.get('target', 'cpp')
+        path = request.get('path')
+        name = path or '<source>'
+        try:
+            if path:
+                with open(path, encoding='utf-8') as f:
+                    code = f.read()
+            else:
+                code = request['source']
+        except (OSError, UnicodeDecodeError) as e:
+            return {'ok': False, 'error': f"{name}: error: {getattr(e, 'strerror', None) or e}"}
+        except KeyError:
+            return {'ok': False, 'error': "compile needs a 'path' or a 'source'"}
+        try:
+            output, hit = compiler.compile(code, name, target)
+        except CompileError as e:
+            return {'ok': False, 'error': str(e)}
+        response = {'ok': True, 'cached': hit}
+        if request.get('output'):
+            try:
+                with open(request['output'], 'w', encoding='utf-8') as f:
+                    f.write(output)
+            except OSError as e:
+                return {'ok': False, 'error': f"{request['output']}: error: {e.strerror}"}
+        else:
+            response['code'] = output
+        return response
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            nonlocal requests
+            for line in self.rfile:
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    response, request = {'ok': False, 'error': 'malformed request'}, {}
+                else:
+                    response = handle(request)
+                with lock:
+                    requests += 1
+                response['id'] = request.get('id')
+                response['ms'] = round((time.perf_counter() - start) * 1000, 3)
+                self.wfile.write(json.dumps(response).encode() + b'\n')
+                self.wfile.flush()
+
+    if os.path.exists(path):
+        if ping(path):
+            raise OSError(f"a dotc server is already listening on {path}")
+        os.unlink(path)  # Left behind by a server that died
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    log(f"dotc {__version__} serving on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+# === Client ===
+
+class Client:
+    def __init__(self, path: str = DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.file = self.sock.makefile('rb')
+        self.next_id = 0
+
+    def request(self, **request) -> dict:
+        self.next_id += 1
+        request['id'] = self.next_id
+        self.sock.sendall(json.dumps(request).encode() + b'\n')
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('dotc server closed the connection')
+        return json.loads(line)
+
+    def compile(self, path: str, output: str, target: str = 'cpp') -> dict:
+        return self.request(op='compile', path=os.path.abspath(path),
+                            output=os.path.abspath(output), target=target)
+
+    def compile_source(self, source: str, target: str = 'cpp') -> dict:
+        return self.request(op='compile', source=source, target=target)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+def ping(path: str = DEFAULT_SOCKET) -> bool:
+    try:
+        client = Client(path)
+    except OSError:
+        return False
+    try:
+        return client.request(op='ping').get('ok', False)
+    except (OSError, ValueError):
+        return False
+    finally:
+        client.close()
+
+# === Client CLI ===
+# python src/server.py a.dot [-o a.cpp] [--target c]; --stop, --stats
+
+def main(argv):
+    import argparse
+    ap = argparse.ArgumentParser(prog='dotc-client', description='Compile through a running dotc --serve')
+    ap.add_argument('inputs', nargs='*', metavar='input', help='.dot source files')
+    ap.add_argument('-o', dest='output', help='output file for a single input (default: out.cpp)')
+    ap.add_argument('--target', choices=('cpp', 'c'), help='output language (default: cpp)')
+    ap.add_argument('--socket', default=DEFAULT_SOCKET, help=f'server socket (default: {DEFAULT_SOCKET})')
+    ap.add_argument('--stats', action='store_true', help='print server counters')
+    ap.add_argument('--stop', action='store_true', help='shut the server down')
+    args = ap.parse_args(argv)
+    if args.output and len(args.inputs) > 1:
+        ap.error('-o needs a single input')
+
+    try:
+        client = Client(args.socket)
+    except OSError:
+        print(f"error: no dotc server on {args.socket} (start one with dotc --serve)", file=sys.stderr)
+        return 1
+    failed = 0
+    try:
+        for path in args.inputs:
+            if len(args.inputs) == 1:
+                output = args.output or 'out.cpp'
+                target = args.target or ('c' if output.endswith('.c') else 'cpp')
+            else:
+                target = args.target or 'cpp'
+                output = os.path.splitext(path)[0] + '.' + target
+            response = client.compile(path, output, target)
+            if response['ok']:
+                print(f"Compiled {path} to {output}{' (cached)' if response['cached'] else ''}")
+            else:
+                failed += 1
+                print(response['error'], file=sys.stderr)
+        if args.stats:
+            print(json.dumps(client.request(op='stats')))
+        if args.stop:
+            client.request(op='shutdown')
+    finally:
+        client.close()
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
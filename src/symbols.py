@@ -0,0 +1,64 @@
+# symbols.py — Interned identifiers shared by the lexer, parser, IR and emitters.
+# The lexer interns every identifier and type as it scans, so each distinct
+# name exists once as a str and once as a small integer ID; later stages
+# compare and index by ID (or by the shared str, whose hash is cached) instead
+# of re-slicing the source. What a name is used as (pointer, pseudo, const,
+# heap, set, struct) is recorded once, as bit flags, when the parser sees it.
+
+from array import array
+
+# Symbol kinds, OR'ed together: one name can play several roles
+POINTER = 1    # 'x
+PSEUDO = 2     # x@ / @x parameters
+CONST = 4      # trailing '.' or ':'
+HEAP = 8       # i~ x, ~vec x
+SET = 16       # set name
+STRUCT = 32    # struct name
+TYPE = 64      # type token: i_, i_5, i~
+
+KIND_NAMES = ((POINTER, 'pointer'), (PSEUDO, 'pseudo'), (CONST, 'const'), (HEAP, 'heap'),
+              (SET, 'set'), (STRUCT, 'struct'), (TYPE, 'type'))
+
+class SymbolTable:
+    __slots__ = ('names', 'ids', 'kinds')
+
+    def __init__(self):
+        self.names = []         # id -> str
+        self.ids = {}           # str or bytes spelling -> id
+        self.kinds = array('B')
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.ids
+
+    def intern(self, name) -> int:
+        # name is a str, or bytes from a bytes/mmap source
+        sym = self.ids.get(name)
+        if sym is not None:
+            return sym
+        text = name if isinstance(name, str) else str(name, 'utf-8')
+        sym = self.ids.get(text)
+        if sym is None:
+            sym = len(self.names)
+            self.names.append(text)
+            self.kinds.append(0)
+            self.ids[text] = sym
+        self.ids[name] = sym
+        return sym
+
+    def name(self, sym: int) -> str:
+        return self.names[sym]
+
+    def mark(self, sym: int, kind: int):
+        self.kinds[sym] |= kind
+
+    def has(self, sym: int, kind: int) -> bool:
+        return bool(self.kinds[sym] & kind)
+
+    def kind_names(self, sym: int):
+        return [name for kind, name in KIND_NAMES if self.kinds[sym] & kind]
+
+    def __repr__(self):
+        return f"SymbolTable({len(self)} symbols)"
@@ -0,0 +1,155 @@
+# timing.py — Per-phase compiler instrumentation for dotc --time-report.
+# Every file compiled under measurement gets a FileTimings holding, for each
+# phase it went through (read, cache, tokenize, parse, lower, check, opt,
+# emit, store), the wall time and the memory allocated as tracemalloc sees
+# it, the time of each optimisation pass, and the file's size at every
+# stage: source bytes, tokens, AST nodes, IR instructions, output chars.
+# FileTimings are plain slotted objects, so they come back from the process
+# pool as they are; table() and to_json() render a list of them.
+# tracemalloc slows compilation down noticeably: compare times between
+# reports, not with unmeasured runs.
+
+import time
+import tracemalloc
+
+PHASES = ('read', 'cache', 'tokenize', 'parse', 'lower', 'check', 'opt', 'emit', 'store')
+COUNTS = ('bytes', 'tokens', 'nodes', 'ir', 'output')
+
+class Phase:
+    # Context manager appending (name, seconds, net bytes, peak bytes) to its
+    # file's phases. Net is what the phase left allocated; peak is the most
+    # it had allocated at once, both relative to where it started.
+    __slots__ = ('timings', 'name', 'start', 'base')
+
+    def __init__(self, timings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        size = peak = self.base
+        if tracemalloc.is_tracing():
+            size, peak = tracemalloc.get_traced_memory()
+        self.timings.phases.append((self.name, elapsed, size - self.base, peak - self.base))
+
+class FileTimings:
+    # Used as a context manager around a whole file: traces allocations for
+    # its duration unless tracemalloc was already running
+    __slots__ = ('path', 'cached', 'phases', 'passes', 'counts', 'started')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cached = False
+        self.phases = []
+        self.passes = {}
+        self.counts = {}
+        self.started = False
+
+    def phase(self, name: str) -> Phase:
+        return Phase(self, name)
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started = True
+        return self
+
+    def __exit__(self, *exc):
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    def seconds(self) -> float:
+        return sum(phase[1] for phase in self.phases)
+
+    def peak(self) -> int:
+        return max((phase[3] for phase in self.phases), default=0)
+
+def count_nodes(node) -> int:
+    from parser import Node
+    count, stack = 0, [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, Node):
+            count += 1
+            for cls in type(item).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    if name not in ('start', 'end'):
+                        stack.append(getattr(item, name, None))
+    return count
+
+# === Rendering ===
+
+def totals(files):
+    # phase -> [seconds, net bytes, peak bytes] and pass -> seconds, summed
+    # over files (peak is the largest single one), phases in pipeline order
+    phases = {}
+    for timings in files:
+        for name, seconds, net, peak in timings.phases:
+            total = phases.setdefault(name, [0.0, 0, 0])
+            total[0] += seconds
+            total[1] += net
+            total[2] = max(total[2], peak)
+    order = {name: i for i, name in enumerate(PHASES)}
+    phases = dict(sorted(phases.items(), key=lambda item: order.get(item[0], len(order))))
+    passes = {}
+    for timings in files:
+        for name, seconds in timings.passes.items():
+            passes[name] = passes.get(name, 0.0) + seconds
+    return phases, passes
+
+def table(files) -> str:
+    if not files:
+        return 'time report: nothing was compiled'
+    phases, passes = totals(files)
+    overall = sum(total[0] for total in phases.values()) or 1.0
+    lines = [f"{'phase':14}{'ms':>10}{'%':>8}{'net KB':>11}{'peak KB':>11}"]
+    for name, (seconds, net, peak) in phases.items():
+        lines.append(f"{name:14}{seconds * 1000:10.2f}{seconds / overall:8.1%}"
+                     f"{net / 1024:11.1f}{peak / 1024:11.1f}")
+        if name == 'opt':
+            for pass_name, pass_seconds in passes.items():
+                lines.append(f"  {pass_name:12}{pass_seconds * 1000:10.2f}"
+                             f"{pass_seconds / overall:8.1%}")
+    lines.append(f"{'total':14}{sum(total[0] for total in phases.values()) * 1000:10.2f}")
+    width = max([len('file')] + [len(timings.path) for timings in files])
+    lines.append('')
+    lines.append(f"{'file':{width}}{'ms':>10}{'peak KB':>11}"
+                 + ''.join(f"{name:>9}" for name in COUNTS))
+    for timings in files:
+        counts = ''.join(f"{timings.counts[name]:9}" if name in timings.counts else f"{'-':>9}"
+                         for name in COUNTS)
+        lines.append(f"{timings.path:{width}}{timings.seconds() * 1000:10.2f}"
+                     f"{timings.peak() / 1024:11.1f}{counts}"
+                     + ('  (cached)' if timings.cached else ''))
+    return '\n'.join(lines)
+
+def to_json(files, version: str) -> dict:
+    phases, passes = totals(files)
+    return {
+        'dotc': version,
+        'files': [{
+            'path': timings.path,
+            'cached': timings.cached,
+            'ms': round(timings.seconds() * 1000, 3),
+            'phases': {name: {'ms': round(seconds * 1000, 3), 'net_bytes': net, 'peak_bytes': peak}
+                       for name, seconds, net, peak in timings.phases},
+            'passes': {name: round(seconds * 1000, 3) for name, seconds in timings.passes.items()},
+            'counts': timings.counts,
+        } for timings in files],
+        'totals': {
+            'ms': round(sum(total[0] for total in phases.values()) * 1000, 3),
+            'phases': {name: {'ms': round(seconds * 1000, 3), 'net_bytes': net, 'peak_bytes': peak}
+                       for name, (seconds, net, peak) in phases.items()},
+            'passes': {name: round(seconds * 1000, 3) for name, seconds in passes.items()},
+        },
+    }
@@ -0,0 +1,369 @@
+# vector.py — Whole-array loop kernels for the bytecode VM (dotc run).
+# A counted loop over integer arrays is matched on the IR:
+#   while(k" < bound){ ...statements...; k" = k" + 1; }
+# where k is an integer local the body assigns to only there, bound is a
+# literal or a local left alone by the body, and every other statement is
+#   a"k = expr      an elementwise update of an integer array
+#   s" = s" + expr  a sum (or with -, a difference) into a local the body
+#                   reads nowhere else
+# with expr built from + - * and unary -, integer literals, k, locals
+# left alone by the body, and elements b"k of integer arrays. vm.py places
+# a KERNEL instruction before such a loop: it runs each statement over all
+# iterations at once, as NumPy arrays when NumPy is installed and the loop
+# is long enough to pay for the conversion, as Python lists otherwise, and
+# jumps past the loop. The loop stays behind it as bytecode, and runs
+# instead whenever the kernel can't give exactly its result: indexes out of
+# range (so the error comes from the right iteration), a released pointer,
+# a non-integer value or arrays that overlap. Values NumPy can't hold in
+# int64 send a kernel back to lists, which are exact.
+#
+# Cells stay in the VM's flat list: a kernel copies its slices in and out,
+# which still costs far less than interpreting the loop element by element.
+
+import operator
+
+from ir import (ADD, ARRAY, CONST, END, LOAD, LOADIDX, LT, MUL, NEG, STORE, STOREIDX, SUB, WHILE,
+                Module, base_type)
+
+try:
+    import numpy
+except ImportError:  # Kernels run over lists
+    numpy = None
+
+INT_BITS = {'i': 32, 'sh': 16, 'l': 64, 'll': 64, 'c': 8}
+OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul}
+SYMBOLS = {ADD: '+', SUB: '-', MUL: '*'}
+NUMPY_MIN = 64      # Shorter loops run over lists
+LIMIT = 1 << 62     # Largest magnitude a NumPy kernel may produce
+
+class Kernel:
+    # Expressions are tuples: ('k',), ('const', n), ('reg', r) for a home
+    # register, ('elem', local) for the element at k, ('neg', x), and
+    # (symbol, x, y). Statements are ('store', local, expr, bits or 0) and
+    # ('sum', r, expr, sign, bits), bits being the width a store wraps to.
+    __slots__ = ('k', 'bound', 'statements', 'arrays')
+
+    def __init__(self, k: int, bound: tuple, statements, arrays):
+        self.k = k
+        self.bound = bound
+        self.statements = statements
+        self.arrays = arrays
+
+    def format(self, array, register) -> str:
+        # For listings; array and register name a local and a register
+        def show(node):
+            tag = node[0]
+            if tag == 'k':
+                return 'k'
+            if tag == 'const':
+                return str(node[1])
+            if tag == 'reg':
+                return register(node[1])
+            if tag == 'elem':
+                return f"{array(node[1])}[k]"
+            if tag == 'neg':
+                return f"-{show(node[1])}"
+            return f"({show(node[1])} {tag} {show(node[2])})"
+        return '; '.join(
+            f"{array(statement[1])}[k] = {show(statement[2])}" if statement[0] == 'store' else
+            f"{register(statement[1])} {'+-'[statement[3] < 0]}= sum {show(statement[2])}"
+            for statement in self.statements) + \
+            f" for k = {register(self.k)} until {show(self.bound)}"
+
+    def run(self, regs, mem, base, sizes, use_numpy: bool) -> bool:
+        # Run the whole loop and return True, or return False to have it
+        # interpreted; nothing is written before the kernel commits
+        k0, k1 = regs[self.k], self.bound[1] if self.bound[0] == 'const' else regs[self.bound[1]]
+        if k0.__class__ is not int or k1.__class__ is not int:
+            return False
+        if k1 <= k0:
+            return True
+        if k0 < 0:
+            return False
+        spans = []
+        for local in self.arrays:
+            if base[local] is None or k1 > sizes[local]:
+                return False
+            spans.append((base[local], base[local] + sizes[local]))
+        spans.sort()
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            if start < end:
+                return False
+        for statement in self.statements:
+            if not scalars_are_ints(statement[2], regs):
+                return False
+        env = None
+        if use_numpy and numpy is not None and k1 - k0 >= NUMPY_MIN:
+            try:
+                env = self.evaluate(NumPyLanes(mem, base, regs, k0, k1))
+            except (Fallback, OverflowError):
+                env = None
+        if env is None:
+            env = self.evaluate(ListLanes(mem, base, regs, k0, k1))
+        arrays, scalars = env
+        for local, values in arrays.items():
+            start = base[local]
+            mem[start + k0:start + k1] = values
+        for r, value in scalars.items():
+            regs[r] = value
+        regs[self.k] = k1
+        return True
+
+    def evaluate(self, lanes):
+        # ({local: new cells}, {register: new value}) for the whole loop
+        stored, scalars = {}, {}
+        for statement in self.statements:
+            value, _ = lanes.evaluate(statement[2])
+            if statement[0] == 'store':
+                local, bits = statement[1], statement[3]
+                if bits:
+                    value = lanes.wrap(value, bits)
+                value = lanes.broadcast(value)
+                lanes.cells[local] = value
+                stored[local] = value
+            else:
+                r, sign, bits = statement[1], statement[3], statement[4]
+                scalars[r] = wrap(lanes.regs[r] + sign * lanes.total(value), bits)
+        return {local: lanes.tolist(value) for local, value in stored.items()}, scalars
+
+def wrap(value: int, bits: int) -> int:
+    half = 1 << (bits - 1)
+    return ((value + half) & (half + half - 1)) - half
+
+def scalars_are_ints(node, regs) -> bool:
+    tag = node[0]
+    if tag == 'reg':
+        return regs[node[1]].__class__ is int
+    if tag == 'neg':
+        return scalars_are_ints(node[1], regs)
+    if tag in OPERATORS:
+        return scalars_are_ints(node[1], regs) and scalars_are_ints(node[2], regs)
+    return True
+
+# === Lanes ===
+# A vector holds one value per iteration; a scalar stands for the same value
+# in all of them. evaluate() returns (value, magnitude bound).
+
+class Fallback(Exception):
+    pass
+
+class ListLanes:
+    def __init__(self, mem, base, regs, k0: int, k1: int):
+        self.mem, self.base, self.regs = mem, base, regs
+        self.k0, self.k1 = k0, k1
+        self.cells = {}  # local -> its elements k0..k1-1 as the loop has left them
+
+    def evaluate(self, node):
+        tag = node[0]
+        if tag == 'k':
+            return self.index(), max(abs(self.k0), abs(self.k1 - 1))
+        if tag == 'const':
+            return node[1], abs(node[1])
+        if tag == 'reg':
+            value = self.regs[node[1]]
+            return value, abs(value)
+        if tag == 'elem':
+            return self.element(node[1])
+        if tag == 'neg':
+            value, magnitude = self.evaluate(node[1])
+            return self.negate(value), magnitude
+        x, mx = self.evaluate(node[1])
+        y, my = self.evaluate(node[2])
+        return self.binary(tag, x, y), mx * my if tag == '*' else mx + my
+
+    def index(self):
+        return list(range(self.k0, self.k1))
+
+    def element(self, local):
+        if local not in self.cells:
+            start = self.base[local]
+            self.cells[local] = self.mem[start + self.k0:start + self.k1]
+        return self.cells[local], 0
+
+    def binary(self, tag, x, y):
+        fn = OPERATORS[tag]
+        if x.__class__ is list:
+            return list(map(fn, x, y)) if y.__class__ is list else [fn(v, y) for v in x]
+        return [fn(x, v) for v in y] if y.__class__ is list else fn(x, y)
+
+    def negate(self, x):
+        return [-v for v in x] if x.__class__ is list else -x
+
+    def wrap(self, x, bits: int):
+        half = 1 << (bits - 1)
+        if x.__class__ is not list:
+            return wrap(x, bits) if not -half <= x < half else x
+        mask = half + half - 1
+        return [v if -half <= v < half else ((v + half) & mask) - half for v in x]
+
+    def total(self, x) -> int:
+        return sum(x) if x.__class__ is list else x * (self.k1 - self.k0)
+
+    def broadcast(self, x):
+        return x if x.__class__ is list else [x] * (self.k1 - self.k0)
+
+    def tolist(self, x):
+        return x
+
+class NumPyLanes(ListLanes):
+    # int64 lanes; every value is bounded first, so nothing wraps silently
+    def evaluate(self, node):
+        value, magnitude = super().evaluate(node)
+        if magnitude >= LIMIT:
+            raise Fallback
+        return value, magnitude
+
+    def index(self):
+        return numpy.arange(self.k0, self.k1, dtype=numpy.int64)
+
+    def element(self, local):
+        if local not in self.cells:
+            start = self.base[local]
+            self.cells[local] = numpy.array(self.mem[start + self.k0:start + self.k1],
+                                            dtype=numpy.int64)
+        cells = self.cells[local]
+        return cells, max(-int(cells.min()), int(cells.max()))
+
+    def binary(self, tag, x, y):
+        return OPERATORS[tag](x, y)
+
+    def negate(self, x):
+        return -x
+
+    def wrap(self, x, bits: int):
+        if not isinstance(x, numpy.ndarray):
+            return ListLanes.wrap(self, x, bits)
+        if bits == 64:
+            return x  # Bounded below LIMIT, so already in range
+        half = 1 << (bits - 1)
+        return ((x + half) & (half + half - 1)) - half
+
+    def total(self, x) -> int:
+        if not isinstance(x, numpy.ndarray):
+            return x * (self.k1 - self.k0)
+        if max(-int(x.min()), int(x.max())) * len(x) >= LIMIT:
+            return sum(x.tolist())
+        return int(x.sum())
+
+    def broadcast(self, x):
+        if isinstance(x, numpy.ndarray):
+            return x
+        return numpy.full(self.k1 - self.k0, x, dtype=numpy.int64)
+
+    def tolist(self, x):
+        return x.tolist()
+
+# === Matching ===
+
+def match(module: Module, fn, start: int, homes, local):
+    # Kernel for the loop whose LOOP marker is at start, or None. homes maps
+    # slots to their home registers, local maps slots to VM locals.
+    ops, dst, a, b = fn.ops, fn.dst, fn.a, fn.b
+    flags, types, consts = module.slot_flags, module.slot_types, module.consts
+    trees, statements, condition = {}, [], None
+    for i in range(start + 1, len(ops)):
+        op = ops[i]
+        if op == CONST:
+            if consts[a[i]].__class__ is not int:
+                return None
+            trees[dst[i]] = ('const', consts[a[i]])
+        elif op == LOAD:
+            trees[dst[i]] = ('slot', a[i])
+        elif op == LOADIDX:
+            trees[dst[i]] = ('elem', a[i], trees.pop(b[i]))
+        elif op == NEG:
+            trees[dst[i]] = ('neg', trees.pop(a[i]))
+        elif op in SYMBOLS or (op == LT and condition is None):
+            trees[dst[i]] = (SYMBOLS.get(op, '<'), trees.pop(a[i]), trees.pop(b[i]))
+        elif op == WHILE and condition is None:
+            condition = trees.pop(a[i])
+        elif op == STORE and condition is not None:
+            statements.append(('store', dst[i], trees.pop(a[i])))
+        elif op == STOREIDX and condition is not None:
+            statements.append(('storeidx', dst[i], trees.pop(a[i]), trees.pop(b[i])))
+        elif op == END and condition is not None:
+            break
+        else:
+            return None
+    else:
+        return None
+
+    def integer(slot):
+        return base_type(types[slot]) in INT_BITS
+
+    # while(k < bound) ... k = k + 1
+    if condition[0] != '<' or condition[1][0] != 'slot' or len(statements) < 2:
+        return None
+    k, bound = condition[1][1], condition[2]
+    if k not in homes or not integer(k):
+        return None
+    step = statements.pop()
+    if step[:2] != ('store', k) or step[2] not in (('+', ('slot', k), ('const', 1)),
+                                                  ('+', ('const', 1), ('slot', k))):
+        return None
+
+    sums = {}  # slot -> (sign, the expression added)
+    for statement in statements:
+        if statement[0] != 'store':
+            continue
+        s, value = statement[1], statement[2]
+        if s == k or s in sums or s not in homes or not integer(s) or value[0] not in '+-':
+            return None
+        if value[1] == ('slot', s):
+            sums[s] = (1 if value[0] == '+' else -1, value[2])
+        elif value[0] == '+' and value[2] == ('slot', s):
+            sums[s] = (1, value[1])
+        else:
+            return None
+
+    arrays = []
+    def translate(node):
+        # IR tree -> kernel expression, or None if it doesn't qualify
+        tag = node[0]
+        if tag == 'const':
+            return node
+        if tag == 'slot':
+            slot = node[1]
+            if slot == k:
+                return ('k',)
+            if slot in homes and slot not in sums and integer(slot):
+                return ('reg', homes[slot])
+            return None
+        if tag == 'elem':
+            slot = node[1]
+            if node[2] != ('slot', k) or not flags[slot] & ARRAY or slot in homes \
+                    or not integer(slot):
+                return None
+            if local[slot] not in arrays:
+                arrays.append(local[slot])
+            return ('elem', local[slot])
+        if tag == 'neg':
+            operand = translate(node[1])
+            return operand and ('neg', operand)
+        if tag in OPERATORS:
+            x, y = translate(node[1]), translate(node[2])
+            return x and y and (tag, x, y)
+        return None
+
+    bound = translate(bound)
+    if bound is None or bound[0] not in ('const', 'reg'):
+        return None
+    kernel = []
+    for statement in statements:
+        if statement[0] == 'store':
+            s = statement[1]
+            sign, value = sums[s]
+            expr = translate(value)
+            if expr is None:
+                return None
+            kernel.append(('sum', homes[s], expr, sign, INT_BITS[base_type(types[s])]))
+        else:
+            slot, index = statement[1], statement[2]
+            target = translate(('elem', slot, index))
+            expr = translate(statement[3])
+            if target is None or expr is None:
+                return None
+            wide = expr[0] not in ('k', 'const', 'reg', 'elem')
+            kernel.append(('store', local[slot], expr,
+                           INT_BITS[base_type(types[slot])] if wide else 0))
+    return Kernel(homes[k], bound, kernel, arrays)
@@ -0,0 +1,626 @@
+# vm.py — Bytecode VM for `dotc run`: execute Dot without a C/C++ toolchain.
+# Each IR Function is assembled into a Code object: register-based
+# instructions stored column-wise in arrays (opcode, dst, a, b, source
+# offset) with a constant pool of its own. Structured control flow becomes
+# jumps. Registers are the IR temps, then one per scalar local whose address
+# is never passed (its home), then one per pool constant, preloaded at call
+# time; so `i = i + 1` is a single ADD on i's home, with no loads or stores.
+#
+# Everything else lives in one flat list of cells. A call appends the
+# callee's frame (a cell per scalar, N per i_N array, one per struct field)
+# and drops it on return. Every parameter is a reference, as in the emitted
+# C++: the caller passes cell addresses, or fresh cells for plain values.
+# Declaring a local maps it to its cells (or sets its home); \ unmaps it
+# (or poisons the home), so touching a released pointer faults and is
+# reported at its source position, as are out-of-range indexes and
+# divisions by zero.
+#
+# Arithmetic follows C: integer / and % truncate toward zero, ^ gives a
+# double, and a store converts to the declared type, wrapping integers to
+# its width as the emitted code does in practice (intermediate results are
+# not wrapped, so only a / or % of an overflowed value can differ). Doubles
+# print as C++ cout does (%g).
+#
+# Counted loops over integer arrays run as whole-array kernels, with NumPy
+# when it is installed (see vector.py).
+
+import math
+import sys
+from array import array
+
+import vector
+from ir import (ADD, ADDR, ARG, ARRAY, CALL, CONST, DECL, DIV, ELIF, ELSE, END, EQ, GE, GT, IF,
+                LE, LOAD, LOADIDX, LOADMEM, LOOP, LT, MOD, MUL, NE, NEG, PARAM, POW, PRINT,
+                RELEASE, SLOT_A_OPS, STORE, STOREIDX, STOREMEM, STRUCT, SUB, WHILE, Module,
+                base_type)
+
+class VMError(Exception):
+    def __init__(self, message: str, pos: int):
+        super().__init__(message)
+        self.pos = pos
+
+# === Bytecode ===
+#   MOVE     r, ra        r = ra
+#   LOAD     r, l         r = the cell of local l
+#   LOADIDX  r, l, ri     r = cell l[ri], bounds-checked
+#   LOADMEM  r, l, off    r = field at offset off of struct l
+#   NEG..GE  r, ra, rb    as in the IR
+#   TOINT    r, ra, bits  r = int(ra) wrapped to bits, for a store to an integer
+#   TOFLOAT  r, ra        r = float(ra), for a store to a d or f
+#   STORE    l, r         STOREIDX l, ri, r   STOREMEM l, off, r
+#   DECL     l, r|-1      map l to its frame cells, initialised from r or zeroed
+#   RELEASE  l            unmap l
+#   DROP     r            poison the home register of a released local
+#   PRINT    -, r, flags  print r; flags: NEWLINE ends the line, CHAR prints a c_ value
+#   ARGREF   -, l         pass local l by reference
+#   ARGIDX   -, l, ri     pass element l[ri] by reference
+#   ARGMEM   -, l, off    pass a struct field by reference
+#   ARGVAL   -, r         pass a fresh cell holding r
+#   CALL     -, f         call code f with the arguments passed so far
+#   JUMP     -, -, pc     JUMPF -, r, pc: jump unless r
+#   KERNEL   n, -, pc     run kernel n and jump to pc, or go on into its loop
+
+OPS = (
+    'MOVE', 'LOAD', 'LOADIDX', 'LOADMEM', 'NEG',
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'POW', 'EQ', 'NE', 'LT', 'LE', 'GT', 'GE',
+    'TOINT', 'TOFLOAT', 'STORE', 'STOREIDX', 'STOREMEM', 'DECL', 'RELEASE', 'DROP', 'PRINT',
+    'ARGREF', 'ARGIDX', 'ARGMEM', 'ARGVAL', 'CALL', 'JUMP', 'JUMPF', 'KERNEL',
+)
+(B_MOVE, B_LOAD, B_LOADIDX, B_LOADMEM, B_NEG,
+ B_ADD, B_SUB, B_MUL, B_DIV, B_MOD, B_POW, B_EQ, B_NE, B_LT, B_LE, B_GT, B_GE,
+ B_TOINT, B_TOFLOAT, B_STORE, B_STOREIDX, B_STOREMEM, B_DECL, B_RELEASE, B_DROP, B_PRINT,
+ B_ARGREF, B_ARGIDX, B_ARGMEM, B_ARGVAL, B_CALL, B_JUMP, B_JUMPF, B_KERNEL) = range(len(OPS))
+
+BINARY = {
+    ADD: B_ADD, SUB: B_SUB, MUL: B_MUL, DIV: B_DIV, MOD: B_MOD, POW: B_POW,
+    EQ: B_EQ, NE: B_NE, LT: B_LT, LE: B_LE, GT: B_GT, GE: B_GE,
+}
+COMPARISONS = {EQ, NE, LT, LE, GT, GE}
+WIDENING = {ADD, SUB, MUL, POW}  # Results that may not fit their operands' type
+
+# Bytecode ops naming a local in dst, or in a
+SLOT_DST = {B_STORE, B_STOREIDX, B_STOREMEM, B_DECL, B_RELEASE}
+SLOT_A = {B_LOAD, B_LOADIDX, B_LOADMEM, B_ARGREF, B_ARGIDX, B_ARGMEM}
+
+FLOAT_KINDS = {'d', 'f'}
+INT_BITS = {'i': 32, 'sh': 16, 'l': 64, 'll': 64, 'c': 8}
+
+# PRINT flags
+NEWLINE = 1
+CHAR = 2
+
+# While assembling, entry k of the constant pool is written as operand POOL - k
+POOL = -2
+
+class Released:
+    # What a home register holds after its local's release: any use raises
+    __slots__ = ()
+
+    def fail(self, *args):
+        raise TypeError('released')
+
+    __bool__ = __str__ = __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = fail
+    __neg__ = __float__ = __int__ = __index__ = fail
+    __hash__ = object.__hash__
+
+RELEASED = Released()
+
+class Code:
+    # One assembled function. Locals are the function's slots, renumbered
+    # from 0; params keep their place and have no frame cells of their own.
+    __slots__ = ('name', 'ops', 'dst', 'a', 'b', 'pos', 'consts', 'nregs', 'params', 'homes',
+                 'offsets', 'sizes', 'fills', 'names', 'frame', 'kernels', 'lists', 'template')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ops = array('B')
+        self.dst = array('i')
+        self.a = array('i')
+        self.b = array('i')
+        self.pos = array('I')
+        self.consts = []           # preloaded into the last len(consts) registers
+        self.nregs = 0
+        self.params = array('i')
+        self.homes = array('i')    # local -> its register, or -1 if it lives in cells
+        self.offsets = array('i')  # local -> frame offset, or -1 for params and homes
+        self.sizes = array('i')    # local -> element count of an array, else 0
+        self.fills = []            # local -> initial cell values when declared bare
+        self.names = []
+        self.frame = 0             # cells per call
+        self.kernels = []          # vector.Kernel per KERNEL instruction
+        self.lists = None          # columns as lists, built on first run
+        self.template = None       # registers on entry
+
+    def emit(self, op: int, dst: int = -1, a: int = -1, b: int = -1, pos: int = 0) -> int:
+        self.ops.append(op)
+        self.dst.append(dst)
+        self.a.append(a)
+        self.b.append(b)
+        self.pos.append(pos)
+        return len(self.ops) - 1
+
+    def __len__(self):
+        return len(self.ops)
+
+def zero(kind: str):
+    return 0.0 if kind in FLOAT_KINDS else '' if kind == 's' else 0
+
+def assemble(module: Module, kernels: bool = True):
+    # [Code] in module.functions order; functions defined in other modules
+    # can't run here, so calling one is an error at its call site. kernels
+    # enables whole-array loop kernels.
+    index = {fn.name: i for i, fn in enumerate(module.functions)}
+    locals_of = [[] for _ in module.functions]
+    for slot, owner in enumerate(module.slot_func):
+        locals_of[owner].append(slot)
+    return [None if fn.external else assemble_function(module, fn, locals_of[i], index, kernels)
+            for i, fn in enumerate(module.functions)]
+
+def assemble_function(module: Module, fn, slots, index, kernels: bool = True) -> Code:
+    flags, types, sizes = module.slot_flags, module.slot_types, module.slot_sizes
+    structs, consts = module.structs, module.consts
+    ops, dst, a, b, pos = fn.ops, fn.dst, fn.a, fn.b, fn.pos
+    ntemps = fn.ntemps
+    code = Code(fn.name)
+
+    # A slot read into an ARG is passed by reference, so it needs a cell
+    users = [-1] * ntemps
+    for i in range(len(ops)):
+        if ops[i] == ARG:
+            users[a[i]] = i
+    taken = {a[i] for i in range(len(ops)) if ops[i] in SLOT_A_OPS and users[dst[i]] >= 0}
+
+    local, homes = {}, {}
+    for slot in slots:
+        local[slot] = len(code.names)
+        code.names.append(module.slot_names[slot])
+        kind = base_type(types[slot])
+        code.sizes.append(sizes[slot] if flags[slot] & ARRAY else 0)
+        if flags[slot] & PARAM:
+            fill = None
+        elif flags[slot] & STRUCT:
+            fill = [zero(base_type(dtype)) for dtype, _ in structs.get(types[slot], ())]
+        elif flags[slot] & ARRAY:
+            fill = [zero(kind)] * sizes[slot]
+        elif slot in taken:
+            fill = [zero(kind)]
+        else:
+            fill = None
+            homes[slot] = ntemps + len(homes)
+        code.homes.append(homes.get(slot, -1))
+        code.offsets.append(-1 if fill is None else code.frame)
+        code.fills.append(fill)
+        code.frame += len(fill) if fill else 0
+    code.params = array('i', [local[slot] for slot in fn.params])
+
+    pool = {}
+    def constant(value) -> int:
+        key = (type(value), value)
+        if key not in pool:
+            pool[key] = len(code.consts)
+            code.consts.append(value)
+        return POOL - pool[key]
+
+    def field(slot, name, pos):
+        for offset, (dtype, field_name) in enumerate(structs.get(types[slot], ())):
+            if field_name == name:
+                return offset, base_type(dtype)
+        raise VMError(f"struct '{types[slot]}' has no field '{name}'", pos)
+
+    def numeric(t, pos):
+        # Arithmetic takes scalars; a whole struct has no value to compute with
+        if whole[t] >= 0:
+            raise VMError(f"struct '{module.slot_names[whole[t]]}' can't be used in "
+                          "arithmetic; use its fields", pos)
+
+    def convert(kind, t, r, source, pos) -> int:
+        # Register holding temp t's value (now in source) as a cell of this
+        # kind would, converting it into r if need be
+        if kind in FLOAT_KINDS and not floats[t]:
+            code.emit(B_TOFLOAT, r, source, pos=pos)
+            return r
+        if kind in INT_BITS and (floats[t] or wide[t]):
+            code.emit(B_TOINT, r, source, INT_BITS[kind], pos)
+            return r
+        return source
+
+    where = list(range(ntemps))   # temp -> register holding its value
+    defined = [-1] * ntemps       # temp -> instruction that computed it
+    floats = [False] * ntemps     # temps holding a double
+    chars = [False] * ntemps      # temps the emitters print as a character
+    wide = [False] * ntemps       # temps that may overflow their type
+    whole = [-1] * ntemps         # temp -> the struct slot it loads whole
+    refs = {}                     # temp -> (ARG op, local, operand) for by-reference args
+    frames = []                   # open IF/LOOP: [head, pending false jump, exit jumps]
+    for i in range(len(ops)):
+        op, d, x, y, p = ops[i], dst[i], a[i], b[i], pos[i]
+        if op in SLOT_A_OPS and users[d] >= 0:
+            if op == LOADIDX:
+                refs[d] = (B_ARGIDX, local[x], where[y])
+            elif op == LOADMEM:
+                refs[d] = (B_ARGMEM, local[x], field(x, consts[y], p)[0])
+            else:
+                refs[d] = (B_ARGREF, local[x], -1)
+        elif op == CONST:
+            floats[d] = isinstance(consts[x], float)
+            where[d] = constant(consts[x])
+        elif op == LOAD or op == ADDR:
+            floats[d] = base_type(types[x]) in FLOAT_KINDS
+            chars[d] = base_type(types[x]) == 'c'
+            if flags[x] & STRUCT:
+                whole[d] = x
+            if x in homes:
+                where[d] = homes[x]
+            else:
+                defined[d] = code.emit(B_LOAD, d, local[x], pos=p)
+        elif op == LOADIDX:
+            floats[d] = base_type(types[x]) in FLOAT_KINDS
+            chars[d] = base_type(types[x]) == 'c'
+            defined[d] = code.emit(B_LOADIDX, d, local[x], where[y], p)
+        elif op == LOADMEM:
+            offset, kind = field(x, consts[y], p)
+            floats[d] = kind in FLOAT_KINDS
+            chars[d] = kind == 'c'
+            defined[d] = code.emit(B_LOADMEM, d, local[x], offset, p)
+        elif op == NEG:
+            numeric(x, p)
+            floats[d], wide[d], chars[d] = floats[x], True, chars[x]
+            defined[d] = code.emit(B_NEG, d, where[x], pos=p)
+        elif op in BINARY:
+            numeric(x, p)
+            numeric(y, p)
+            floats[d] = op == POW or (op not in COMPARISONS and (floats[x] or floats[y]))
+            wide[d] = op in WIDENING or (op not in COMPARISONS and (wide[x] or wide[y]))
+            chars[d] = chars[x] and not floats[d] and op not in COMPARISONS  # As numeric_type
+            defined[d] = code.emit(BINARY[op], d, where[x], where[y], p)
+        elif (op == STORE or op == DECL) and d in homes:
+            home, kind = homes[d], base_type(types[d])
+            if x < 0:
+                code.emit(B_MOVE, home, constant(zero(kind)), pos=p)
+            else:
+                if where[x] == x and defined[x] == len(code) - 1:
+                    code.dst[-1] = home  # Compute straight into the home
+                else:
+                    code.emit(B_MOVE, home, where[x], pos=p)
+                convert(kind, x, home, home, p)
+        elif op == STORE or op == DECL:
+            value = convert(base_type(types[d]), x, x, where[x], p) if x >= 0 else -1
+            code.emit(B_STORE if op == STORE else B_DECL, local[d], value, pos=p)
+        elif op == STOREIDX:
+            value = convert(base_type(types[d]), y, y, where[y], p)
+            code.emit(B_STOREIDX, local[d], where[x], value, p)
+        elif op == STOREMEM:
+            offset, kind = field(d, consts[x], p)
+            code.emit(B_STOREMEM, local[d], offset, convert(kind, y, y, where[y], p), p)
+        elif op == RELEASE:
+            if d in homes:
+                code.emit(B_DROP, homes[d], pos=p)
+            else:
+                code.emit(B_RELEASE, local[d], pos=p)
+        elif op == PRINT:
+            code.emit(B_PRINT, -1, where[x], (NEWLINE if y else 0) | (CHAR if chars[x] else 0), p)
+        elif op == ARG:
+            if x in refs:
+                kind, slot, operand = refs.pop(x)
+                code.emit(kind, -1, slot, operand, p)
+            else:
+                code.emit(B_ARGVAL, -1, where[x], pos=p)
+        elif op == CALL:
+            target = index.get(consts[x])
+            if target is None:
+                raise VMError(f"call to undefined function '{consts[x]}'", p)
+            if y != len(module.functions[target].params):
+                raise VMError(f"'{consts[x]}' takes {len(module.functions[target].params)} "
+                              f"argument(s), {y} given", p)
+            if module.functions[target].external:
+                raise VMError(f"'{consts[x]}' is defined in another module; "
+                              f"dotc run executes single-module programs", p)
+            code.emit(B_CALL, -1, target, pos=p)
+        elif op == IF:
+            frames.append([-1, code.emit(B_JUMPF, -1, where[x], -1, p), []])
+        elif op == ELSE:
+            frame = frames[-1]
+            frame[2].append(code.emit(B_JUMP, pos=p))
+            code.b[frame[1]] = len(code)
+            frame[1] = -1
+        elif op == ELIF:
+            frames[-1][1] = code.emit(B_JUMPF, -1, where[x], -1, p)
+        elif op == LOOP:
+            kernel = vector.match(module, fn, i, homes, local) if kernels else None
+            exits = []
+            if kernel is not None:
+                exits.append(code.emit(B_KERNEL, len(code.kernels), pos=p))
+                code.kernels.append(kernel)
+            frames.append([len(code), -1, exits])
+        elif op == WHILE:
+            frames[-1][1] = code.emit(B_JUMPF, -1, where[x], -1, p)
+        elif op == END:
+            head, pending, exits = frames.pop()
+            if head >= 0:
+                code.emit(B_JUMP, b=head, pos=p)
+            for jump in exits:
+                code.b[jump] = len(code)
+            if pending >= 0:
+                code.b[pending] = len(code)
+
+    # The pool's registers follow the homes
+    first = ntemps + len(homes)
+    for column in (code.a, code.b):
+        for i, operand in enumerate(column):
+            if operand <= POOL:
+                column[i] = first + POOL - operand
+    code.nregs = first + len(code.consts)
+    return code
+
+# === Execution ===
+
+def trunc_div(x, y):
+    if isinstance(x, int) and isinstance(y, int):
+        q = abs(x) // abs(y)
+        return q if (x < 0) == (y < 0) else -q
+    return x / y
+
+def c_mod(x, y):
+    if isinstance(x, int) and isinstance(y, int):
+        r = abs(x) % abs(y)
+        return r if x >= 0 else -r
+    return math.fmod(x, y)
+
+def show(value) -> str:
+    if isinstance(value, float):
+        return '%g' % value
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+class VM:
+    # vectorize: 'auto' runs loop kernels with NumPy when it is installed,
+    # 'lists' over plain lists, 'off' interprets every loop
+    def __init__(self, module: Module, out=None, vectorize: str = 'auto'):
+        self.codes = assemble(module, vectorize != 'off')
+        self.out = out if out is not None else sys.stdout
+        self.mem = []
+        self.numpy = vectorize == 'auto'
+
+    def run(self):
+        self.execute(self.codes[0], ())
+
+    def execute(self, code: Code, args):
+        if code.lists is None:
+            code.lists = (code.ops.tolist(), code.dst.tolist(), code.a.tolist(), code.b.tolist())
+            code.template = [None] * (code.nregs - len(code.consts)) + code.consts
+        ops, dst, a, b = code.lists
+        offsets, sizes, fills, kernels = code.offsets, code.sizes, code.fills, code.kernels
+        codes, write, numpy = self.codes, self.out.write, self.numpy
+        mem = self.mem
+        fp = len(mem)
+        top = fp + code.frame
+        mem.extend([0] * code.frame)
+        base = [None] * len(code.names)
+        for local, address in zip(code.params, args):
+            base[local] = address
+        regs = code.template[:]
+        parts, passed = [], []
+        n = len(ops)
+        pc = 0
+        try:
+            while pc < n:
+                i = pc
+                pc += 1
+                op = ops[i]
+                if op == B_ADD:
+                    regs[dst[i]] = regs[a[i]] + regs[b[i]]
+                elif op == B_JUMPF:
+                    if not regs[a[i]]:
+                        pc = b[i]
+                elif op == B_LT:
+                    regs[dst[i]] = regs[a[i]] < regs[b[i]]
+                elif op == B_JUMP:
+                    pc = b[i]
+                elif op == B_LOADIDX:
+                    k = regs[b[i]]
+                    if not 0 <= k < sizes[a[i]]:
+                        raise self.out_of_range(code, i, k)
+                    regs[dst[i]] = mem[base[a[i]] + k]
+                elif op == B_STOREIDX:
+                    k = regs[a[i]]
+                    if not 0 <= k < sizes[dst[i]]:
+                        raise self.out_of_range(code, i, k)
+                    mem[base[dst[i]] + k] = regs[b[i]]
+                elif op == B_MUL:
+                    regs[dst[i]] = regs[a[i]] * regs[b[i]]
+                elif op == B_SUB:
+                    regs[dst[i]] = regs[a[i]] - regs[b[i]]
+                elif op == B_TOINT:
+                    value = regs[a[i]]
+                    half = 1 << (b[i] - 1)
+                    if value.__class__ is not int or not -half <= value < half:
+                        value = ((int(value) + half) & (half + half - 1)) - half
+                    regs[dst[i]] = value
+                elif op == B_MOVE:
+                    regs[dst[i]] = regs[a[i]]
+                elif op == B_LOAD:
+                    regs[dst[i]] = mem[base[a[i]]]
+                elif op == B_STORE:
+                    mem[base[dst[i]]] = regs[a[i]]
+                elif op == B_LOADMEM:
+                    regs[dst[i]] = mem[base[a[i]] + b[i]]
+                elif op == B_STOREMEM:
+                    mem[base[dst[i]] + a[i]] = regs[b[i]]
+                elif op == B_LE:
+                    regs[dst[i]] = regs[a[i]] <= regs[b[i]]
+                elif op == B_GT:
+                    regs[dst[i]] = regs[a[i]] > regs[b[i]]
+                elif op == B_GE:
+                    regs[dst[i]] = regs[a[i]] >= regs[b[i]]
+                elif op == B_EQ:
+                    regs[dst[i]] = regs[a[i]] == regs[b[i]]
+                elif op == B_NE:
+                    regs[dst[i]] = regs[a[i]] != regs[b[i]]
+                elif op == B_DIV:
+                    regs[dst[i]] = trunc_div(regs[a[i]], regs[b[i]])
+                elif op == B_MOD:
+                    regs[dst[i]] = c_mod(regs[a[i]], regs[b[i]])
+                elif op == B_POW:
+                    regs[dst[i]] = math.pow(regs[a[i]], regs[b[i]])
+                elif op == B_NEG:
+                    regs[dst[i]] = -regs[a[i]]
+                elif op == B_TOFLOAT:
+                    regs[dst[i]] = float(regs[a[i]])
+                elif op == B_DECL:
+                    local = dst[i]
+                    address = base[local] = fp + offsets[local]
+                    if a[i] >= 0:
+                        mem[address] = regs[a[i]]
+                    else:
+                        fill = fills[local]
+                        mem[address:address + len(fill)] = fill
+                elif op == B_RELEASE:
+                    base[dst[i]] = None
+                elif op == B_DROP:
+                    regs[dst[i]] = RELEASED
+                elif op == B_PRINT:
+                    parts.append(chr(regs[a[i]] & 0xFF) if b[i] & CHAR else show(regs[a[i]]))
+                    if b[i] & NEWLINE:
+                        parts.append('\n')
+                        write(''.join(parts))
+                        parts = []
+                elif op == B_ARGREF:
+                    passed.append(base[a[i]] + 0)  # + 0 faults on a released local
+                elif op == B_ARGVAL:
+                    passed.append(len(mem))
+                    mem.append(regs[a[i]])
+                elif op == B_ARGIDX:
+                    k = regs[b[i]]
+                    if not 0 <= k < sizes[a[i]]:
+                        raise self.out_of_range(code, i, k)
+                    passed.append(base[a[i]] + k)
+                elif op == B_ARGMEM:
+                    passed.append(base[a[i]] + b[i])
+                elif op == B_CALL:
+                    self.execute(codes[a[i]], passed)
+                    passed = []
+                    del mem[top:]
+                elif op == B_KERNEL:
+                    if kernels[dst[i]].run(regs, mem, base, sizes, numpy):
+                        pc = b[i]
+        except VMError:
+            raise
+        except (TypeError, ZeroDivisionError, OverflowError, ValueError) as e:
+            raise self.fault(code, i, base, regs, e) from None
+        del mem[fp:]
+
+    def out_of_range(self, code: Code, i: int, k) -> VMError:
+        local = code.dst[i] if code.ops[i] == B_STOREIDX else code.a[i]
+        return VMError(f"index {k} is out of range for '{code.names[local]}' "
+                       f"(size {code.sizes[local]})", code.pos[i])
+
+    def fault(self, code: Code, i: int, base, regs, e: Exception) -> VMError:
+        op = code.ops[i]
+        local = code.dst[i] if op in SLOT_DST else code.a[i] if op in SLOT_A else -1
+        if local >= 0 and base[local] is None and op != B_DECL:
+            return VMError(f"pointer '{code.names[local]}' is used after its release", code.pos[i])
+        for local, home in enumerate(code.homes):
+            if home >= 0 and home in (code.a[i], code.b[i]) and regs[home] is RELEASED:
+                return VMError(f"pointer '{code.names[local]}' is used after its release",
+                               code.pos[i])
+        if isinstance(e, ZeroDivisionError):
+            return VMError('division by zero', code.pos[i])
+        return VMError(f"runtime error in {code.name}: {e}", code.pos[i])
+
+def load(code) -> Module:
+    # Dot source to checked, unoptimised IR, as dotc compiles it
+    from check import CheckError, check
+    from ir import lower
+    from lexer import tokenize_buffer
+    from parser import parse
+
+    module = lower(parse(tokenize_buffer(code)))
+    problems = check(module)
+    if problems:
+        raise CheckError(problems)
+    return module
+
+def run_source(code, out=None, opt_level: int = 1, vectorize: str = 'auto'):
+    module = load(code)
+    if opt_level:
+        from opt import optimize
+        optimize(module)
+    VM(module, out, vectorize).run()
+
+# === Listing ===
+
+def format_code(code: Code) -> str:
+    lines = [f"code {code.name}: {code.nregs} registers, {code.frame} frame cells"]
+    for i in range(len(code)):
+        lines.append(f"{i:5}  {format_instr(code, i)}")
+    return '\n'.join(lines)
+
+def format_instr(code: Code, i: int) -> str:
+    # Temps print as rN, home registers as their local's name and pool
+    # registers as the constant they hold
+    op, d, x, y = code.ops[i], code.dst[i], code.a[i], code.b[i]
+    name = OPS[op].lower()
+    local = code.names.__getitem__
+    first = code.nregs - len(code.consts)
+    homes = {home: local(l) for l, home in enumerate(code.homes) if home >= 0}
+
+    def r(reg):
+        if reg >= first:
+            return repr(code.consts[reg - first])
+        return homes.get(reg, f"r{reg}")
+
+    if op == B_MOVE:
+        return f"{r(d)} = {r(x)}"
+    if op == B_LOAD:
+        return f"{r(d)} = {local(x)}"
+    if op == B_LOADIDX:
+        return f"{r(d)} = {local(x)}[{r(y)}]"
+    if op == B_LOADMEM:
+        return f"{r(d)} = {local(x)}+{y}"
+    if op == B_NEG:
+        return f"{r(d)} = -{r(x)}"
+    if B_ADD <= op <= B_GE:
+        return f"{r(d)} = {r(x)} {name} {r(y)}"
+    if op == B_TOINT:
+        return f"{r(d)} = toint {r(x)}, {y} bits"
+    if op == B_TOFLOAT:
+        return f"{r(d)} = tofloat {r(x)}"
+    if op == B_STORE:
+        return f"{local(d)} = {r(x)}"
+    if op == B_STOREIDX:
+        return f"{local(d)}[{r(x)}] = {r(y)}"
+    if op == B_STOREMEM:
+        return f"{local(d)}+{x} = {r(y)}"
+    if op == B_DECL:
+        return f"decl {local(d)}{f' = {r(x)}' if x >= 0 else ''}"
+    if op == B_RELEASE:
+        return f"release {local(d)}"
+    if op == B_DROP:
+        return f"drop {r(d)}"
+    if op == B_PRINT:
+        return f"print {r(x)}{' char' if y & CHAR else ''}{' nl' if y & NEWLINE else ''}"
+    if op == B_ARGREF:
+        return f"argref {local(x)}"
+    if op == B_ARGIDX:
+        return f"argref {local(x)}[{r(y)}]"
+    if op == B_ARGMEM:
+        return f"argref {local(x)}+{y}"
+    if op == B_ARGVAL:
+        return f"argval {r(x)}"
+    if op == B_CALL:
+        return f"call f{x}"
+    if op == B_JUMPF:
+        return f"jumpf {r(x)} -> {y}"
+    if op == B_KERNEL:
+        return f"kernel {code.kernels[d].format(local, r)} -> {y}"
+    return f"jump -> {y}"
+
+if __name__ == '__main__':
+    from opt import optimize
+    with open(sys.argv[1]) as f:
+        module = load(f.read())
+    optimize(module)
+    for code in assemble(module):
+        if code is not None:
+            print(format_code(code))
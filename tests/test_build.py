@@ -0,0 +1,63 @@
+# test_build.py — .dotbuild projects rebuild only what a change reaches.
+#
+#   python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from build import build  # noqa: E402
+
+MAIN = "i_ 'x = 3;\ni_ 'y = 0;\nm.dbl('x, 'y)\ny\"\n'x\\\n'y\\\n"
+M = "set_i m{\n    dbl(i_ @a, i_ @b){ b@ = a@ * 2; }\n}\n"
+N = "set_i n{\n    inc(i_ @a){ a@ = a@ + 1; }\n}\n"
+
+def write(path, text):
+    # Bump the mtime too, so a rewrite within the same tick is still seen
+    mtime = os.stat(path).st_mtime_ns + 1_000_000 if os.path.exists(path) else None
+    with open(path, 'w') as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'lib').mkdir()
+    write(tmp_path / '.dotbuild', "[build]\nentry = main.dot\ndirs = lib/\n")
+    write(tmp_path / 'main.dot', MAIN)
+    write(tmp_path / 'lib' / 'm.dot', M)
+    write(tmp_path / 'lib' / 'n.dot', N)
+    return tmp_path
+
+def rebuilt(project):
+    # (succeeded, names of the modules compiled)
+    lines = []
+    ok = build(str(project / '.dotbuild'), log=lines.append)
+    return ok, sorted(os.path.basename(line.split()[1]) for line in lines
+                      if line.startswith('Compiled'))
+
+def test_unchanged_project_is_not_rebuilt(project):
+    assert rebuilt(project) == (True, ['m.dot', 'main.dot', 'n.dot'])
+    assert rebuilt(project) == (True, [])
+
+def test_body_change_rebuilds_only_its_module(project):
+    rebuilt(project)
+    write(project / 'lib' / 'm.dot', M.replace('a@ * 2', 'a@ + a@'))
+    assert rebuilt(project) == (True, ['m.dot'])
+
+def test_interface_change_rebuilds_its_users(project):
+    rebuilt(project)
+    write(project / 'lib' / 'm.dot', M.replace('}\n}', '}\n    neg(i_ @a){ a@ = -a@; }\n}'))
+    assert rebuilt(project) == (True, ['m.dot', 'main.dot'])
+    assert rebuilt(project) == (True, [])
+
+def test_signature_change_is_checked_against_callers(project, capsys):
+    rebuilt(project)
+    write(project / 'lib' / 'm.dot', M.replace('dbl(i_ @a, i_ @b)', 'dbl(i_ @a)')
+                                       .replace('b@ = a@ * 2', 'a@ = a@ * 2'))
+    ok, compiled = rebuilt(project)
+    assert not ok and compiled == ['m.dot']
+    assert "'m.dbl' takes 1 argument(s), 2 given" in capsys.readouterr().err
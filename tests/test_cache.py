@@ -0,0 +1,42 @@
+# test_cache.py — the on-disk compilation cache.
+#
+#   python -m pytest tests
+
+import io
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import Cache  # noqa: E402
+from dotc import compile_source  # noqa: E402
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+NON_ASCII = 's_ \'g = "héllo ✓";\ng"\n\'g\\\n'
+
+def test_hit_returns_what_was_stored(tmp_path):
+    cache = Cache('test', str(tmp_path))
+    outputs = []
+    for _ in range(2):
+        out = io.StringIO()
+        outputs.append((compile_source(NON_ASCII, out, 'cpp', cache), out.getvalue()))
+    assert [hit for hit, _ in outputs] == [False, True]
+    assert outputs[0][1] == outputs[1][1] and 'héllo ✓' in outputs[1][1]
+
+def test_hit_is_read_as_utf8_under_an_ascii_locale(tmp_path):
+    # Entries are stored as UTF-8, whatever the locale would default to; the
+    # script itself stays ASCII, as the command line is decoded as ASCII too
+    script = (f"import io, sys\nsys.path.insert(0, {SRC!r})\n"
+              "from cache import Cache\nfrom dotc import compile_source\n"
+              f"cache = Cache('test', {str(tmp_path)!r})\n"
+              "for _ in range(2):\n"
+              "    out = io.StringIO()\n"
+              f"    print(compile_source({NON_ASCII!a}, out, 'cpp', cache), "
+              f"{'héllo ✓'!a} in out.getvalue())\n")
+    env = dict(os.environ, LC_ALL='C', PYTHONCOERCECLOCALE='0', PYTHONUTF8='0')
+    result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True,
+                            text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ['False', 'True', 'True', 'True']
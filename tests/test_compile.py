@@ -0,0 +1,190 @@
+# test_compile.py — end-to-end compiles through dotc.compile_source.
+#
+#   python -m pytest tests
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from check import CheckError  # noqa: E402
+from dotc import compile_source, describe_error  # noqa: E402
+from ir import LoweringError  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+# Toolchain for each target: ($CXX or $CC, default command, -x language)
+TOOLCHAINS = {'cpp': ('CXX', 'c++', 'c++'), 'c': ('CC', 'cc', 'c')}
+
+def compile_text(code, target='cpp', opt_level=1):
+    out = io.StringIO()
+    compile_source(code, out, target, opt_level=opt_level)
+    return out.getvalue()
+
+def check_syntax(text, target):
+    # Feed emitted code to the target's compiler with -fsyntax-only, or
+    # skip when it isn't installed
+    variable, default, language = TOOLCHAINS[target]
+    command = os.environ.get(variable) or default
+    if shutil.which(command) is None:
+        pytest.skip(f"no {target} compiler ({variable} or {default})")
+    result = subprocess.run([command, '-fsyntax-only', '-x', language, '-'], input=text,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+@pytest.mark.parametrize('target', ('cpp', 'c'))
+@pytest.mark.parametrize('opt_level', (0, 1))
+def test_hello_world(target, opt_level):
+    with open(os.path.join(EXAMPLES, 'hello_world.dot')) as f:
+        text = compile_text(f.read(), target, opt_level)
+    assert 'int main(' in text
+    check_syntax(text, target)
+
+STRUCTS = '''struct_i vec{
+    i_ 'x;
+    i_ 'y;
+}
+'''
+
+def test_plain_struct_instance_is_not_owned():
+    compile_text(STRUCTS + 'vec_i p{x" = 2, y" = 3};\np"x\n')
+
+def test_heap_struct_instance_is_released_with_tilde():
+    compile_text(STRUCTS + 'vec_i p{x" = 2, y" = 3};\n~vec_i p{x" = 4, y" = 5};\n'
+                 '~p" += p";\n~p"x\n~p\\\n')
+
+def test_owned_struct_instances_must_be_released():
+    with pytest.raises(CheckError) as info:
+        compile_text(STRUCTS + "vec 'q{6, 7};\n~vec_i p{4, 5};\nq\"y ~p\"x\n")
+    messages = sorted(message for _, message in info.value.problems)
+    assert messages == ["pointer 'q' is never released", "pointer '~p' is never released"]
+
+DBL = '''set_i math{
+    dbl(i_ @a, i_ @b){ b@ = a@ * 2; }
+}
+'''
+
+def test_call_checks_arity():
+    with pytest.raises(LoweringError, match=r"'math.dbl' takes 2 argument\(s\), 1 given"):
+        compile_text(DBL + "i_ 'x = 3;\nmath.dbl('x)\nx\"\n'x\\\n")
+
+def test_call_to_undefined_function():
+    with pytest.raises(LoweringError, match="function 'm.g' is not defined"):
+        compile_text("i_ 'x = 3;\nm.g('x)\nx\"\n'x\\\n")
+
+def test_call_before_definition():
+    compile_text("i_ 'x = 3;\ni_ 'y = 0;\nmath.dbl('x, 'y)\ny\"\n'x\\\n'y\\\n" + DBL)
+
+@pytest.mark.parametrize('encode', (False, True))
+@pytest.mark.parametrize('code, location', (
+    ("i_ 'x = é;\nx\"\n'x\\\n", '1:9'),
+    ("s_ 's = \"ü\"; i_ 'x = é;\nx\"\n's\\\n'x\\\n", '1:22'),
+))
+def test_non_ascii_character_error_is_located(encode, code, location):
+    # Lines and columns are 1-based; columns count characters, not bytes
+    source = code.encode() if encode else code
+    with pytest.raises(Exception) as info:
+        compile_text(source)
+    assert describe_error('big.dot', source, info.value) == \
+        f"big.dot:{location}: error: expected an expression, found 'é'"
+
+@pytest.mark.parametrize('encode', (False, True))
+def test_lowering_error_columns_match_parse_errors(encode):
+    code = "s_ 's = \"ü\";\n  m.g('s)\n's\\\n"
+    source = code.encode() if encode else code
+    with pytest.raises(LoweringError) as info:
+        compile_text(source)
+    assert describe_error('a.dot', source, info.value) == \
+        "a.dot:2:3: error: function 'm.g' is not defined"
+
+def test_struct_compound_assignment_is_per_field():
+    code = compile_text(STRUCTS + 'vec_i p{x" = 2, y" = 3};\n~vec_i p{x" = 4, y" = 5};\n'
+                        '~p" += p";\n~p"x ~p"y\n~p\\\n')
+    assert 'p_heap.x = p_heap.x + p.x;' in code and 'p_heap.y = p_heap.y + p.y;' in code
+
+@pytest.mark.parametrize('statement, message', (
+    ('p" += 1;', "struct 'p' can only be combined with another struct"),
+    ("i_ 'z = p\" + 1;\nz\"\n'z\\", "struct 'p' can't be used in arithmetic"),
+))
+def test_struct_arithmetic_is_rejected(statement, message):
+    with pytest.raises(LoweringError, match=message):
+        compile_text(STRUCTS + 'vec_i p{x" = 2, y" = 3};\n' + statement + '\np"x\n')
+
+SUM = '''set_i m{
+    sum(i_ @arr, i_ @n, i_ @out){
+        i_ i = 0,
+        while(i < n@){
+            out@ = out@ + arr@i;
+            i = i + 1
+        }
+    }
+}
+'''
+
+def test_array_argument_binds_to_array_reference():
+    code = compile_text(SUM + "i_5 'xs;\ni_ 't = 0;\nm.sum('xs, 2, 't)\nt\"\n'xs\\\n't\\\n")
+    assert 'void sum(int (&__restrict arr)[5], int& __restrict n, int& __restrict out)' in code
+    assert 'int dot_arg0 = 2;\n    m::sum(xs, dot_arg0, t);' in code
+
+@pytest.mark.parametrize('target', ('cpp', 'c'))
+@pytest.mark.parametrize('opt_level', (0, 1))
+def test_literal_and_expression_arguments_compile(target, opt_level):
+    code = (DBL + SUM + "i_3 'xs;\ni_5 'ys;\ni_ 'x = 3;\ni_ 'y = 0;\nmath.dbl(4, 'y)\n"
+            "math.dbl(x\" + 1, 'y)\nm.sum('xs, 2, 'y)\nm.sum('ys, x\" * 2, 'y)\ny\"\n"
+            "'xs\\\n'ys\\\n'x\\\n'y\\\n")
+    check_syntax(compile_text(code, target, opt_level), target)
+
+def test_arrays_of_different_sizes_pass_as_pointers():
+    code = compile_text(SUM + "i_3 'xs;\ni_5 'ys;\ni_ 't = 0;\nm.sum('xs, 2, 't)\n"
+                        "m.sum('ys, t\" + 1, 't)\nt\"\n'xs\\\n'ys\\\n't\\\n")
+    assert 'void sum(int* __restrict arr, int& __restrict n, int& __restrict out)' in code
+    assert 'int dot_arg1 = t + 1;\n    m::sum(ys, dot_arg1, t);' in code
+
+def test_expressions_keep_their_precedence():
+    # Parentheses survive only where the tree needs them; -a ^ b is -(a ^ b)
+    # and ^ groups to the right
+    code = compile_text("i_ 'x = (1 + 2) * 3 - 4 - (5 - 6) + -2 ^ 2 + 7 % 3 * 2;\n"
+                        "d_ 'y = 2 ^ 3 ^ 2;\nx\"\ny\"\n'x\\\n'y\\\n", opt_level=0)
+    assert 'int x = (1 + 2) * 3 - 4 - (5 - 6) + -pow(2, 2) + 7 % 3 * 2;' in code
+    assert 'double y = pow(2, pow(3, 2));' in code
+
+README = '''i_5 'array;
+array"0 = 10;
+array"2 = 20;
+i_ 'sum = 0;
+f(i_ @arr, i_ @out){
+    i_ i = 0,
+    while(i < 2){
+        out@ = out@ + arr@i;
+        i = i + 1
+    }
+}
+f('array, 'sum);
+sum"
+'array\\
+'sum\\
+'''
+
+@pytest.mark.parametrize('target, signature', (
+    ('cpp', 'void f(int (&__restrict arr)[5], int& __restrict out) {'),
+    ('c', 'void f(int* __restrict arr, int* __restrict out) {'),
+))
+def test_counted_loop_becomes_for_with_restrict(target, signature):
+    code = compile_text(README, target)
+    assert signature in code
+    assert 'for (int i = 0; i < 2; ++i) {' in code and 'while' not in code
+    check_syntax(code, target)
+
+def test_loop_counter_passed_by_reference_stays_a_while():
+    code = compile_text(DBL + "i_ 'k = 0;\ni_ 'y = 0;\nwhile(k\" < 3){ math.dbl('k, 'y) "
+                        "k\" = k\" + 1; }\ny\"\n'k\\\n'y\\\n")
+    assert 'while (k < 3) {' in code and 'for (' not in code
+
+def test_aliased_arguments_drop_restrict():
+    code = compile_text(DBL + "i_ 'x = 3;\nmath.dbl('x, 'x)\nx\"\n'x\\\n")
+    assert 'void dbl(int& a, int& b) {' in code
@@ -0,0 +1,55 @@
+# test_compiler.py — compiler.Compiler from many threads at once.
+#
+#   python -m pytest tests
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compiler import CompileError, Compiler  # noqa: E402
+from dotc import compile_source  # noqa: E402
+
+# Distinct programs, so each thread builds its own tokens, symbols and IR
+SOURCES = [f"i_ 'x{i} = {i} * 3;\ni_4 'a{i};\na{i}\"1 = x{i}\" + {i};\n"
+           f"\"v{i}: \" a{i}\"1\n'x{i}\\\n'a{i}\\\n" for i in range(64)]
+
+def serial(source, target):
+    out = io.StringIO()
+    compile_source(source, out, target)
+    return out.getvalue()
+
+@pytest.mark.parametrize('target', ('cpp', 'c'))
+def test_concurrent_compile_string(target):
+    compiler = Compiler(target=target)
+    expected = [serial(source, target) for source in SOURCES]
+    with ThreadPoolExecutor(8) as pool:
+        outputs = list(pool.map(compiler.compile_string, SOURCES * 4))
+    assert outputs == expected * 4
+    assert compiler.stats['compiles'] + compiler.stats['memory_hits'] == len(SOURCES) * 4
+    assert compiler.stats['compiles'] >= len(SOURCES)
+
+def test_concurrent_errors_stay_with_their_source():
+    compiler = Compiler()
+    sources = [source if i % 2 else source.replace(' * 3', ' * ') for i, source in enumerate(SOURCES)]
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(compiler.compile_string, source, f"s{i}.dot")
+                   for i, source in enumerate(sources)]
+    for i, future in enumerate(futures):
+        if i % 2:
+            assert f'"v{i}: "' in future.result()
+        else:
+            with pytest.raises(CompileError) as info:
+                future.result()
+            assert info.value.name == f"s{i}.dot"
+            assert info.value.diagnostics[0].startswith(f"s{i}.dot:1:")
+
+def test_compile_many_keeps_order():
+    compiler = Compiler(target='c')
+    outputs = asyncio.run(compiler.compile_many(SOURCES[:16]))
+    assert outputs == [serial(source, 'c') for source in SOURCES[:16]]
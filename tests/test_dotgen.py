@@ -0,0 +1,35 @@
+# test_dotgen.py — every benchmark shape generates a program that compiles.
+#
+#   python -m pytest tests
+
+import io
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+sys.path.insert(0, os.path.join(HERE, '..', 'benchmarks'))
+
+from dotc import compile_source  # noqa: E402
+from dotgen import SHAPES, generate  # noqa: E402
+from vm import run_source  # noqa: E402
+
+SIZE, SEED = 3, 1
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_shape_compiles_and_runs(shape):
+    source = generate(shape, SIZE, SEED)
+    assert generate(shape, SIZE, SEED) == source
+    for target in ('cpp', 'c'):
+        for opt_level in (0, 1):
+            out = io.StringIO()
+            compile_source(source, out, target, opt_level=opt_level)
+            assert 'int main(' in out.getvalue()
+    outputs = []
+    for opt_level in (0, 1):
+        out = io.StringIO()
+        run_source(source, out, opt_level)
+        outputs.append(out.getvalue())
+    assert outputs[0] and outputs[0] == outputs[1]
@@ -0,0 +1,57 @@
+# test_lexer.py — every way into the lexer yields the same tokens.
+#
+#   python -m pytest tests
+
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lexer import iter_tokens, tokenize, tokenize_buffer  # noqa: E402
+from symbols import TYPE, SymbolTable  # noqa: E402
+
+# Non-ASCII letters after and inside identifiers, a non-ASCII digit and space,
+# and non-ASCII text in strings and comments
+UNICODE = ('i_ \'xé = 1;\nxé" abéc"\ni_ \'n = ٣;\n s_ \'t = "ünï ✓";\n'
+           't" // çà\n\'xé\\\n')
+
+def stream(tokens):
+    # Columns are left out: over bytes they count bytes, not characters
+    return [(token.type, token.value, token.line) for token in tokens]
+
+@pytest.mark.parametrize('fast', (False, True))
+def test_str_and_bytes_lex_alike(fast):
+    expected = stream(tokenize(UNICODE))
+    assert ('UNKNOWN', 'é', 1) in expected and ('UNKNOWN', '٣', 3) in expected
+    assert stream(tokenize(UNICODE, fast)) == expected
+    assert stream(tokenize_buffer(UNICODE)) == expected
+    assert stream(tokenize_buffer(UNICODE.encode())) == expected
+    assert stream(iter_tokens(io.BytesIO(UNICODE.encode()), fast=fast)) == expected
+
+# Identifiers, numbers and strings longer than a chunk, and multi-byte
+# characters that a chunk boundary splits in two
+LONG = ('i_ \'a_rather_long_identifier = 1234567;\ns_ \'s = "a string that spans chunks ✓";\n'
+        'a_rather_long_identifier" s" "ünï"\n\'a_rather_long_identifier\\\n\'s\\\n')
+
+@pytest.mark.parametrize('chunk_size', (1, 2, 3, 7))
+@pytest.mark.parametrize('fast', (False, True))
+@pytest.mark.parametrize('binary', (False, True))
+@pytest.mark.parametrize('text', (LONG, LONG.rstrip('\n')), ids=('newline', 'no-newline'))
+def test_small_chunks_lex_like_tokenize(chunk_size, fast, binary, text):
+    expected = [(t.type, t.value, t.line, t.col) for t in tokenize(text)]
+    assert ('STRING', '"a string that spans chunks ✓"', 2, 8) in expected
+    source = io.BytesIO(text.encode()) if binary else io.StringIO(text)
+    tokens = iter_tokens(source, chunk_size=chunk_size, fast=fast)
+    assert [(t.type, t.value, t.line, t.col) for t in tokens] == expected
+
+def test_shared_symbol_table_interns_across_sources():
+    # A str and a bytes source share IDs and the very same name strings
+    table = SymbolTable()
+    first = tokenize_buffer("i_ 'count = 1;\ncount\"\n", table)
+    second = tokenize_buffer(b"i_ 'total = 2;\ncount\" total\"\n", table)
+    assert first.syms[2] == second.syms[6] == table.ids['count']
+    assert first.value(2) is second.value(6)
+    assert table.kinds[table.ids['i_']] & TYPE and len(table) == 3
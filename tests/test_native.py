@@ -0,0 +1,32 @@
+# test_native.py — dotc run --native: the compiled program prints what the VM does.
+# Skipped when there is no C compiler ($CC, else cc).
+#
+#   python -m pytest tests
+
+import io
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import native  # noqa: E402
+from vm import run_source  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+pytestmark = pytest.mark.skipif(shutil.which(native.compiler()) is None,
+                                reason='no C compiler')
+
+@pytest.mark.parametrize('opt_level', (0, 1))
+@pytest.mark.parametrize('pool', (False, True))
+def test_hello_world(tmp_path, opt_level, pool):
+    with open(os.path.join(EXAMPLES, 'hello_world.dot')) as f:
+        code = f.read()
+    out = io.StringIO()
+    run_source(code, out, opt_level=opt_level)
+    program = native.load(code, str(tmp_path), opt_level, pool)
+    assert program.main(capture=True) == (0, out.getvalue())
+    assert out.getvalue() == 'Hello, world!\n'
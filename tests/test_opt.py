@@ -0,0 +1,51 @@
+# test_opt.py — what each optimisation pass does to the emitted code.
+#
+#   python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from check import check  # noqa: E402
+from emitter import emit_string  # noqa: E402
+from ir import lower  # noqa: E402
+from lexer import tokenize_buffer  # noqa: E402
+from opt import PIPELINE, optimize  # noqa: E402
+from parser import parse  # noqa: E402
+
+def emitted(code, passes, target='cpp'):
+    module = lower(parse(tokenize_buffer(code)))
+    assert not check(module)
+    optimize(module, passes)
+    return emit_string(module, target)
+
+# (pass, program, a line only the pass removes, the line it leaves instead)
+PASS_EFFECTS = (
+    ('fold', "i_ 'x = 2 * 3 + 1;\nx\"\n'x\\\n", 'int x = 2 * 3 + 1;', 'int x = 7;'),
+    ('copy', "i_ 'a = 4;\ni_ 'b = a\" + 1;\nb\"\n'a\\\n'b\\\n",
+     'int b = a + 1;', 'int b = 4 + 1;'),
+    ('unreachable', 'if(0){ "dead" } else { "live" }\nwhile(0){ "loop" }\n',
+     'cout << "dead" << endl;', 'cout << "live" << endl;'),
+    ('dse', "i_5 'arr;\narr\"0 = 10;\narr\"0 = 20;\narr\"0\n'arr\\\n",
+     'arr[0] = 10;', 'arr[0] = 20;'),
+    ('stack', "i~ 'h = 7;\nh\"\n'h\\\n", 'int* h = new int(7);', 'int h = 7;'),
+)
+
+@pytest.mark.parametrize('name, code, before, after', PASS_EFFECTS,
+                         ids=[effect[0] for effect in PASS_EFFECTS])
+def test_pass_effect(name, code, before, after):
+    assert before in emitted(code, ())
+    optimised = emitted(code, (name,))
+    assert before not in optimised and after in optimised
+
+def test_unreachable_loop_is_dropped():
+    assert 'while' not in emitted('while(0){ "loop" }\n', ('unreachable',))
+
+def test_pipeline_combines_passes():
+    code = emitted("i_ 'a = 4;\ni_ 'b = a\" + 1;\nif(b\" > 9){ \"big\" }\nb\"\n'a\\\n'b\\\n",
+                   PIPELINE)
+    # Folded and propagated into the print; the branch and both locals go
+    assert 'cout << 5 << endl;' in code and 'big' not in code and 'int b' not in code
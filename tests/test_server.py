@@ -0,0 +1,61 @@
+# test_server.py — dotc --serve answers JSON-lines requests over a Unix socket.
+#
+#   python -m pytest tests
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from server import Client, ping, serve  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='no Unix sockets')
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / 'dotc.sock')
+    thread = threading.Thread(target=serve, args=(path,), kwargs={'log': lambda message: None},
+                              daemon=True)
+    thread.start()
+    for _ in range(200):
+        if ping(path):
+            break
+        time.sleep(0.01)
+    client = Client(path)
+    yield client
+    client.request(op='shutdown')
+    client.close()
+    thread.join(5)
+
+def raw(client, line: bytes) -> dict:
+    client.sock.sendall(line + b'\n')
+    return json.loads(client.file.readline())
+
+@pytest.mark.parametrize('line', (b'not json', b'[1, 2]', b'"compile"', b'3'))
+def test_malformed_requests_are_answered(server, line):
+    response = raw(server, line)
+    del response['ms']
+    assert response == {'ok': False, 'error': 'malformed request', 'id': None}
+    assert server.request(op='ping')['ok']  # The connection stays usable
+
+def test_compile_round_trip(server, tmp_path):
+    response = server.compile_source("i_ 'x = 1;\nx\"\n'x\\\n", target='c')
+    assert response['ok'] and 'int main(void)' in response['code']
+    assert response['id'] == server.next_id
+
+    source, output = tmp_path / 'é.dot', tmp_path / 'é.cpp'
+    source.write_text('s_ \'s = "ünï";\ns"\n\'s\\\n', encoding='utf-8')
+    response = server.compile(str(source), str(output))
+    assert response['ok'] and 'code' not in response
+    assert '"ünï"' in output.read_text(encoding='utf-8')
+
+    response = server.compile_source("i_ 'x = ;\n")
+    assert not response['ok'] and response['error'].startswith('<source>:1:')
+    stats = server.request(op='stats')
+    assert stats['compiles'] == 2 and stats['errors'] == 1